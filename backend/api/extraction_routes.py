@@ -0,0 +1,260 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import uuid
+import asyncio
+import hashlib
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# The extractors live in backend/model and use flat imports
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+if str(MODEL_DIR) not in sys.path:
+    sys.path.insert(0, str(MODEL_DIR))
+
+from batch_extract import extract_file, available_cores  # noqa: E402
+from instrumentation import METRICS  # noqa: E402
+
+UPLOAD_DIR = Path(os.getenv("EXTRACT_UPLOAD_DIR", "var/uploads"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "0")) or available_cores()
+# Jobs accepted but not finished (running + waiting for a worker)
+EXTRACT_QUEUE_MAX = int(os.getenv("EXTRACT_QUEUE_MAX", str(EXTRACT_WORKERS * 4)))
+EXTRACT_MAX_UPLOAD_MB = int(os.getenv("EXTRACT_MAX_UPLOAD_MB", "100"))
+# Finished jobs kept in memory for polling
+EXTRACT_JOB_HISTORY = int(os.getenv("EXTRACT_JOB_HISTORY", "1000"))
+SSE_KEEPALIVE_S = 15.0
+EXTRACTOR_NAMES = {"ovk": "OVKProtokollExtractor", "energideklaration": "EnergideklarationExtractor"}
+
+router = APIRouter(prefix="/api/extraction", tags=["extraction"])
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    sha256: str
+    typ: str
+    filename: Optional[str]
+    status: str = "queued"
+    result: Optional[Dict[str, Any]] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def view(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "sha256": self.sha256,
+            "typ": self.typ,
+            "filename": self.filename,
+            "result": self.result,
+        }
+
+
+class ExtractionJobs:
+    """
+    Bounded job queue in front of a process pool. At most `max_pending`
+    jobs are in flight; beyond that submit() raises QueueFull so the
+    caller can shed load instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int, max_pending: int, history: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self.pending = 0
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.by_hash: Dict[tuple, str] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: set = set()
+        # Uploads are content-addressed and may back several jobs (one per typ)
+        self._uploads: Dict[Path, int] = {}
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @property
+    def full(self) -> bool:
+        return self.pending >= self.max_pending
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def find(self, sha256: str, typ: str) -> Optional[Job]:
+        job = self.jobs.get(self.by_hash.get((sha256, typ), ""))
+        if job is not None and job.status != "failed":
+            return job
+        return None
+
+    def submit(self, path: Path, sha256: str, typ: str, filename: Optional[str]) -> Job:
+        if self.full:
+            raise QueueFull()
+        job = Job(id=uuid.uuid4().hex, sha256=sha256, typ=typ, filename=filename)
+        self.jobs[job.id] = job
+        self.by_hash[(sha256, typ)] = job.id
+        self.pending += 1
+        self._uploads[path] = self._uploads.get(path, 0) + 1
+        task = asyncio.create_task(self._run(job, path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, path: Path) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            record = await loop.run_in_executor(self.pool, extract_file, str(path), job.typ, job.sha256)
+            job.result = record
+            job.status = "done" if record.get("ok") else "failed"
+            # Workers are separate processes; aggregate their stage timings here
+            if record.get("timings"):
+                METRICS.record(EXTRACTOR_NAMES.get(record.get("typ"), str(record.get("typ"))), record["timings"])
+        except Exception as e:
+            job.result = {"ok": False, "error": str(e)}
+            job.status = "failed"
+        finally:
+            self.pending -= 1
+            self._uploads[path] -= 1
+            if not self._uploads[path]:
+                del self._uploads[path]
+            self.release(path)
+            job.done.set()
+            self._evict()
+
+    def release(self, path: Path) -> None:
+        """Delete an upload no running job reads; results live in the job, not on disk."""
+        if path not in self._uploads:
+            path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _evict(self) -> None:
+        finished = [j for j in self.jobs.values() if j.done.is_set()]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job.id]
+            if self.by_hash.get((job.sha256, job.typ)) == job.id:
+                del self.by_hash[(job.sha256, job.typ)]
+
+
+jobs = ExtractionJobs(EXTRACT_WORKERS, EXTRACT_QUEUE_MAX, EXTRACT_JOB_HISTORY)
+
+
+def _too_busy() -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "extraction queue full", "pending": jobs.pending, "max_pending": jobs.max_pending},
+        headers={"Retry-After": "5"},
+    )
+
+
+async def _save_upload(request: Request) -> tuple[Path, str]:
+    """Stream the request body to UPLOAD_DIR/<sha256>.pdf, hashing as it arrives."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    limit = EXTRACT_MAX_UPLOAD_MB * 1024 * 1024
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(status_code=413, detail=f"upload larger than {EXTRACT_MAX_UPLOAD_MB} MB")
+                h.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="empty upload")
+        digest = h.hexdigest()
+        path = UPLOAD_DIR / f"{digest}.pdf"
+        os.replace(tmp, path)
+        return path, digest
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    typ: str = Query("auto", pattern="^(auto|energideklaration|ovk)$"),
+    filename: Optional[str] = None,
+):
+    """
+    Upload a PDF as the raw request body:
+        curl --data-binary @protokoll.pdf -H 'Content-Type: application/pdf' \
+             'localhost:8088/api/extraction/jobs?typ=ovk'
+    """
+    # Reject before reading the body when we already know we are saturated
+    if jobs.full:
+        return _too_busy()
+    path, digest = await _save_upload(request)
+
+    existing = jobs.find(digest, typ)
+    if existing is not None:
+        jobs.release(path)
+        return existing.view()
+    try:
+        job = jobs.submit(path, digest, typ, filename)
+    except QueueFull:
+        jobs.release(path)
+        return _too_busy()
+    return job.view()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job.view()
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: one `status` event now, one `result` event when done."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+
+    async def stream():
+        yield f"event: status\ndata: {json.dumps({'job_id': job.id, 'status': job.status})}\n\n"
+        while not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=SSE_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+        yield f"event: result\ndata: {json.dumps(jsonable_encoder(job.view()), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/stats")
+async def stats():
+    return {
+        "workers": jobs.workers,
+        "pending": jobs.pending,
+        "max_pending": jobs.max_pending,
+        "jobs": len(jobs.jobs),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage extraction timings in Prometheus text format (EXTRACT_TIMINGS=1)."""
+    return METRICS.prometheus()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.extraction_routes import router, jobs, MODEL_DIR
+
+# End-to-end smoke check for the extraction jobs API: upload a synthetic
+# energideklaration (its result carries date/Enum values), then read the SSE
+# stream until the final `result` event and check it parses.
+#
+#   python -m api.smoke_extraction
+
+if str(MODEL_DIR) not in sys.path:
+    sys.path.insert(0, str(MODEL_DIR))
+from synth_corpus import render_energideklaration  # noqa: E402
+
+
+def _events(lines) -> dict:
+    events, name = {}, None
+    for line in lines:
+        if line.startswith("event: "):
+            name = line[len("event: "):]
+        elif line.startswith("data: ") and name:
+            events[name] = json.loads(line[len("data: "):])
+    return events
+
+
+def main() -> None:
+    app = FastAPI()
+    app.include_router(router)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "energi.pdf"
+        render_energideklaration(str(pdf), pages=2)
+        try:
+            with TestClient(app) as client:
+                r = client.post("/api/extraction/jobs", params={"typ": "energideklaration"}, content=pdf.read_bytes())
+                assert r.status_code == 202, r.text
+                job_id = r.json()["job_id"]
+                with client.stream("GET", f"/api/extraction/jobs/{job_id}/events") as s:
+                    events = _events(s.iter_lines())
+        finally:
+            jobs.shutdown()
+    assert "result" in events, f"stream ended without a result event: {events}"
+    result = events["result"]
+    assert result["status"] == "done", result
+    assert result["result"]["parsed"], result
+    print(f"ok: job {job_id} streamed to the end ({len(json.dumps(result))} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,37 @@
 
 from __future__ import annotations
+import asyncio
+import json
+from collections import Counter
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, Sequence
+from temporalio.client import Client, WorkflowUpdateFailedError
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from temporalio.service import RPCError, RPCStatusCode
 
-from temporal.client import get_client
-from temporal.workflows import PropertyValuationWorkflow
-from temporal.model_types import WorkflowInput
+from temporal.client import shared_client
+from temporal.workflows import PropertyValuationWorkflow, PortfolioValuationWorkflow
+from temporal.model_types import WorkflowInput, PortfolioInput
 
 router = APIRouter(prefix="/api/temporal", tags=["temporal"])
 
+BULK_MAX_ITEMS = 10000
+
+async def _client():
+    # One connection for the whole app instead of a gRPC handshake per request
+    try:
+        return await shared_client.get()
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/health")
+async def health():
+    ok = await shared_client.check()
+    body = shared_client.health()
+    return body if ok else JSONResponse(body, status_code=503)
+
 class StartPayload(BaseModel):
     property_id: str
     address: Optional[str] = None
@@ -18,11 +40,10 @@ class StartPayload(BaseModel):
     brf_id: Optional[str] = None
     municipality: Optional[str] = None
     optional_flags: Optional[Dict[str, Any]] = None
+    model_mode: Optional[str] = None
 
-@router.post("/start")
-async def start_workflow(p: StartPayload):
-    client = await get_client()
-    handle = await client.start_workflow(
+async def _start(client: Client, p: StartPayload):
+    return await client.start_workflow(
         PropertyValuationWorkflow.run,
         WorkflowInput(**p.model_dump()),
         id=f"prop-{p.property_id}",
@@ -32,44 +53,181 @@ async def start_workflow(p: StartPayload):
             "Municipality": [p.municipality or ""],
         },
     )
+
+@router.post("/start")
+async def start_workflow(p: StartPayload):
+    client = await _client()
+    handle = await _start(client, p)
     return {"workflow_id": handle.id, "run_id": handle.first_execution_run_id}
 
+def _bulk_ndjson(keys: Sequence[str], concurrency: int, run: Callable[[int], Awaitable[Dict[str, Any]]]) -> StreamingResponse:
+    # One NDJSON line per item as it finishes (with its request index), then a
+    # summary line. `concurrency` workers pull items, so thousands of items
+    # never mean thousands of in-flight RPCs. A repeated key is not sent
+    # again; it is reported as "duplicate" of the first occurrence.
+    first: Dict[str, int] = {}
+    todo: List[int] = []
+    for i, key in enumerate(keys):
+        if key in first:
+            continue
+        first[key] = i
+        todo.append(i)
+
+    async def lines() -> AsyncIterator[bytes]:
+        counts: Counter = Counter()
+        results: asyncio.Queue = asyncio.Queue()
+        pending = iter(todo)
+
+        async def worker() -> None:
+            for i in pending:
+                try:
+                    row = await run(i)
+                except Exception as e:
+                    row = {"key": keys[i], "status": "error", "error": f"{type(e).__name__}: {e}"}
+                await results.put({"index": i, **row})
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(todo)))]
+        try:
+            for i, key in enumerate(keys):
+                if first[key] != i:
+                    counts["duplicate"] += 1
+                    yield (json.dumps({"index": i, "key": key, "status": "duplicate", "duplicate_of": first[key]}) + "\n").encode()
+            for _ in todo:
+                row = await results.get()
+                counts[row["status"]] += 1
+                yield (json.dumps(row, default=str) + "\n").encode()
+            yield (json.dumps({"done": True, "total": len(keys), "counts": dict(counts)}) + "\n").encode()
+        finally:
+            # Client went away mid-stream: stop issuing RPCs
+            for w in workers:
+                w.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+class BulkStartPayload(BaseModel):
+    items: List[StartPayload] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    concurrency: int = Field(50, ge=1, le=500)
+
+@router.post("/start/bulk")
+async def start_workflows_bulk(p: BulkStartPayload):
+    # Idempotent per property: prop-{id} already running -> "already_running"
+    # with that run, never a second run; repeats within the request -> "duplicate"
+    client = await _client()
+
+    async def run(i: int) -> Dict[str, Any]:
+        item = p.items[i]
+        wf_id = f"prop-{item.property_id}"
+        try:
+            handle = await _start(client, item)
+        except WorkflowAlreadyStartedError as e:
+            return {"workflow_id": wf_id, "status": "already_running", "run_id": e.run_id}
+        return {"workflow_id": wf_id, "status": "started", "run_id": handle.first_execution_run_id}
+
+    return _bulk_ndjson([i.property_id for i in p.items], p.concurrency, run)
+
 class RevaluePayload(BaseModel):
     workflow_id: str
     overrides: Optional[Dict[str, Any]] = None
 
 @router.post("/revalue-now")
 async def revalue_now(p: RevaluePayload):
-    client = await get_client()
+    client = await _client()
     handle = client.get_workflow_handle(p.workflow_id)
     result = await handle.execute_update(PropertyValuationWorkflow.RevalueNow, args=[p.overrides or {}])
     return {"workflow_id": p.workflow_id, "result": result}
 
+class BulkRevaluePayload(BaseModel):
+    items: List[RevaluePayload] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    concurrency: int = Field(50, ge=1, le=500)
+
+@router.post("/revalue-now/bulk")
+async def revalue_now_bulk(p: BulkRevaluePayload):
+    # One update per workflow id; later items with the same id -> "duplicate"
+    client = await _client()
+
+    async def run(i: int) -> Dict[str, Any]:
+        item = p.items[i]
+        handle = client.get_workflow_handle(item.workflow_id)
+        try:
+            result = await handle.execute_update(PropertyValuationWorkflow.RevalueNow, args=[item.overrides or {}])
+        except WorkflowUpdateFailedError as e:
+            return {"workflow_id": item.workflow_id, "status": "failed", "error": str(e.cause or e)}
+        except RPCError as e:
+            if e.status != RPCStatusCode.NOT_FOUND:
+                raise
+            return {"workflow_id": item.workflow_id, "status": "not_found", "error": e.message}
+        return {"workflow_id": item.workflow_id, "status": "ok", "result": result}
+
+    return _bulk_ndjson([i.workflow_id for i in p.items], p.concurrency, run)
+
 class EvidencePayload(BaseModel):
     workflow_id: str
     evidence: Dict[str, Any]
 
 @router.post("/push-evidence")
 async def push_evidence(p: EvidencePayload):
-    client = await get_client()
+    client = await _client()
     handle = client.get_workflow_handle(p.workflow_id)
     await handle.signal(PropertyValuationWorkflow.PushExternalEvidence, p.evidence)
     return {"ok": True}
 
 @router.get("/progress")
 async def get_progress(workflow_id: str):
-    client = await get_client()
+    client = await _client()
     handle = client.get_workflow_handle(workflow_id)
     prog = await handle.query(PropertyValuationWorkflow.GetProgress)
     return {"workflow_id": workflow_id, "progress": prog}
 
 @router.get("/last-result")
 async def get_last_result(workflow_id: str):
-    client = await get_client()
+    client = await _client()
     handle = client.get_workflow_handle(workflow_id)
     res = await handle.query(PropertyValuationWorkflow.GetLastResult)
     return {"workflow_id": workflow_id, "last_result": res}
 
+@router.get("/timings")
+async def get_timings(workflow_id: str):
+    client = await _client()
+    handle = client.get_workflow_handle(workflow_id)
+    res = await handle.query(PropertyValuationWorkflow.GetTimings)
+    return {"workflow_id": workflow_id, "timings": res}
+
+class PortfolioPayload(BaseModel):
+    portfolio_id: str
+    items: Optional[List[StartPayload]] = None
+    source: Optional[str] = None  # NDJSON path readable by the worker
+    concurrency: int = Field(20, ge=1, le=500)
+    continue_every: int = Field(500, ge=1, le=5000)
+    model_mode: Optional[str] = None
+
+@router.post("/portfolio/start")
+async def start_portfolio(p: PortfolioPayload):
+    if (p.items is None) == (p.source is None):
+        raise HTTPException(status_code=400, detail="give exactly one of items or source")
+    client = await _client()
+    handle = await client.start_workflow(
+        PortfolioValuationWorkflow.run,
+        PortfolioInput(
+            portfolio_id=p.portfolio_id,
+            items=[WorkflowInput(**i.model_dump()) for i in p.items] if p.items is not None else None,
+            source=p.source,
+            concurrency=p.concurrency,
+            continue_every=p.continue_every,
+            model_mode=p.model_mode,
+        ),
+        id=f"portfolio-{p.portfolio_id}",
+        task_queue="prop-valuation",
+    )
+    return {"workflow_id": handle.id, "run_id": handle.first_execution_run_id}
+
+@router.get("/portfolio/progress")
+async def get_portfolio_progress(portfolio_id: str):
+    client = await _client()
+    # No run_id: follows continue-as-new to the current run
+    handle = client.get_workflow_handle(f"portfolio-{portfolio_id}")
+    prog = await handle.query(PortfolioValuationWorkflow.GetPortfolioProgress)
+    return {"portfolio_id": portfolio_id, "progress": prog}
+
 class SearchFilter(BaseModel):
     property_id: Optional[str] = None
     municipality: Optional[str] = None
@@ -77,7 +235,7 @@ class SearchFilter(BaseModel):
 
 @router.post("/workflows")
 async def list_workflows(f: SearchFilter):
-    client = await get_client()
+    client = await _client()
     query = "WorkflowType='PropertyValuationWorkflow'"
     if f.property_id:
         query += f" and PropertyId='{f.property_id}'"
@@ -111,8 +269,8 @@ class SchedulePayload(BaseModel):
 
 @router.post("/schedules/ensure-weekly")
 async def ensure_weekly(p: SchedulePayload):
-    client = await get_client()
-    from backend.temporal.schedules import ensure_weekly_schedule
+    client = await _client()
+    from temporal.schedules import ensure_weekly_schedule
     wf_id = f"prop-{p.property_id}"
     sched_id = f"sched-{p.property_id}"
     wf_input = [dict(
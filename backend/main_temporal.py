@@ -1,11 +1,25 @@
 
 from __future__ import annotations
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from api.temporal_routes import router as temporal_router
+from api.extraction_routes import router as extraction_router, jobs as extraction_jobs
+from temporal.client import shared_client
 
-app = FastAPI(title="RealEstate + Temporal API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Temporal client for the app's lifetime, health-checked and reconnected
+    await shared_client.start()
+    try:
+        yield
+    finally:
+        await shared_client.stop()
+        extraction_jobs.shutdown()
+
+app = FastAPI(title="RealEstate + Temporal API", lifespan=lifespan)
 app.include_router(temporal_router)
+app.include_router(extraction_router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8088)
@@ -0,0 +1,236 @@
+"""
+Batchextraktion av energideklarationer och OVK-protokoll
+Går igenom en katalog, fördelar filerna över en processpool och skriver
+ett NDJSON-resultat per dokument (samma postform som mock_hvac_100.json).
+Körningen kan återupptas efter krasch: redan skrivna poster hoppas över.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Set
+
+import fitz  # PyMuPDF
+
+from pdf_extractor import EnergideklarationExtractor
+from ovk_extractor import OVKProtokollExtractor
+
+PDF_SUFFIXES = {".pdf"}
+OVK_MARKERS = ("obligatorisk ventilationskontroll", "ovk", "intyg")
+ENERGI_MARKERS = ("energideklaration", "energiklass", "primärenergital")
+
+
+def available_cores() -> int:
+    """Antal kärnor som processen faktiskt får använda (affinitet/cgroup)."""
+    counter = getattr(os, "process_cpu_count", None) or os.cpu_count
+    return max(1, counter() or 1)
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def detect_protokoll_typ(path: str, first_page_text: str) -> str:
+    """Gissa protokolltyp från filnamn, annars från första sidans text."""
+    name = Path(path).name.lower()
+    if "ovk" in name:
+        return "ovk"
+    if "energi" in name:
+        return "energideklaration"
+    text = first_page_text.lower()
+    if any(m in text for m in ENERGI_MARKERS):
+        return "energideklaration"
+    if any(m in text for m in OVK_MARKERS):
+        return "ovk"
+    return "ovk"
+
+
+def extract_file(path: str, typ: str = "auto", sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extrahera ett dokument och bygg en NDJSON-post.
+    Körs i en arbetsprocess; får aldrig kasta undantag.
+    sha256 kan skickas med om anroparen redan har hashat filen.
+    """
+    started = time.perf_counter()
+    record: Dict[str, Any] = {
+        "path": path,
+        "typ": typ,
+        "ok": False,
+        "sha256": None,
+        "used_ocr": False,
+        "pages": 0,
+        "raw_text_preview": None,
+        "parsed": None,
+        "warnings": [],
+        "error": None,
+    }
+    try:
+        record["sha256"] = sha256 or sha256_file(path)
+        with fitz.open(path) as doc:
+            record["pages"] = doc.page_count
+            first_page_text = doc[0].get_text() if doc.page_count else ""
+        if typ == "auto":
+            typ = detect_protokoll_typ(path, first_page_text)
+        record["typ"] = typ
+
+        if typ == "ovk":
+            # Batchen är redan parallell per dokument; ingen sidpool per fil
+            result = OVKProtokollExtractor(page_workers=1).extract(path)
+            record["raw_text_preview"] = (result.raw_text or "")[:200]
+        else:
+            result = EnergideklarationExtractor().extract(path)
+        record["ok"] = result.success
+        record["parsed"] = result.data
+        record["warnings"] = list(result.warnings or [])
+        record["error"] = result.error
+        record["used_ocr"] = bool(getattr(result, "used_ocr", False))
+        if result.timings:
+            record["timings"] = result.timings
+    except Exception as e:
+        record["error"] = str(e)
+    record["sekunder"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+def iter_pdf_files(root: str) -> Iterator[str]:
+    """Alla PDF-filer under root, i stabil (sorterad) ordning."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if Path(name).suffix.lower() in PDF_SUFFIXES:
+                yield os.path.join(dirpath, name)
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """
+    Läs tidigare skrivna poster för att kunna återuppta.
+    En halvskriven sista rad (krasch mitt i skrivning) kapas bort.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        last_newline = data.rfind(b"\n")
+        if last_newline + 1 != len(data):
+            f.truncate(last_newline + 1)
+            data = data[:last_newline + 1]
+    for line in data.decode("utf-8").splitlines():
+        try:
+            done.add(json.loads(line)["path"])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    pages: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    def line(self) -> str:
+        return (
+            f"{self.done + self.skipped}/{self.total} dok  "
+            f"{self.done / self.elapsed:.1f} dok/s  "
+            f"{self.pages / self.elapsed:.1f} sidor/s  "
+            f"fel: {self.failed}"
+        )
+
+
+def batch_extract(
+    root: str,
+    output_path: str,
+    typ: str = "auto",
+    workers: Optional[int] = None,
+    resume: bool = True,
+    progress: bool = True,
+) -> BatchStats:
+    """
+    Extrahera alla PDF:er under root till output_path (NDJSON).
+    Varje post skrivs och flushas direkt så att en krasch högst tappar
+    dokumenten som var under bearbetning.
+    """
+    workers = workers or available_cores()
+    files: List[str] = list(iter_pdf_files(root))
+    completed = load_completed(output_path) if resume else set()
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+
+    stats = BatchStats(total=len(files))
+    pending_files = [p for p in files if p not in completed]
+    stats.skipped = len(files) - len(pending_files)
+
+    # Begränsa antal köade jobb så att tusentals filer inte ligger i minnet
+    max_in_flight = workers * 2
+    queue = iter(pending_files)
+    last_report = 0.0
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for path in queue:
+            in_flight.add(pool.submit(extract_file, path, typ))
+            if len(in_flight) >= max_in_flight:
+                break
+
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                record = fut.result()
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                stats.done += 1
+                stats.pages += record.get("pages") or 0
+                if not record["ok"]:
+                    stats.failed += 1
+                nxt = next(queue, None)
+                if nxt is not None:
+                    in_flight.add(pool.submit(extract_file, nxt, typ))
+
+            now = time.perf_counter()
+            if progress and now - last_report > 0.5:
+                print("\r" + stats.line(), end="", file=sys.stderr, flush=True)
+                last_report = now
+
+    if progress:
+        print("\r" + stats.line(), file=sys.stderr, flush=True)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batchextrahera protokoll-PDF:er till NDJSON")
+    parser.add_argument("root", help="Katalog med PDF:er (sökes rekursivt)")
+    parser.add_argument("-o", "--output", default="extraktion.ndjson", help="NDJSON-fil att skriva/återuppta")
+    parser.add_argument("--typ", choices=["auto", "ovk", "energideklaration"], default="auto")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Antal processer (standard: tillgängliga kärnor)")
+    parser.add_argument("--no-resume", action="store_true", help="Börja om från början")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Ingen löpande statusrad")
+    args = parser.parse_args()
+
+    stats = batch_extract(
+        args.root,
+        args.output,
+        typ=args.typ,
+        workers=args.workers,
+        resume=not args.no_resume,
+        progress=not args.quiet,
+    )
+    print(f"Klart: {stats.done} extraherade, {stats.skipped} redan klara, {stats.failed} fel")
+    sys.exit(1 if stats.failed else 0)
@@ -0,0 +1,181 @@
+"""
+Benchmark för EnergideklarationExtractor och OVKProtokollExtractor
+Kör varje extraktor över en syntetisk korpus (se synth_corpus.py) i en egen
+process och rapporterar dok/s, sidor/s, p50/p99-latens och högsta RSS.
+Resultatet sparas som JSON och kan jämföras mot en tidigare körning:
+
+    python bench_extract.py corpus/ -o bench_results/ny.json --compare bench_results/bas.json
+
+Exitkod 1 om något mått försämrats mer än --tolerance mot jämförelsen.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Dict, Any, List, Optional
+
+RESULT_SCHEMA = 1
+
+# Riktning per mått: +1 = högre är bättre, -1 = lägre är bättre
+METRICS = {
+    "docs_per_s": +1,
+    "pages_per_s": +1,
+    "p50_ms": -1,
+    "p99_ms": -1,
+    "peak_rss_mb": -1,
+}
+
+EXTRACTORS = {
+    "EnergideklarationExtractor": "energideklaration",
+    "OVKProtokollExtractor": "ovk",
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Närmaste-rang-percentil, q i [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def run_suite(extractor_name: str, files: List[Dict[str, Any]], corpus_dir: str, repeats: int, warmup: int) -> Dict[str, Any]:
+    """
+    Körs i en ny process så att högsta RSS gäller just denna extraktor.
+    """
+    from pdf_extractor import EnergideklarationExtractor
+    from ovk_extractor import OVKProtokollExtractor
+
+    def make():
+        if extractor_name == "OVKProtokollExtractor":
+            # En process per dokument: mäter extraktorn, inte sidpoolen
+            return OVKProtokollExtractor(page_workers=1)
+        return EnergideklarationExtractor()
+
+    paths = [(os.path.join(corpus_dir, f["path"]), f["pages"]) for f in files]
+    for path, _ in paths[:warmup]:
+        make().extract(path)
+
+    latencies: List[float] = []
+    pages = 0
+    failures = 0
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for path, n_pages in paths:
+            t0 = time.perf_counter()
+            result = make().extract(path)
+            latencies.append(time.perf_counter() - t0)
+            pages += n_pages
+            if not result.success:
+                failures += 1
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss är i kB på Linux och i byte på macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+    return {
+        "docs": len(latencies),
+        "pages": pages,
+        "failures": failures,
+        "seconds": round(elapsed, 4),
+        "docs_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "pages_per_s": round(pages / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def benchmark(corpus_dir: str, repeats: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    with open(os.path.join(corpus_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    results = {}
+    ctx = get_context("spawn")
+    for name, typ in EXTRACTORS.items():
+        files = [f for f in manifest["files"] if f["typ"] == typ]
+        if not files:
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[name] = pool.submit(run_suite, name, files, corpus_dir, repeats, warmup).result()
+
+    return {
+        "schema": RESULT_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "corpus": {k: manifest[k] for k in ("seed", "page_counts", "tables_per_page", "rows_per_table")}
+                  | {"files": len(manifest["files"])},
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Lista försämringar större än tolerance (andel) mot baseline"""
+    regressions = []
+    if current.get("corpus") != baseline.get("corpus"):
+        regressions.append("Korpusen skiljer sig från jämförelsen; måtten är inte jämförbara")
+        return regressions
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        for metric, direction in METRICS.items():
+            b, c = base.get(metric), cur.get(metric)
+            if not b or c is None:
+                continue
+            change = (c - b) / b * direction
+            if change < -tolerance:
+                regressions.append(f"{name}.{metric}: {b} -> {c} ({change * 100:+.1f} %)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark för protokollextraktorerna")
+    parser.add_argument("corpus", help="Katalog från synth_corpus.py (med manifest.json)")
+    parser.add_argument("-o", "--output", help="Spara resultatet som JSON")
+    parser.add_argument("--compare", help="Tidigare resultat-JSON att jämföra mot")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Tillåten försämring (andel), standard 0.15")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1)
+    args = parser.parse_args()
+
+    current = benchmark(args.corpus, args.repeats, args.warmup)
+    for name, r in current["results"].items():
+        print(f"{name:<28} {r['docs_per_s']:>8.2f} dok/s {r['pages_per_s']:>9.2f} sidor/s "
+              f"p50 {r['p50_ms']:>8.1f} ms  p99 {r['p99_ms']:>8.1f} ms  RSS {r['peak_rss_mb']:>7.1f} MB"
+              + (f"  fel {r['failures']}" if r["failures"] else ""))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,67 @@
+"""
+Tidsbudget för extraktion av ett dokument
+Extraktorerna kör många tillåtande regex över obetrodd text. Budgeten gör
+att ett trasigt dokument ger ett partiellt resultat med varningar i stället
+för att låsa en worker.
+
+Budgeten är kooperativ: CPython:s regexmotor går inte att avbryta mitt i en
+sökning, så ett fält som drar över sin fältbudget varnas för i efterhand och
+räknas av mot dokumentbudgeten. När dokumentbudgeten är slut hoppas
+återstående fält och sidor över. Mönster som visat sig superlinjära
+(se regex_fuzz.py) ska skrivas om, budgeten är skyddsnätet.
+"""
+import os
+import time
+from typing import Any, Callable, List, Optional
+
+DOKUMENT_BUDGET_S = float(os.getenv("EXTRACT_DOC_BUDGET_S", "60"))
+FALT_BUDGET_S = float(os.getenv("EXTRACT_FIELD_BUDGET_S", "2"))
+
+
+class Tidsbudget:
+    """Dokument- och fältbudget; None betyder obegränsat"""
+
+    def __init__(
+        self,
+        dokument_s: Optional[float] = DOKUMENT_BUDGET_S,
+        falt_s: Optional[float] = FALT_BUDGET_S,
+        clock: Callable[[], float] = time.perf_counter,
+        warnings: Optional[List[str]] = None,
+    ):
+        """warnings: lista att skriva varningar till, t.ex. extraktorns egen"""
+        self.dokument_s = dokument_s
+        self.falt_s = falt_s
+        self.clock = clock
+        self.started = clock()
+        self.warnings: List[str] = warnings if warnings is not None else []
+        self.skipped: List[str] = []
+
+    def restart(self) -> None:
+        self.started = self.clock()
+        self.skipped = []
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def exhausted(self) -> bool:
+        return self.dokument_s is not None and self.elapsed >= self.dokument_s
+
+    def skip(self, falt: str) -> None:
+        self.skipped.append(falt)
+        self.warnings.append(
+            f"Tidsbudget för dokumentet ({self.dokument_s:g} s) slut, hoppade över {falt}"
+        )
+
+    def run(self, falt: str, fn: Callable[..., Any], *args: Any, default: Any = None) -> Any:
+        """Kör fn(*args) om dokumentbudgeten räcker, annars default."""
+        if self.exhausted:
+            self.skip(falt)
+            return default
+        t0 = self.clock()
+        value = fn(*args)
+        dt = self.clock() - t0
+        if self.falt_s is not None and dt > self.falt_s:
+            self.warnings.append(f"{falt} tog {dt:.2f} s (fältbudget {self.falt_s:g} s)")
+        return value
@@ -0,0 +1,129 @@
+"""
+Claim check för stora Temporal-payloads
+Payloads större än CLAIM_CHECK_THRESHOLD (byte) läggs i ett lokalt
+blobförråd och ersätts i workflow-historiken av en referens (sha256 av
+innehållet). Codec:en körs i klient och worker, så aktiviteter och
+workflows ser alltid de fullständiga värdena; bara historiken krymper.
+
+Förrådet måste vara nåbart från alla workers och klienter som delar
+namespace (lokal disk räcker med en maskin, annars en delad volym).
+Blobbar tas aldrig bort automatiskt:
+
+    python claim_check.py prune --dagar 40
+
+Både skrivning och läsning (även replay och queries) räknas som
+användning. En blob kan ändå behövas så länge någon historik refererar
+den, så --dagar måste vara större än namespacets retention
+(CLAIM_CHECK_RETENTION_DAGAR) plus längsta workflow-körtid; prune vägrar
+annars.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+
+CLAIM_CHECK_DIR = Path(os.getenv("CLAIM_CHECK_DIR", "var/claim_check"))
+CLAIM_CHECK_THRESHOLD = int(os.getenv("CLAIM_CHECK_THRESHOLD", str(64 * 1024)))
+ENCODING = b"claim-check/sha256"
+# Namespacets retention i dagar; prune tar aldrig bort blobbar yngre än så
+CLAIM_CHECK_RETENTION_DAGAR = float(os.getenv("CLAIM_CHECK_RETENTION_DAGAR", "30"))
+
+
+class BlobStore:
+    """
+    Innehållsadresserade blobbar under <root>/<sha[:2]>/<sha>. Samma
+    payload lagras en gång; skrivningar är atomiska (tempfil + rename).
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or CLAIM_CHECK_DIR)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self._path(key)
+        if path.exists():
+            os.utime(path)  # håll blobben färsk för prune()
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return key
+
+    def get(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            raise LookupError(f"Claim-check-blob saknas: {key} (i {self.root})") from None
+        try:
+            os.utime(path)  # läsning är också användning, se prune()
+        except OSError:
+            pass
+        return data
+
+    def prune(self, max_age_s: float) -> int:
+        """Ta bort blobbar som inte skrivits eller lästs på max_age_s sekunder; returnerar antal"""
+        grans = time.time() - max_age_s
+        borttagna = 0
+        for path in self.root.glob("*/*"):
+            if path.suffix != ".tmp" and path.stat().st_mtime < grans:
+                path.unlink(missing_ok=True)
+                borttagna += 1
+        return borttagna
+
+
+class ClaimCheckCodec(PayloadCodec):
+    """PayloadCodec som byter stora payloads mot referenser i BlobStore"""
+
+    def __init__(self, store: Optional[BlobStore] = None, threshold: int = CLAIM_CHECK_THRESHOLD):
+        self.store = store or BlobStore()
+        self.threshold = threshold
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._encode(p) for p in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [await self._decode(p) for p in payloads]
+
+    async def _encode(self, payload: Payload) -> Payload:
+        if payload.ByteSize() <= self.threshold:
+            return payload
+        key = await asyncio.to_thread(self.store.put, payload.SerializeToString())
+        return Payload(metadata={"encoding": ENCODING}, data=key.encode())
+
+    async def _decode(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != ENCODING:
+            return payload
+        data = await asyncio.to_thread(self.store.get, payload.data.decode())
+        return Payload.FromString(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Underhåll av claim-check-förrådet")
+    parser.add_argument("--root", default=str(CLAIM_CHECK_DIR), help="Förrådskatalog (standard CLAIM_CHECK_DIR)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_prune = sub.add_parser("prune", help="Ta bort gamla blobbar")
+    p_prune.add_argument("--dagar", type=float, default=CLAIM_CHECK_RETENTION_DAGAR + 10,
+                         help="Minsta ålder; måste överstiga CLAIM_CHECK_RETENTION_DAGAR")
+    args = parser.parse_args()
+    if args.cmd == "prune" and args.dagar <= CLAIM_CHECK_RETENTION_DAGAR:
+        parser.error(
+            f"--dagar {args.dagar:g} är inte större än retention ({CLAIM_CHECK_RETENTION_DAGAR:g} dagar); "
+            "historik inom retention kan fortfarande referera blobbarna"
+        )
+
+    store = BlobStore(Path(args.root))
+    if args.cmd == "prune":
+        print(f"{store.prune(args.dagar * 86400)} blobbar borttagna")
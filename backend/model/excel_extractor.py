@@ -0,0 +1,135 @@
+"""
+OVK Excel Extractor
+Läser OVK-protokoll i Excel-format (.xlsx/.xlsm) strömmande: arbetsboken
+öppnas read-only och raderna itereras ett blad i taget utan att hela blad
+laddas i minnet. Tabellerna tolkas med samma rubrikmappning och radparsers
+som PDF-extraktorn, så B1/L1/K1/C1/D1 får samma form.
+"""
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+
+from openpyxl import load_workbook
+
+from budget import DOKUMENT_BUDGET_S, FALT_BUDGET_S
+from ovk_extractor import (
+    HeaderWindows,
+    OVKExtractResult,
+    OVKProtokollExtractor,
+    SECTION_PARSERS,
+    TABLE_SECTIONS,
+)
+
+
+def cell_text(value: Any) -> str:
+    """Cellvärde som text, i samma form som pdfplumber ger för tabellceller"""
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return (value.date() if isinstance(value, datetime) else value).isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def match_headers(cells: List[str]) -> Dict[str, Dict[int, str]]:
+    """{sektion: kolumnmappning} för alla sektioner som rubrikraden passar"""
+    out = {}
+    for sektion, (colmap_fn, _) in SECTION_PARSERS.items():
+        colmap = colmap_fn(cells)
+        if colmap is not None:
+            out[sektion] = colmap
+    return out
+
+
+class OVKExtractor:
+    def __init__(
+        self,
+        dokument_budget_s: Optional[float] = DOKUMENT_BUDGET_S,
+        falt_budget_s: Optional[float] = FALT_BUDGET_S,
+    ):
+        # Rubrikparsers (A-blankett, E1, INTYG) och tidsbudget delas med PDF-extraktorn
+        self._rubriker = OVKProtokollExtractor(
+            page_workers=1,
+            dokument_budget_s=dokument_budget_s,
+            falt_budget_s=falt_budget_s,
+            ocr=False,
+        )
+        self.warnings: List[str] = self._rubriker.warnings
+        self.budget = self._rubriker.budget
+
+    def iter_rows(self, path: str, header: Optional[HeaderWindows] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yielda (sektion, post) rad för rad över alla blad.
+
+        En tabell börjar vid en rad vars rubriker passar en eller flera
+        sektioner och slutar vid första tomma rad. Inne i en tabell räknas en
+        rad bara som ny rubrikrad om ingen aktiv sektion kan tolka den och den
+        saknar numeriska celler, så att fritextrader (t.ex. D1-åtgärder som
+        "Åtgärda …") inte tolkas som rubrik.
+        All celltext matas även till `header` för rubriksektionerna.
+        """
+        header = header if header is not None else HeaderWindows()
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                active: Dict[str, Dict[int, str]] = {}
+                for n, values in enumerate(ws.iter_rows(values_only=True), start=1):
+                    if self.budget.exhausted:
+                        self.budget.skip(f"rader från blad {ws.title} rad {n} och framåt")
+                        return
+                    cells = [cell_text(v) for v in values]
+                    if not any(cells):
+                        active = {}
+                        continue
+                    header.add(" ".join(c for c in cells if c) + "\n")
+
+                    if not active:
+                        active = match_headers(cells)
+                        continue
+
+                    items = []
+                    for sektion, colmap in active.items():
+                        item = SECTION_PARSERS[sektion][1](colmap, cells)
+                        if item is not None:
+                            items.append((sektion, item))
+                    # Ny tabell utan tom rad emellan: bara en rad som ingen
+                    # aktiv sektion kan tolka och som saknar tal får bli rubrik
+                    if not items and not any(isinstance(v, (int, float)) for v in values):
+                        matched = match_headers(cells)
+                        if matched:
+                            active = matched
+                            continue
+                    yield from items
+        finally:
+            # read-only-läget håller filen öppen tills arbetsboken stängs
+            wb.close()
+
+    def extract(self, path: str) -> OVKExtractResult:
+        self.budget.restart()
+        header = HeaderWindows()
+        rows: Dict[str, List[Dict[str, Any]]] = {sektion: [] for sektion in TABLE_SECTIONS}
+        try:
+            for sektion, item in self.iter_rows(path, header):
+                rows[sektion].append(item)
+        except Exception as e:
+            return OVKExtractResult(success=False, error=str(e), warnings=self.warnings)
+
+        result = self._rubriker.finish(header)
+        result.data.update(rows)
+        if not any(rows.values()):
+            self.warnings.append("Inga OVK-tabeller hittades i arbetsboken")
+        return result
+
+
+if __name__ == "__main__":
+    import sys, json
+    if len(sys.argv) < 2:
+        print("Usage: python excel_extractor.py <path_to_ovk_xlsm>")
+        sys.exit(1)
+    result = OVKExtractor().extract(sys.argv[1])
+    print(json.dumps({
+        "success": result.success,
+        "warnings": result.warnings,
+        "error": result.error,
+        "data": result.data
+    }, ensure_ascii=False, indent=2))
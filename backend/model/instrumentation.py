@@ -0,0 +1,165 @@
+"""
+Tidmätning och profilering av extraktorerna
+Med EXTRACT_TIMINGS=1 (eller instrument=True) mäts väggtid och antal anrop
+för varje steg (_read_*/_extract_*/_parse_*/...) och läggs på resultatet
+som `timings`. Tiderna är inklusive anropade steg. Summorna samlas också
+per process i METRICS och kan exporteras i Prometheus-textformat.
+
+Med EXTRACT_PROFILE_DIR satt körs varje extract() under cProfile och
+profilen sparas (.prof) för dokument långsammare än
+EXTRACT_PROFILE_THRESHOLD_S. Visa med t.ex. `snakeviz fil.prof` eller gör
+en flamegraph med `flameprof fil.prof > fil.svg`.
+"""
+import os
+import re
+import time
+import cProfile
+import functools
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+TIMINGS_ENABLED = os.getenv("EXTRACT_TIMINGS", "0") == "1"
+PROFILE_DIR = os.getenv("EXTRACT_PROFILE_DIR") or None
+PROFILE_THRESHOLD_S = float(os.getenv("EXTRACT_PROFILE_THRESHOLD_S", "5"))
+
+STEG_PREFIX = ("_read_", "_extract_", "_parse_", "_ocr_", "_detect_")
+
+
+class Timings:
+    """Väggtid och antal anrop per steg för ett dokument"""
+
+    def __init__(self):
+        self.steg: Dict[str, list] = {}
+
+    def reset(self) -> None:
+        self.steg = {}
+
+    def add(self, namn: str, sekunder: float) -> None:
+        s = self.steg.setdefault(namn, [0, 0.0])
+        s[0] += 1
+        s[1] += sekunder
+
+    @contextmanager
+    def stage(self, namn: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(namn, time.perf_counter() - t0)
+
+    def wrap(self, namn: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(namn, time.perf_counter() - t0)
+        return timed
+
+    def instrument(self, obj: Any, prefix: Tuple[str, ...] = STEG_PREFIX) -> None:
+        """Byt ut stegmetoderna på just denna instans mot tidtagande varianter"""
+        for namn in dir(type(obj)):
+            if namn.startswith(prefix) and callable(getattr(obj, namn)):
+                setattr(obj, namn, self.wrap(namn, getattr(obj, namn)))
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            namn: {"calls": n, "ms": round(s * 1000, 3)}
+            for namn, (n, s) in sorted(self.steg.items(), key=lambda kv: -kv[1][1])
+        }
+
+
+class Metrics:
+    """Processvida summor per extraktor och steg"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dokument: Dict[str, int] = {}
+        self.steg: Dict[Tuple[str, str], list] = {}
+
+    def record(self, extractor: str, timings: Dict[str, Dict[str, float]]) -> None:
+        with self._lock:
+            self.dokument[extractor] = self.dokument.get(extractor, 0) + 1
+            for namn, t in timings.items():
+                s = self.steg.setdefault((extractor, namn), [0, 0.0])
+                s[0] += t["calls"]
+                s[1] += t["ms"] / 1000
+
+    def prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP extract_documents_total Documents extracted with timings enabled.",
+                "# TYPE extract_documents_total counter",
+            ]
+            for extractor, n in sorted(self.dokument.items()):
+                lines.append(f'extract_documents_total{{extractor="{extractor}"}} {n}')
+            lines += [
+                "# HELP extract_stage_seconds_total Wall time spent per extraction stage (inclusive).",
+                "# TYPE extract_stage_seconds_total counter",
+            ]
+            for (extractor, namn), (_, s) in sorted(self.steg.items()):
+                lines.append(f'extract_stage_seconds_total{{extractor="{extractor}",stage="{namn}"}} {s:.6f}')
+            lines += [
+                "# HELP extract_stage_calls_total Calls per extraction stage.",
+                "# TYPE extract_stage_calls_total counter",
+            ]
+            for (extractor, namn), (n, _) in sorted(self.steg.items()):
+                lines.append(f'extract_stage_calls_total{{extractor="{extractor}",stage="{namn}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def maybe_profile(namn: str, pdf_path: str) -> Iterator[None]:
+    """cProfile runt blocket om EXTRACT_PROFILE_DIR är satt; sparas bara för långsamma dokument"""
+    if not PROFILE_DIR:
+        yield
+        return
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= PROFILE_THRESHOLD_S:
+            Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+            stem = re.sub(r"[^\w.-]", "_", Path(pdf_path).stem)
+            prof.dump_stats(os.path.join(PROFILE_DIR, f"{namn}-{stem}-{int(time.time())}-{elapsed:.1f}s.prof"))
+
+
+def instrumented(method: Callable) -> Callable:
+    """
+    Dekorator för extract(): nollställer stegtiderna, mäter totaltiden,
+    profilerar vid behov och lägger `timings` på resultatet.
+    """
+    @functools.wraps(method)
+    def wrapper(self, pdf_path: str, *args, **kwargs):
+        namn = type(self).__name__
+        timings: Optional[Timings] = getattr(self, "timings", None)
+        if timings is not None:
+            timings.reset()
+        t0 = time.perf_counter()
+        with maybe_profile(namn, pdf_path):
+            result = method(self, pdf_path, *args, **kwargs)
+        if timings is not None:
+            timings.add("total", time.perf_counter() - t0)
+            result.timings = timings.as_dict()
+            METRICS.record(namn, result.timings)
+        return result
+    return wrapper
+
+
+def make_timings(instrument: Optional[bool], obj: Any) -> Optional[Timings]:
+    """Timings för en extraktorinstans, eller None om mätning är avslagen"""
+    if not (TIMINGS_ENABLED if instrument is None else instrument):
+        return None
+    timings = Timings()
+    timings.instrument(obj)
+    return timings
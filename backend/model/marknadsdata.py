@@ -0,0 +1,65 @@
+"""
+Marknadsdata (Booli/Hemnet/SCB) för fastighetsvärderingen
+
+Ligger utanför workflow.py: modulen importerar temporal/-paketet (områdescache
+och HTTP-klient) och lägger därför backend/ på sys.path, vilket inte får
+köras i workflow-sandlådan. workflow.py importerar den passerad genom.
+"""
+import sys
+from pathlib import Path
+from temporalio import activity
+
+from models import MarknadsData
+
+# Marknadscachen delas med temporal/-workern och ligger där
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+from temporal.cache import SingleFlightCache, area_key, MARKET_CACHE_TTL_S, MARKET_CACHE_MAX  # noqa: E402
+from temporal import providers  # noqa: E402
+
+
+# Per workerprocess; nyckel = område (postnummer/kommun), se temporal/cache.py
+MARKNAD_CACHE: SingleFlightCache[MarknadsData] = SingleFlightCache("marknadsdata", MARKET_CACHE_TTL_S, MARKET_CACHE_MAX)
+
+
+@activity.defn
+async def hamta_marknadsdata(adress: str, boyta: float) -> MarknadsData:
+    """
+    Steg 2: Hämta marknadsdata från Booli/Hemnet/SCB
+    """
+    activity.logger.info(f"Hämtar marknadsdata för {adress}")
+    
+    # Områdesdata: samma postnummer delar ett anrop per TTL, även när
+    # hundratals värderingar i området körs samtidigt
+    return await MARKNAD_CACHE.get(area_key(adress), lambda: _hamta_marknadsdata(adress))
+
+
+async def _hamta_marknadsdata(adress: str) -> MarknadsData:
+    # Med MARKET_PROVIDERS=1 hämtas data från Booli/Hemnet/SCB via den
+    # gemensamma, poolade klienten i temporal/providers.py (keep-alive,
+    # HTTP-cache, omförsök). Annars placeholder-data.
+    if providers.MARKET_PROVIDERS:
+        data = await providers.market_snapshot(adress)
+        return MarknadsData(
+            senaste_forsaljningar=[
+                {'pris': s.get('price'), 'datum': s.get('sold_date'), 'boyta': s.get('living_area')}
+                for s in data['sales']
+            ],
+            genomsnittspris_omrade=data['price_per_m2'],
+            befolkning_omrade=data['population'],
+            inkomst_medel=data['income_mean']
+        )
+    
+    # Placeholder-data
+    marknadsdata = MarknadsData(
+        senaste_forsaljningar=[
+            {'pris': 3950000, 'datum': '2024-08-15', 'boyta': 64},
+            {'pris': 4100000, 'datum': '2024-06-20', 'boyta': 68}
+        ],
+        genomsnittspris_omrade=61720.0,  # kr/m²
+        befolkning_omrade=75000,
+        inkomst_medel=35000.0
+    )
+    
+    return marknadsdata
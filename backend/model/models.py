@@ -45,7 +45,7 @@ class VentilationsTyp(str, Enum):
     SJALVDRAG = "Självdrag"
 
 
-@dataclass
+@dataclass(slots=True)
 class Energideklaration:
     """Data från energideklaration"""
     # Required fields först
@@ -57,11 +57,11 @@ class Energideklaration:
     nybyggnadsar: int
     atemp: float  # m²
     byggnadskategori: str
-    energiklass: Energiklass
+    energiklass: Optional[Energiklass]  # None om tidsbudgeten tog slut
     primärenergital: float  # kWh/m² och år
     specifik_energianvandning: float  # kWh/m² och år
     energianvandning_totalt: float  # kWh/år
-    uppvarmningssystem: Uppvarmningssystem
+    uppvarmningssystem: Optional[Uppvarmningssystem]
     
     # Optional fields sist
     antal_lagenheter: Optional[int] = None
@@ -86,7 +86,7 @@ class Energideklaration:
     fastighetsel: Optional[float] = None  # kWh
 
 
-@dataclass
+@dataclass(slots=True)
 class OVKData:
     """Data från OVK-protokoll (Obligatorisk Ventilationskontroll)"""
     ventilationstyp: VentilationsTyp
@@ -106,7 +106,7 @@ class OVKData:
     atgarder_rekommenderade: Optional[List[str]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class MarknadsData:
     """Data från Booli/Hemnet/SCB"""
     # Booli/Hemnet
@@ -120,7 +120,7 @@ class MarknadsData:
     pendlingsavstand: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PropertyHealthIndex:
     """Beräknad hälsoindex för fastighet"""
     index_varde: float  # 0-100
@@ -140,7 +140,7 @@ class PropertyHealthIndex:
     faktorer_negativa: List[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class Vardering:
     """AI-genererad värdering"""
     vardeintervall_min: float  # SEK
@@ -159,7 +159,7 @@ class Vardering:
     jamforelse_liknande: Optional[float] = None  # % över/under liknande objekt
 
 
-@dataclass
+@dataclass(slots=True)
 class Riskmodell:
     """AI-genererad riskbedömning"""
     halso_riskindex: float  # 0-100
@@ -175,7 +175,7 @@ class Riskmodell:
     prioriterade_atgarder: List[Dict]  # {'åtgärd': str, 'kostnad': float, 'prioritet': int}
 
 
-@dataclass
+@dataclass(slots=True)
 class KompletteradVardering:
     """Slutlig komplett värdering med alla data"""
     # Grunddata
@@ -205,7 +205,7 @@ class KompletteradVardering:
     version: str = "1.0"
 
 
-@dataclass
+@dataclass(slots=True)
 class ProtokollInput:
     """Input för protokollextraktion"""
     file_path: str
@@ -213,13 +213,14 @@ class ProtokollInput:
     protokoll_typ: str  # 'energideklaration', 'ovk', 'besiktning'
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtraktionsResultat:
     """Resultat från extraktion"""
     success: bool
     data: Optional[Dict]
     error: Optional[str] = None
     warnings: List[str] = None
+    timings: Optional[Dict] = None  # stegtider, se instrumentation.py
     
     def __post_init__(self):
         if self.warnings is None:
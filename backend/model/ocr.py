@@ -0,0 +1,109 @@
+"""
+OCR-fallback för inskannade protokoll
+Rastrerar bara sidor utan textlager och kör en lokalt installerad
+Tesseract på dem, parallellt över en processpool. Texten cachas per
+sidhash (page_cache.py) så att en sida aldrig OCR:as två gånger.
+"""
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from page_cache import PageCache, page_hash
+
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+OCR_LANG = os.getenv("OCR_LANG", "swe")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+
+
+def ocr_available() -> bool:
+    return shutil.which(TESSERACT_CMD) is not None
+
+
+def _ocr_page(pdf_path: str, page_no: int, dpi: int, lang: str) -> str:
+    """Rastrera en sida i gråskala och kör Tesseract (arbetsprocess)"""
+    with fitz.open(pdf_path) as doc:
+        pix = doc[page_no].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        png = pix.tobytes("png")
+    # Poolen står för parallelliteten; en tråd per Tesseract-process
+    env = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+    proc = subprocess.run(
+        [TESSERACT_CMD, "stdin", "stdout", "-l", lang],
+        input=png,
+        capture_output=True,
+        check=True,
+        env=env,
+    )
+    return proc.stdout.decode("utf-8", errors="replace")
+
+
+def iter_ocr_pages(
+    pdf_path: str,
+    page_numbers: Iterable[int],
+    workers: Optional[int] = None,
+    lang: str = OCR_LANG,
+    dpi: int = OCR_DPI,
+    cache: Optional[PageCache] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    OCR:a de angivna sidorna och yielda (sidnr, text) i den givna ordningen.
+    En sida släpps så fort den och alla före den är klara, så att anroparen
+    kan arbeta vidare medan poolen OCR:ar resten. Cacheträffar rastreras
+    inte ens; bara missar skickas till poolen.
+    """
+    cache = cache or PageCache("ocr")
+    page_numbers = list(page_numbers)
+    with fitz.open(pdf_path) as doc:
+        keys = {p: f"{page_hash(doc, p)}-{lang}-{dpi}" for p in page_numbers}
+
+    out: Dict[int, str] = {}
+    todo = []
+    for p in page_numbers:
+        hit = cache.get(keys[p])
+        if hit is not None:
+            out[p] = hit["text"]
+        else:
+            todo.append(p)
+
+    def done(p: int, text: str) -> None:
+        cache.put(keys[p], {"text": text})
+        out[p] = text
+
+    nasta = 0
+    workers = min(workers or os.cpu_count() or 1, len(todo)) if todo else 1
+    if workers == 1:
+        for p in page_numbers:
+            if p not in out:
+                done(p, _ocr_page(pdf_path, p, dpi, lang))
+            yield p, out.pop(p)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(_ocr_page, pdf_path, p, dpi, lang): p for p in todo}
+        for fut in as_completed(futures):
+            done(futures[fut], fut.result())
+            while nasta < len(page_numbers) and page_numbers[nasta] in out:
+                p = page_numbers[nasta]
+                nasta += 1
+                yield p, out.pop(p)
+    finally:
+        # Avbruten iteration eller fel: starta inga fler sidor
+        pool.shutdown(wait=True, cancel_futures=True)
+    for p in page_numbers[nasta:]:
+        yield p, out.pop(p)
+
+
+def ocr_pages(
+    pdf_path: str,
+    page_numbers: Iterable[int],
+    workers: Optional[int] = None,
+    lang: str = OCR_LANG,
+    dpi: int = OCR_DPI,
+    cache: Optional[PageCache] = None,
+) -> Dict[int, str]:
+    """OCR:a de angivna sidorna, {sidnr: text}"""
+    return dict(iter_ocr_pages(pdf_path, page_numbers, workers=workers, lang=lang, dpi=dpi, cache=cache))
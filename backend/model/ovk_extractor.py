@@ -1,10 +1,16 @@
 
 import re
-from typing import Optional, Dict, Any, List
+import os
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Union
 from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 import pdfplumber
 from datetime import datetime
+from budget import Tidsbudget, DOKUMENT_BUDGET_S, FALT_BUDGET_S
+from ocr import ocr_available, ocr_pages, iter_ocr_pages
+from instrumentation import instrumented, make_timings
+from page_cache import PageCache, page_hash, page_keys, contiguous_runs, page_cache_enabled
 
 HEADER_VARIANTS = {
     "plats": {"plats", "rum", "beteckning", "uttag", "donplats"},
@@ -52,6 +58,195 @@ def map_headers_to_keys(headers: List[str], mapping: Dict[str, set]) -> Dict[int
                     break
     return colmap
 
+# ---------------- Rad-tolkning per tabellsektion ----------------
+# Varje sektion har en rubrikfunktion (kolumnmappning, eller None om
+# rubrikraden inte hör till sektionen) och en radfunktion (en post, eller
+# None om raden ska hoppas över). Delas av PDF- och Excel-extraktorn.
+
+def _cells(colmap: Dict[int, str], row: List[str]) -> Iterator[Tuple[str, str]]:
+    for idx, key in colmap.items():
+        if idx < len(row):
+            yield key, (row[idx] or "").strip()
+
+def b1_colmap(header: List[str]) -> Optional[Dict[int, str]]:
+    colmap = map_headers_to_keys(header, {
+        "plats": HEADER_VARIANTS["plats"],
+        "don_typ": HEADER_VARIANTS["don_typ"],
+        "proj_ls": HEADER_VARIANTS["proj_ls"],
+        "uppm_ls": HEADER_VARIANTS["uppm_ls"],
+        "matmetod": HEADER_VARIANTS["matmetod"],
+        "anm": HEADER_VARIANTS["anm"],
+    })
+    if "proj_ls" in colmap.values() and "uppm_ls" in colmap.values():
+        return colmap
+    return None
+
+def b1_row(colmap: Dict[int, str], row: List[str]) -> Optional[Dict[str, Any]]:
+    item = {}
+    for key, val in _cells(colmap, row):
+        if key in {"proj_ls", "uppm_ls"}:
+            item[key] = as_number(val)
+        else:
+            item[key] = val
+    if "proj_ls" in item or "uppm_ls" in item:
+        return item
+    return None
+
+def l1_colmap(header: List[str]) -> Optional[Dict[int, str]]:
+    colmap = map_headers_to_keys(header, {
+        "rum": HEADER_VARIANTS["rum"],
+        "tilluft_proj": HEADER_VARIANTS["tilluft_proj"],
+        "tilluft_uppm": HEADER_VARIANTS["tilluft_uppm"],
+        "franluft_proj": HEADER_VARIANTS["franluft_proj"],
+        "franluft_uppm": HEADER_VARIANTS["franluft_uppm"],
+    })
+    if any(k in colmap.values() for k in ["tilluft_proj", "tilluft_uppm", "franluft_proj", "franluft_uppm"]):
+        return colmap
+    return None
+
+def l1_row(colmap: Dict[int, str], row: List[str]) -> Optional[Dict[str, Any]]:
+    item = {"tilluft": {}, "franluft": {}}
+    for key, val in _cells(colmap, row):
+        if key == "rum":
+            item["rum"] = val
+        elif key == "tilluft_proj":
+            item["tilluft"]["proj_ls"] = as_number(val)
+        elif key == "tilluft_uppm":
+            item["tilluft"]["uppm_ls"] = as_number(val)
+        elif key == "franluft_proj":
+            item["franluft"]["proj_ls"] = as_number(val)
+        elif key == "franluft_uppm":
+            item["franluft"]["uppm_ls"] = as_number(val)
+    t = item["tilluft"].get("uppm_ls")
+    f = item["franluft"].get("uppm_ls")
+    if t is not None and f is not None:
+        item["balans_ls"] = round(t - f, 2)
+    return item
+
+def k1_colmap(header: List[str]) -> Optional[Dict[int, str]]:
+    colmap = map_headers_to_keys(header, {
+        "rum": HEADER_VARIANTS["rum"],
+        "temp_c": HEADER_VARIANTS["temp_c"],
+        "co2_ppm": HEADER_VARIANTS["co2_ppm"],
+        "drag": HEADER_VARIANTS["drag"]
+    })
+    if any(k in colmap.values() for k in ["temp_c", "co2_ppm"]):
+        return colmap
+    return None
+
+def k1_row(colmap: Dict[int, str], row: List[str]) -> Optional[Dict[str, Any]]:
+    item = {}
+    for key, val in _cells(colmap, row):
+        if key == "temp_c":
+            item["inomhustemp_c"] = as_number(val)
+        elif key == "co2_ppm":
+            item["co2_ppm"] = as_number(val)
+        elif key == "drag":
+            item["drag"] = val
+        elif key == "rum":
+            item["benamning"] = val
+    return item
+
+def c1_colmap(header: List[str]) -> Optional[Dict[int, str]]:
+    colmap = map_headers_to_keys(header, {
+        "anm": HEADER_VARIANTS["anm"],
+        "klassning": HEADER_VARIANTS["klassning"]
+    })
+    return colmap if "anm" in colmap.values() else None
+
+def c1_row(colmap: Dict[int, str], row: List[str]) -> Optional[Dict[str, Any]]:
+    item: Dict[str, Any] = {}
+    for key, val in _cells(colmap, row):
+        if key == "klassning":
+            item["klassning"] = val
+        elif key == "anm":
+            item["anmärkning"] = val
+    return item or None
+
+def d1_colmap(header: List[str]) -> Optional[Dict[int, str]]:
+    colmap = map_headers_to_keys(header, {
+        "atgard": HEADER_VARIANTS["atgard"],
+        "ansvarig": HEADER_VARIANTS["ansvarig"],
+        "deadline": HEADER_VARIANTS["deadline"],
+        "status": HEADER_VARIANTS["status"]
+    })
+    return colmap if "atgard" in colmap.values() else None
+
+def d1_row(colmap: Dict[int, str], row: List[str]) -> Optional[Dict[str, Any]]:
+    item: Dict[str, Any] = {}
+    for key, val in _cells(colmap, row):
+        if key == "deadline":
+            val2 = val.replace("/", "-")
+            try:
+                if re.match(r"\d{2}-\d{2}-\d{4}", val2):
+                    val2 = datetime.strptime(val2, "%d-%m-%Y").date().isoformat()
+                elif re.match(r"\d{4}-\d{2}-\d{2}", val2):
+                    val2 = datetime.strptime(val2, "%Y-%m-%d").date().isoformat()
+            except Exception:
+                pass
+            item["deadline"] = val2
+        elif key == "atgard":
+            item["beskrivning"] = val
+        else:
+            item[key] = val
+    return item
+
+SECTION_PARSERS = {
+    "B1": (b1_colmap, b1_row),
+    "L1": (l1_colmap, l1_row),
+    "K1": (k1_colmap, k1_row),
+    "C1": (c1_colmap, c1_row),
+    "D1": (d1_colmap, d1_row),
+}
+
+
+# Under denna sidgräns läses tabeller i en process; uppstarten av en
+# processpool kostar mer än den sparar på korta protokoll.
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("OVK_PARALLEL_PAGE_THRESHOLD", "40"))
+
+# iter_pages OCR:ar sidor utan textlager i fönster om så här många sidor, så
+# att OCR-poolen får flera sidor åt gången utan att hela dokumentet läses först.
+# Sidorna släpps en och en när de är klara; fönstret bestämmer bara hur långt
+# före poolen ligger (och hur mycket som OCR:as i onödan om extraktionen avbryts)
+OCR_WINDOW_PAGES = int(os.getenv("OVK_OCR_WINDOW_PAGES", "16"))
+
+# Ingår i sidcachens nyckel; höj när text-, tabell- eller radtolkningen ändras
+PAGE_CACHE_VERSION = f"ovk-1-pdfplumber-{pdfplumber.__version__}"
+
+
+def _extract_tables_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, List[List[List[str]]], List[str]]]:
+    """
+    Läs tabeller för sidorna [start, end) i en arbetsprocess.
+    Returnerar (sidnr, tabeller, varningar) per sida så att anroparen kan
+    slå ihop resultaten i sidordning.
+    """
+    out = []
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for offset, page in enumerate(pdf.pages):
+            warnings: List[str] = []
+            try:
+                tbls = page.extract_tables() or []
+            except Exception as e:
+                tbls = []
+                warnings.append(f"Kunde inte läsa tabeller på en sida: {e}")
+            out.append((start + offset, tbls, warnings))
+    return out
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Dela [0, page_count) i högst `parts` sammanhängande, lika stora intervall."""
+    parts = max(1, min(parts, page_count))
+    step, rest = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + step + (1 if i < rest else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
 @dataclass
 class OVKExtractResult:
     success: bool
@@ -59,6 +254,70 @@ class OVKExtractResult:
     warnings: List[str] = field(default_factory=list)
     error: Optional[str] = None
     raw_text: Optional[str] = None
+    used_ocr: bool = False
+    timings: Optional[Dict[str, Dict[str, float]]] = None
+
+
+TABLE_SECTIONS = ("B1", "L1", "K1", "C1", "D1")
+
+# Etiketter som rubrikparsers (A-blankett, E1, INTYG) letar efter. I
+# strömmande läge sparas bara text runt dessa, inte hela dokumentet.
+HEADER_KEYWORDS = re.compile(
+    r"INTYG|Fastighet\s*beteckning|Fastighetsbeteckning|Adress|Gata|System(?:typ|nummer|nr)|"
+    r"Ventilationssystem|Verksamhet|Byggnadstyp|Bruttoarea|Bruksarea|BRA|Antal\s+lägenheter|"
+    r"Besiktnings|Certifikat|Behörighet|Datum|Projekterat|Proj\.|Uppmätt|Uppm\.|SFP|filter|"
+    r"återvinning|Värmebatteri|Kyla|Nästa",
+    re.I,
+)
+HEADER_HEAD_CHARS = 20000
+HEADER_WINDOW_CHARS = 300
+HEADER_MAX_CHARS = 80000
+
+
+@dataclass
+class HeaderWindows:
+    """
+    Begränsad textbuffert för rubrikparsers i strömmande läge.
+    Början av dokumentet (där A-blankett, E1 och INTYG brukar stå) sparas
+    ordagrant; från senare sidor sparas bara fönster runt kända etiketter.
+    Dataklassen är serialiserbar så att den kan checkpointas.
+    """
+    head: str = ""
+    windows: List[str] = field(default_factory=list)
+    size: int = 0
+
+    def add(self, page_text: str) -> None:
+        if len(self.head) < HEADER_HEAD_CHARS:
+            room = HEADER_HEAD_CHARS - len(self.head)
+            self.head += page_text[:room]
+            page_text = page_text[room:]
+        if not page_text or self.size >= HEADER_MAX_CHARS:
+            return
+        last_end = -1
+        for m in HEADER_KEYWORDS.finditer(page_text):
+            if m.start() < last_end:
+                continue
+            start = max(0, m.start() - HEADER_WINDOW_CHARS)
+            end = min(len(page_text), m.end() + HEADER_WINDOW_CHARS)
+            window = page_text[max(start, last_end):end]
+            last_end = end
+            self.windows.append(window)
+            self.size += len(window)
+            if self.size >= HEADER_MAX_CHARS:
+                break
+
+    def text(self) -> str:
+        return "\n".join([self.head] + self.windows)
+
+
+@dataclass
+class OVKPageRows:
+    """Tabellrader (B1/L1/K1/C1/D1) från en sida i strömmande läge"""
+    page: int
+    rows: Dict[str, List[Dict[str, Any]]]
+    warnings: List[str] = field(default_factory=list)
+    has_text: bool = True
+
 
 class OVKProtokollExtractor:
     def _detect_systemtyp(self, text: str):
@@ -95,29 +354,66 @@ class OVKProtokollExtractor:
 
         return None
 
-    def __init__(self):
+    def __init__(
+        self,
+        page_workers: Optional[int] = None,
+        parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+        dokument_budget_s: Optional[float] = DOKUMENT_BUDGET_S,
+        falt_budget_s: Optional[float] = FALT_BUDGET_S,
+        ocr: Optional[bool] = None,
+        instrument: Optional[bool] = None,
+        page_cache: Optional[bool] = None,
+    ):
+        """
+        page_workers: antal processer för sidparallell tabellextraktion och OCR
+                      (None = alla kärnor, 1 = alltid en process).
+        parallel_threshold: minsta sidantal för att dela upp dokumentet.
+        dokument_budget_s/falt_budget_s: tidsbudget, se budget.py (None = obegränsat).
+        ocr: OCR:a sidor utan textlager (None = om Tesseract finns installerat).
+        instrument: mät stegtider (None = EXTRACT_TIMINGS), se instrumentation.py.
+        page_cache: återanvänd text, tabeller och rader för sidor vars innehåll
+                    inte ändrats (None = EXTRACT_PAGE_CACHE), se page_cache.py.
+        """
         self.warnings: List[str] = []
-
+        self.page_workers = page_workers
+        self.parallel_threshold = parallel_threshold
+        self.budget = Tidsbudget(dokument_budget_s, falt_budget_s, warnings=self.warnings)
+        self.ocr = ocr_available() if ocr is None else ocr
+        self.used_ocr = False
+        self.timings = make_timings(instrument, self)
+        self.page_cache = PageCache("pages") if page_cache_enabled(page_cache) else None
+        self.cached_pages = 0
+
+    def _falt(self, namn: str, fn, arg: Any, default: Any) -> Any:
+        """Kör en sektionsparser inom dokumentets tidsbudget"""
+        return self.budget.run(namn, fn, arg, default=default)
+
+    @instrumented
     def extract(self, pdf_path: str) -> OVKExtractResult:
+        self.budget.restart()
+        self.used_ocr = False
+        self.cached_pages = 0
         try:
+            if self.page_cache is not None:
+                return self._extract_incremental(pdf_path)
             full_text = self._read_text(pdf_path)
             parsed = {
-                "A_Blankett": self._parse_a_blankett(full_text),
-                "E1": self._parse_e1(full_text),
+                "A_Blankett": self._falt("A_Blankett", self._parse_a_blankett, full_text, {}),
+                "E1": self._falt("E1", self._parse_e1, full_text, {}),
                 "B1": [],
                 "L1": [],
                 "K1": [],
                 "C1": [],
                 "D1": [],
-                "Intyg": self._parse_intyg(full_text)
+                "Intyg": self._falt("Intyg", self._parse_intyg, full_text, {})
             }
 
             tables = self._extract_tables(pdf_path)
-            b1 = self._parse_b1_tables(tables)
-            l1 = self._parse_l1_tables(tables)
-            k1 = self._parse_k1_tables(tables)
-            c1 = self._parse_c1_tables(tables)
-            d1 = self._parse_d1_tables(tables)
+            b1 = self._falt("B1", self._parse_b1_tables, tables, [])
+            l1 = self._falt("L1", self._parse_l1_tables, tables, [])
+            k1 = self._falt("K1", self._parse_k1_tables, tables, [])
+            c1 = self._falt("C1", self._parse_c1_tables, tables, [])
+            d1 = self._falt("D1", self._parse_d1_tables, tables, [])
 
             if b1: parsed["B1"] = b1
             if l1: parsed["L1"] = l1
@@ -129,24 +425,128 @@ class OVKProtokollExtractor:
                 success=True,
                 data=parsed,
                 warnings=self.warnings,
-                raw_text=full_text[:2000]
+                raw_text=full_text[:2000],
+                used_ocr=self.used_ocr
             )
         except Exception as e:
             return OVKExtractResult(success=False, error=str(e), warnings=self.warnings)
 
+    def _extract_incremental(self, pdf_path: str) -> OVKExtractResult:
+        """
+        Som extract(), men text, tabeller och tolkade rader hämtas per sida ur
+        sidcachen. Bara sidor med nytt innehåll läses om; raderna slås ihop i
+        sidordning, så resultatet blir detsamma som vid en full körning.
+        """
+        pages = self._read_pages(pdf_path)
+        texts = self._ocr_missing_text(pdf_path, [p["text"] for p in pages])
+        full_text = "".join(texts)
+        if not full_text.strip():
+            self.warnings.append("PDF saknar extraherbar text (kan vara inskannad). OCR kan behövas.")
+
+        parsed: Dict[str, Any] = {
+            "A_Blankett": self._falt("A_Blankett", self._parse_a_blankett, full_text, {}),
+            "E1": self._falt("E1", self._parse_e1, full_text, {}),
+        }
+        for sektion in TABLE_SECTIONS:
+            parsed[sektion] = [rad for p in pages for rad in p["rows"][sektion]]
+        parsed["Intyg"] = self._falt("Intyg", self._parse_intyg, full_text, {})
+
+        return OVKExtractResult(
+            success=True,
+            data=parsed,
+            warnings=self.warnings,
+            raw_text=full_text[:2000],
+            used_ocr=self.used_ocr
+        )
+
+    def _read_pages(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """
+        {"text", "tables", "rows"} per sida. Träffar tas ur sidcachen; övriga
+        sidor läses i sammanhängande intervall (parallellt för många sidor)
+        och sparas, utom sidor där tabelläsningen gav en varning.
+        """
+        keys = page_keys(pdf_path, PAGE_CACHE_VERSION)
+        pages: List[Optional[Dict[str, Any]]] = [self.page_cache.get(k) for k in keys]
+        missing = [i for i, p in enumerate(pages) if p is None]
+        self.cached_pages = len(pages) - len(missing)
+        if not missing:
+            return pages
+
+        with fitz.open(pdf_path) as doc:
+            texts = {i: doc[i].get_text() for i in missing}
+        for i, tbls, page_warnings in self._extract_tables_pages(pdf_path, missing):
+            self.warnings.extend(page_warnings)
+            pages[i] = {"text": texts[i], "tables": tbls, "rows": self._parse_page_tables(tbls)}
+            if not page_warnings:
+                self.page_cache.put(keys[i], pages[i])
+        # Sidor som hoppades över när tidsbudgeten tog slut
+        empty_rows = {sektion: [] for sektion in TABLE_SECTIONS}
+        return [p if p is not None else {"text": texts[i], "tables": [], "rows": empty_rows} for i, p in enumerate(pages)]
+
+    def _extract_tables_pages(self, pdf_path: str, page_numbers: List[int]) -> List[Tuple[int, List[List[List[str]]], List[str]]]:
+        """Tabeller för de angivna sidorna, (sidnr, tabeller, varningar) i sidordning"""
+        runs = contiguous_runs(page_numbers)
+        workers = self.page_workers or os.cpu_count() or 1
+        if workers > 1 and len(page_numbers) >= self.parallel_threshold:
+            # Dela långa intervall så att arbetet sprids över processerna
+            chunk = max(1, -(-len(page_numbers) // (workers * 4)))
+            ranges = [(s, min(s + chunk, e)) for start, e in runs for s in range(start, e, chunk)]
+            return sorted(self._collect_ranges(pdf_path, ranges, workers), key=lambda p: p[0])
+
+        out = []
+        for start, end in runs:
+            if self.budget.exhausted:
+                self.budget.skip(f"tabeller från sida {start + 1} och framåt")
+                break
+            out.extend(_extract_tables_range(pdf_path, start, end))
+        return out
+
     def _read_text(self, pdf_path: str) -> str:
-        text = ""
         with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text()
+            texts = [page.get_text() for page in doc]
+        texts = self._ocr_missing_text(pdf_path, texts)
+        text = "".join(texts)
         if not text.strip():
             self.warnings.append("PDF saknar extraherbar text (kan vara inskannad). OCR kan behövas.")
         return text
 
+    def _ocr_missing_text(self, pdf_path: str, texts: List[str], first_page: int = 0) -> List[str]:
+        """
+        Ersätt tomma sidor med OCR-text. Bara sidor utan textlager rastreras;
+        tabeller på inskannade sidor går inte att läsa med pdfplumber.
+        """
+        texts, antal = self._ocr_texts(pdf_path, texts, first_page)
+        if antal:
+            self.warnings.append(f"OCR användes för {antal} sida(or) utan textlager")
+        return texts
+
+    def _ocr_texts(self, pdf_path: str, texts: List[str], first_page: int = 0) -> Tuple[List[str], int]:
+        """Som _ocr_missing_text men utan varning; returnerar även antalet OCR:ade sidor"""
+        missing = [first_page + i for i, t in enumerate(texts) if not t.strip()]
+        if not missing or not self.ocr:
+            return texts, 0
+        try:
+            ocr_texts = ocr_pages(pdf_path, missing, workers=self.page_workers)
+        except Exception as e:
+            self.warnings.append(f"OCR misslyckades: {e}")
+            return texts, 0
+        self.used_ocr = True
+        return [ocr_texts.get(first_page + i, t) for i, t in enumerate(texts)], len(missing)
+
     def _extract_tables(self, pdf_path: str) -> List[List[List[str]]]:
+        workers = self.page_workers or os.cpu_count() or 1
+        if workers > 1:
+            with fitz.open(pdf_path) as doc:
+                page_count = doc.page_count
+            if page_count >= self.parallel_threshold:
+                return self._extract_tables_parallel(pdf_path, page_count, workers)
+
         out = []
         with pdfplumber.open(pdf_path) as pdf:
             for page in pdf.pages:
+                if self.budget.exhausted:
+                    self.budget.skip(f"tabeller från sida {page.page_number} och framåt")
+                    break
                 try:
                     tbls = page.extract_tables() or []
                     out.extend(tbls)
@@ -154,6 +554,157 @@ class OVKProtokollExtractor:
                     self.warnings.append(f"Kunde inte läsa tabeller på en sida: {e}")
         return out
 
+    def _extract_tables_parallel(self, pdf_path: str, page_count: int, workers: int) -> List[List[List[str]]]:
+        """
+        Dela sidintervallen över arbetsprocesser och slå ihop tabellerna i
+        sidordning, så att resultatet blir identiskt med den sekventiella läsningen.
+        """
+        # Fler intervall än processer jämnar ut sidor med olika tabelltäthet
+        ranges = split_page_ranges(page_count, workers * 4)
+        pages = self._collect_ranges(pdf_path, ranges, workers)
+
+        out = []
+        for _, tbls, warnings in sorted(pages, key=lambda p: p[0]):
+            self.warnings.extend(warnings)
+            out.extend(tbls)
+        return out
+
+    def _collect_ranges(self, pdf_path: str, ranges: List[Tuple[int, int]],
+                        workers: int) -> List[Tuple[int, List[List[List[str]]], List[str]]]:
+        """
+        Läs sidintervallen i en processpool och samla dem i intervallordning.
+        Tar tidsbudgeten slut avbryts intervallen som inte har startat, och
+        resultatet blir ett sidprefix precis som i den sekventiella läsningen.
+        """
+        pages: List[Tuple[int, List[List[List[str]]], List[str]]] = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [pool.submit(_extract_tables_range, pdf_path, start, end) for start, end in ranges]
+            for (start, _), fut in zip(ranges, futures):
+                if self.budget.exhausted:
+                    self.budget.skip(f"tabeller från sida {start + 1} och framåt")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+                pages.extend(fut.result())
+        return pages
+
+    # ---------------- Strömmande läge ----------------
+    def _parse_page_tables(self, tables: List[List[List[str]]]) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "B1": self._parse_b1_tables(tables),
+            "L1": self._parse_l1_tables(tables),
+            "K1": self._parse_k1_tables(tables),
+            "C1": self._parse_c1_tables(tables),
+            "D1": self._parse_d1_tables(tables),
+        }
+
+    def iter_pages(self, pdf_path: str, start_page: int = 0, header: Optional[HeaderWindows] = None) -> Iterator[OVKPageRows]:
+        """
+        Läs dokumentet sida för sida och yielda tolkade tabellrader direkt.
+        Bara rubrikfönstren i `header` växer, och de är begränsade, så minnet
+        är konstant oavsett protokollets längd. Tabeller tolkas per tabell
+        precis som i extract(), så raderna blir desamma.
+
+        start_page/header gör det möjligt att fortsätta från en checkpoint.
+        """
+        header = header if header is not None else HeaderWindows()
+        ocr_sidor = 0
+        with fitz.open(pdf_path) as doc, pdfplumber.open(pdf_path) as pdf:
+            for fonster in range(start_page, doc.page_count, OCR_WINDOW_PAGES):
+                sidor = range(fonster, min(fonster + OCR_WINDOW_PAGES, doc.page_count))
+                keys = [f"{page_hash(doc, i)}-{PAGE_CACHE_VERSION}" if self.page_cache is not None else None for i in sidor]
+                cached = [self.page_cache.get(key) if key else None for key in keys]
+                raw_texts = [c["text"] if c else doc[i].get_text() for i, c in zip(sidor, cached)]
+
+                texts = self._ocr_stream(pdf_path, sidor, raw_texts)
+                for i, key, c, raw_text in zip(sidor, keys, cached, raw_texts):
+                    text, ocr = next(texts)
+                    ocr_sidor += ocr
+                    yield self._page_rows(pdf, i, key, c, raw_text, text, header)
+        if ocr_sidor:
+            self.warnings.append(f"OCR användes för {ocr_sidor} sida(or) utan textlager")
+
+    def _ocr_stream(self, pdf_path: str, sidor: range, raw_texts: List[str]) -> Iterator[Tuple[str, bool]]:
+        """
+        (text, OCR:ad) per sida i fönstret, i sidordning. Alla textlösa sidor
+        skickas till OCR-poolen på en gång, men varje sida släpps så fort den
+        är klar, så att ett steg i iter_pages aldrig väntar på hela fönstret.
+        """
+        missing = [i for i, t in zip(sidor, raw_texts) if not t.strip()] if self.ocr else []
+        ocr_texts = iter_ocr_pages(pdf_path, missing, workers=self.page_workers) if missing else None
+        try:
+            for raw_text in raw_texts:
+                if ocr_texts is None or raw_text.strip():
+                    yield raw_text, False
+                    continue
+                try:
+                    _, text = next(ocr_texts)
+                except Exception as e:
+                    self.warnings.append(f"OCR misslyckades: {e}")
+                    ocr_texts = None
+                    yield raw_text, False
+                    continue
+                self.used_ocr = True
+                yield text, True
+        finally:
+            if ocr_texts is not None:
+                ocr_texts.close()
+
+    def _page_rows(self, pdf, i: int, key: Optional[str], cached: Optional[Dict[str, Any]],
+                   raw_text: str, text: str, header: HeaderWindows) -> OVKPageRows:
+        page_warnings: List[str] = []
+        header.add(text)
+
+        if cached:
+            self.cached_pages += 1
+            rows = cached["rows"]
+        else:
+            page = pdf.pages[i]
+            try:
+                tables = page.extract_tables() or []
+            except Exception as e:
+                tables = []
+                page_warnings.append(f"Kunde inte läsa tabeller på en sida: {e}")
+            # pdfplumber cachar layoutobjekt per sida; släpp dem direkt
+            page.flush_cache()
+            rows = self._parse_page_tables(tables)
+            if key and not page_warnings:
+                self.page_cache.put(key, {"text": raw_text, "tables": tables, "rows": rows})
+
+        self.warnings.extend(page_warnings)
+        return OVKPageRows(
+            page=i,
+            rows=rows,
+            warnings=page_warnings,
+            has_text=bool(text.strip()),
+        )
+
+    def finish(self, header: HeaderWindows) -> OVKExtractResult:
+        """Tolka rubriksektionerna (A-blankett, E1, INTYG) ur insamlade fönster."""
+        text = header.text()
+        if not text.strip():
+            self.warnings.append("PDF saknar extraherbar text (kan vara inskannad). OCR kan behövas.")
+        parsed = {
+            "A_Blankett": self._falt("A_Blankett", self._parse_a_blankett, text, {}),
+            "E1": self._falt("E1", self._parse_e1, text, {}),
+            "Intyg": self._falt("Intyg", self._parse_intyg, text, {}),
+        }
+        return OVKExtractResult(success=True, data=parsed, warnings=self.warnings, raw_text=text[:2000], used_ocr=self.used_ocr)
+
+    def stream(self, pdf_path: str) -> Iterator[Union[OVKPageRows, OVKExtractResult]]:
+        """
+        Strömmande extraktion: ett OVKPageRows per sida, sist ett
+        OVKExtractResult med rubriksektionerna. Vid fel avslutas strömmen
+        med ett misslyckat OVKExtractResult.
+        """
+        header = HeaderWindows()
+        self.used_ocr = False
+        self.cached_pages = 0
+        try:
+            yield from self.iter_pages(pdf_path, header=header)
+            yield self.finish(header)
+        except Exception as e:
+            yield OVKExtractResult(success=False, error=str(e), warnings=self.warnings)
+
     # ---------------- A-Blankett ----------------
     def _parse_a_blankett(self, text: str) -> Dict[str, Any]:
         A: Dict[str, Any] = {}
@@ -250,19 +801,21 @@ class OVKProtokollExtractor:
             I["sektion_hittad"] = True
 
         # Specialized joint-patterns (labels on one line, values on the next)
-        m_pair = re.search(r"Fastighetsbeteckning\s+Adress\s+(?P<fast>.+?)\s+(?P<addr>.+?)\s+System(?:nummer|nr)", block, re.I|re.S)
+        # De lata .+?-paren körs bara inom INTYG-fönstret (högst 2000 tecken):
+        # över hela dokumentet är de kvadratiska per etikettförekomst
+        m_pair = re.search(r"Fastighetsbeteckning\s+Adress\s+(?P<fast>.+?)\s+(?P<addr>.+?)\s+System(?:nummer|nr)", block, re.I|re.S) if block is not None else None
         if m_pair:
             I["fastighetsbeteckning"] = m_pair.group("fast").strip()
             I["adress"] = m_pair.group("addr").strip()
 
-        m_sys = re.search(r"System(?:nummer|nr)\s+(?P<sys>.+?)\s+(?:Besiktnings\s*rtesultat|Besiktnings\s*resultat|Besiktningsresultat)", block, re.I|re.S)
+        m_sys = re.search(r"System(?:nummer|nr)\s+(?P<sys>.+?)\s+(?:Besiktnings\s*rtesultat|Besiktnings\s*resultat|Besiktningsresultat)", block, re.I|re.S) if block is not None else None
         if m_sys:
             sysval = re.sub(r"[\r\n]+", " ", m_sys.group("sys")).strip()
             # reject if likely header junk or too long / alphabetic
             if sysval and len(sysval) <= 12 and re.fullmatch(r"[0-9A-Za-z\-/]+", sysval) and not re.fullmatch(r"(Bes\.?kat\.?|Resultat|Anm\.?)", sysval, re.I):
                 I["systemnummer"] = sysval
 
-        m_resnxt = re.search(r"(?:Besiktnings\s*rtesultat|Besiktnings\s*resultat|Besiktningsresultat)\s+Nästa\s+(?:ordinarie\s+)?besiktning\s+(?P<res>[GU]|Godkänd|Underkänd)[^\d\n]*?(?P<date>\d{4}-\d{2}-\d{2})", block, re.I|re.S)
+        m_resnxt = re.search(r"(?:Besiktnings\s*rtesultat|Besiktnings\s*resultat|Besiktningsresultat)\s+Nästa\s+(?:ordinarie\s+)?besiktning\s+(?P<res>[GU]|Godkänd|Underkänd)[^\d\n]*?(?P<date>\d{4}-\d{2}-\d{2})", block, re.I|re.S) if block is not None else None
         if m_resnxt:
             res_val = m_resnxt.group("res")
             res_val = "Godkänd" if res_val.upper().startswith("G") else ("Underkänd" if res_val.upper().startswith("U") else res_val)
@@ -400,7 +953,9 @@ class OVKProtokollExtractor:
         # <sysnr> <internt> <beskat> <datum> <result> [<ombesiktdat>] <nästa_datum>
         # Make it permissive with many spaces and optional fields.
         row_re = re.compile(
-            r"\n\s*(?P<sysnr>\d+)\s+(?P<i1>\d+)\s+(?P<i2>\d+)\s+"
+            # [^\S\n]* i stället för \s*: \s* efter \n gav kvadratisk tid på
+            # långa serier tomrader (varje \n blev en ny startpunkt som läste till slutet)
+            r"\n[^\S\n]*(?P<sysnr>\d+)\s+(?P<i1>\d+)\s+(?P<i2>\d+)\s+"
             r"(?P<datum>\d{4}-\d{2}-\d{2})\s+"
             r"(?P<res>[GU]|Godkänd|Underkänd)\s+"
             r"(?:(?P<omb>\d{4}-\d{2}-\d{2})\s+)?"
@@ -417,178 +972,55 @@ class OVKProtokollExtractor:
         return out
 
     # ---------------- Table parsers ----------------
-    def _parse_b1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        for tbl in tables:
-            if not tbl or not tbl[0]: 
-                continue
-            colmap = map_headers_to_keys(tbl[0], {
-                "plats": HEADER_VARIANTS["plats"],
-                "don_typ": HEADER_VARIANTS["don_typ"],
-                "proj_ls": HEADER_VARIANTS["proj_ls"],
-                "uppm_ls": HEADER_VARIANTS["uppm_ls"],
-                "matmetod": HEADER_VARIANTS["matmetod"],
-                "anm": HEADER_VARIANTS["anm"],
-            })
-            if "proj_ls" in colmap.values() and "uppm_ls" in colmap.values():
-                for row in tbl[1:]:
-                    if not any(row): 
-                        continue
-                    item = {}
-                    for idx, key in colmap.items():
-                        if idx < len(row):
-                            val = (row[idx] or "").strip()
-                            if key in {"proj_ls", "uppm_ls"}:
-                                item[key] = as_number(val)
-                            else:
-                                item[key] = val
-                    if "proj_ls" in item or "uppm_ls" in item:
-                        results.append(item)
-        return results
-
-    def _parse_l1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
+    def _parse_section_tables(self, sektion: str, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
+        colmap_fn, row_fn = SECTION_PARSERS[sektion]
         results: List[Dict[str, Any]] = []
         for tbl in tables:
             if not tbl or not tbl[0]:
                 continue
-            colmap = map_headers_to_keys(tbl[0], {
-                "rum": HEADER_VARIANTS["rum"],
-                "tilluft_proj": HEADER_VARIANTS["tilluft_proj"],
-                "tilluft_uppm": HEADER_VARIANTS["tilluft_uppm"],
-                "franluft_proj": HEADER_VARIANTS["franluft_proj"],
-                "franluft_uppm": HEADER_VARIANTS["franluft_uppm"],
-            })
-            if any(k in colmap.values() for k in ["tilluft_proj", "tilluft_uppm", "franluft_proj", "franluft_uppm"]):
-                for row in tbl[1:]:
-                    if not any(row):
-                        continue
-                    item = {"tilluft": {}, "franluft": {}}
-                    for idx, key in colmap.items():
-                        if idx >= len(row): 
-                            continue
-                        val = (row[idx] or "").strip()
-                        if key == "rum":
-                            item["rum"] = val
-                        elif key == "tilluft_proj":
-                            item["tilluft"]["proj_ls"] = as_number(val)
-                        elif key == "tilluft_uppm":
-                            item["tilluft"]["uppm_ls"] = as_number(val)
-                        elif key == "franluft_proj":
-                            item["franluft"]["proj_ls"] = as_number(val)
-                        elif key == "franluft_uppm":
-                            item["franluft"]["uppm_ls"] = as_number(val)
-                    t = item["tilluft"].get("uppm_ls")
-                    f = item["franluft"].get("uppm_ls")
-                    if t is not None and f is not None:
-                        item["balans_ls"] = round(t - f, 2)
+            colmap = colmap_fn(tbl[0])
+            if colmap is None:
+                continue
+            for row in tbl[1:]:
+                if not any(row):
+                    continue
+                item = row_fn(colmap, row)
+                if item is not None:
                     results.append(item)
         return results
 
+    def _parse_b1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
+        return self._parse_section_tables("B1", tables)
+
+    def _parse_l1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
+        return self._parse_section_tables("L1", tables)
+
     def _parse_k1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        for tbl in tables:
-            if not tbl or not tbl[0]:
-                continue
-            colmap = map_headers_to_keys(tbl[0], {
-                "rum": HEADER_VARIANTS["rum"],
-                "temp_c": HEADER_VARIANTS["temp_c"],
-                "co2_ppm": HEADER_VARIANTS["co2_ppm"],
-                "drag": HEADER_VARIANTS["drag"]
-            })
-            if any(k in colmap.values() for k in ["temp_c", "co2_ppm"]):
-                for row in tbl[1:]:
-                    if not any(row):
-                        continue
-                    item = {}
-                    for idx, key in colmap.items():
-                        if idx >= len(row): 
-                            continue
-                        val = (row[idx] or "").strip()
-                        if key == "temp_c":
-                            item["inomhustemp_c"] = as_number(val)
-                        elif key == "co2_ppm":
-                            item["co2_ppm"] = as_number(val)
-                        elif key == "drag":
-                            item["drag"] = val
-                        elif key == "rum":
-                            item["benamning"] = val
-                    results.append(item)
-        return results
+        return self._parse_section_tables("K1", tables)
 
     def _parse_c1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        for tbl in tables:
-            if not tbl or not tbl[0]:
-                continue
-            colmap = map_headers_to_keys(tbl[0], {
-                "anm": HEADER_VARIANTS["anm"],
-                "klassning": HEADER_VARIANTS["klassning"]
-            })
-            if "anm" in colmap.values():
-                for row in tbl[1:]:
-                    if not any(row):
-                        continue
-                    item: Dict[str, Any] = {}
-                    for idx, key in colmap.items():
-                        if idx >= len(row):
-                            continue
-                        val = (row[idx] or "").strip()
-                        if key == "klassning":
-                            item["klassning"] = val
-                        elif key == "anm":
-                            item["anmärkning"] = val
-                    if item:
-                        results.append(item)
-        return results
+        return self._parse_section_tables("C1", tables)
 
     def _parse_d1_tables(self, tables: List[List[List[str]]]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        for tbl in tables:
-            if not tbl or not tbl[0]:
-                continue
-            colmap = map_headers_to_keys(tbl[0], {
-                "atgard": HEADER_VARIANTS["atgard"],
-                "ansvarig": HEADER_VARIANTS["ansvarig"],
-                "deadline": HEADER_VARIANTS["deadline"],
-                "status": HEADER_VARIANTS["status"]
-            })
-            if "atgard" in colmap.values():
-                for row in tbl[1:]:
-                    if not any(row):
-                        continue
-                    item: Dict[str, Any] = {}
-                    for idx, key in colmap.items():
-                        if idx >= len(row):
-                            continue
-                        val = (row[idx] or "").strip()
-                        if key == "deadline":
-                            val2 = val.replace("/", "-")
-                            try:
-                                if re.match(r"\d{2}-\d{2}-\d{4}", val2):
-                                    val2 = datetime.strptime(val2, "%d-%m-%Y").date().isoformat()
-                                elif re.match(r"\d{4}-\d{2}-\d{2}", val2):
-                                    val2 = datetime.strptime(val2, "%Y-%m-%d").date().isoformat()
-                            except Exception:
-                                pass
-                            item["deadline"] = val2
-                        elif key == "atgard":
-                            item["beskrivning"] = val
-                        else:
-                            item[key] = val
-                    results.append(item)
-        return results
+        return self._parse_section_tables("D1", tables)
 
 if __name__ == "__main__":
     import sys, json
+    from dataclasses import asdict
     if len(sys.argv) < 2:
-        print("Usage: python ovk_extractor.py <path_to_ovk_pdf>")
+        print("Usage: python ovk_extractor.py <path_to_ovk_pdf> [--stream]")
         sys.exit(1)
     pdf_path = sys.argv[1]
     extractor = OVKProtokollExtractor()
+    if "--stream" in sys.argv[2:]:
+        # En JSON-rad per sida, sist rubriksektionerna
+        for item in extractor.stream(pdf_path):
+            print(json.dumps(asdict(item), ensure_ascii=False), flush=True)
+        sys.exit(0)
     result = extractor.extract(pdf_path)
     print(json.dumps({
         "success": result.success,
         "warnings": result.warnings,
         "error": result.error,
         "data": result.data
-    }, ensure_ascii=False, indent=2))
+    }, ensure_ascii=False, indent=2))
\ No newline at end of file
@@ -0,0 +1,274 @@
+"""
+Kolumnlager för OVK-mätrader
+B1- (flöde per don), L1- (till-/frånluftsbalans) och K1-rader (temperatur/CO₂)
+från OVKProtokollExtractor sparas som Parquet, hive-partitionerat på
+fastighet och besiktningsdatum:
+
+    <root>/b1/fastighet=.../besiktningsdatum=.../part-....parquet
+
+Frågor körs som vektoriserade filter över hela korpusen med pyarrow.dataset
+i stället för att läsa in varje dokuments JSON.
+
+    python ovk_store.py ingest extraktion.ndjson
+    python ovk_store.py flode --min 0.2
+    python ovk_store.py co2 --min 1000
+"""
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+STORE_DIR = Path(os.getenv("OVK_STORE_DIR", "var/ovk_store"))
+OKAND = "okand"
+PARTITIONING = ds.partitioning(
+    pa.schema([("fastighet", pa.string()), ("besiktningsdatum", pa.string())]),
+    flavor="hive",
+)
+
+_META = [
+    ("fastighet", pa.string()),
+    ("besiktningsdatum", pa.string()),
+    ("dokument", pa.string()),
+    ("systemnr", pa.string()),
+]
+
+SCHEMAS = {
+    "b1": pa.schema(_META + [
+        ("plats", pa.string()),
+        ("don_typ", pa.string()),
+        ("proj_ls", pa.float64()),
+        ("uppm_ls", pa.float64()),
+        ("matmetod", pa.string()),
+        ("anm", pa.string()),
+    ]),
+    "l1": pa.schema(_META + [
+        ("rum", pa.string()),
+        ("tilluft_proj_ls", pa.float64()),
+        ("tilluft_uppm_ls", pa.float64()),
+        ("franluft_proj_ls", pa.float64()),
+        ("franluft_uppm_ls", pa.float64()),
+        ("balans_ls", pa.float64()),
+    ]),
+    "k1": pa.schema(_META + [
+        ("benamning", pa.string()),
+        ("inomhustemp_c", pa.float64()),
+        ("co2_ppm", pa.float64()),
+        ("drag", pa.string()),
+    ]),
+}
+
+
+def dokument_meta(parsed: Dict[str, Any], dokument: str) -> Dict[str, Optional[str]]:
+    """Partitionsnycklar ur rubriksektionerna; saknade värden blir OKAND"""
+    a = parsed.get("A_Blankett") or {}
+    intyg = parsed.get("Intyg") or {}
+    # Blanketten först, som ventilation_analytics._fastighet: intygets tolkning är brusigare
+    fastighet = a.get("fastighetsbeteckning") or intyg.get("fastighetsbeteckning") or OKAND
+    datum = intyg.get("besiktningsdatum") or a.get("datum") or OKAND
+    return {
+        "fastighet": " ".join(fastighet.split()),
+        "besiktningsdatum": datum,
+        "dokument": dokument,
+        "systemnr": intyg.get("systemnummer"),
+    }
+
+
+def _flatten(tabell: str, rad: Dict[str, Any]) -> Dict[str, Any]:
+    if tabell == "l1":
+        till = rad.get("tilluft") or {}
+        fran = rad.get("franluft") or {}
+        return {
+            "rum": rad.get("rum"),
+            "tilluft_proj_ls": till.get("proj_ls"),
+            "tilluft_uppm_ls": till.get("uppm_ls"),
+            "franluft_proj_ls": fran.get("proj_ls"),
+            "franluft_uppm_ls": fran.get("uppm_ls"),
+            "balans_ls": rad.get("balans_ls"),
+        }
+    return rad
+
+
+def rows_from_parsed(parsed: Dict[str, Any], dokument: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Platta rader per tabell (b1/l1/k1) för ett extraherat dokument"""
+    meta = dokument_meta(parsed, dokument)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for tabell in SCHEMAS:
+        out[tabell] = [{**meta, **_flatten(tabell, rad)} for rad in parsed.get(tabell.upper()) or []]
+    return out
+
+
+class OVKStore:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or STORE_DIR)
+
+    # ---------------- Skrivning ----------------
+    def write(self, dokument: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Skriv (dokument-id, parsed) i en omgång. Varje dokument får egna
+        filer, namngivna efter dokument-id:t, och dokumentets tidigare filer
+        tas bort först, så att ett dokument som läses in igen (i en annan
+        omgång, eller med ändrad fastighet/datum) ersätter sina rader i
+        stället för att dubblera dem.
+        """
+        per_dok: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for dok_id, parsed in dokument:
+            per_dok[_file_key(dok_id)] = rows_from_parsed(parsed, dok_id)
+        counts = {t: 0 for t in SCHEMAS}
+        if not per_dok:
+            return counts
+
+        for tabell in SCHEMAS:
+            _remove_parts(self.root / tabell, per_dok.keys())
+            for key, rows in per_dok.items():
+                r = rows[tabell]
+                counts[tabell] += len(r)
+                if not r:
+                    continue
+                ds.write_dataset(
+                    pa.Table.from_pylist(r, schema=SCHEMAS[tabell]),
+                    self.root / tabell,
+                    format="parquet",
+                    partitioning=PARTITIONING,
+                    basename_template=f"part-{key}-{{i}}.parquet",
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+        return counts
+
+    def ingest_ndjson(self, path: str, batch_size: int = 500) -> Dict[str, int]:
+        """Läs batch_extract-utdata och skriv OVK-posterna i omgångar om batch_size"""
+        totals = {t: 0 for t in SCHEMAS}
+        for chunk in _chunks(_ovk_records(path), batch_size):
+            for tabell, n in self.write(chunk).items():
+                totals[tabell] += n
+        return totals
+
+    # ---------------- Frågor ----------------
+    def dataset(self, tabell: str) -> ds.Dataset:
+        return ds.dataset(self.root / tabell, format="parquet", partitioning=PARTITIONING, schema=SCHEMAS[tabell])
+
+    def query(
+        self,
+        tabell: str,
+        filter: Optional[ds.Expression] = None,
+        columns: Optional[Dict[str, ds.Expression]] = None,
+        fastighet: Optional[str] = None,
+        fran: Optional[str] = None,
+        till: Optional[str] = None,
+    ) -> pa.Table:
+        """
+        Vektoriserad fråga mot en tabell. fastighet/fran/till filtrerar på
+        partitionsnycklarna så att övriga kataloger inte ens läses.
+        columns: extra beräknade kolumner {namn: uttryck}.
+        """
+        if not (self.root / tabell).exists():
+            return SCHEMAS[tabell].empty_table()
+        expr = filter
+        for part in _partition_filter(fastighet, fran, till):
+            expr = part if expr is None else expr & part
+        projection = None
+        if columns:
+            projection = {name: ds.field(name) for name in SCHEMAS[tabell].names}
+            projection.update(columns)
+        return self.dataset(tabell).to_table(filter=expr, columns=projection)
+
+    def flow_deviation(self, min_rel: float = 0.2, **partition) -> pa.Table:
+        """B1-don där |uppm − proj| / proj > min_rel"""
+        avvikelse = pc.abs(pc.divide(
+            pc.subtract(ds.field("uppm_ls"), ds.field("proj_ls")),
+            ds.field("proj_ls"),
+        ))
+        expr = (ds.field("proj_ls") > 0) & (avvikelse > min_rel)
+        return self.query("b1", expr, {"avvikelse": avvikelse}, **partition)
+
+    def co2_over(self, min_ppm: float = 1000, **partition) -> pa.Table:
+        """K1-rum med CO₂ över min_ppm"""
+        return self.query("k1", ds.field("co2_ppm") > min_ppm, **partition)
+
+    def imbalance(self, min_ls: float = 10, **partition) -> pa.Table:
+        """L1-rum där |tilluft − frånluft| > min_ls"""
+        return self.query("l1", pc.abs(ds.field("balans_ls")) > min_ls, **partition)
+
+
+def _file_key(dok_id: str) -> str:
+    return hashlib.sha256(dok_id.encode()).hexdigest()[:16]
+
+
+def _remove_parts(root: Path, keys: Iterable[str]) -> None:
+    """Ta bort filerna för de angivna dokumenten, i alla partitioner"""
+    keys = set(keys)
+    if not root.exists():
+        return
+    for path in root.glob("*/*/part-*.parquet"):
+        if path.name[len("part-"):len("part-") + 16] in keys:
+            path.unlink()
+
+
+def _partition_filter(fastighet: Optional[str], fran: Optional[str], till: Optional[str]) -> List[ds.Expression]:
+    out = []
+    if fastighet:
+        out.append(ds.field("fastighet") == fastighet)
+    if fran:
+        out.append(ds.field("besiktningsdatum") >= fran)
+    if till:
+        out.append(ds.field("besiktningsdatum") <= till)
+    return out
+
+
+def _ovk_records(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # halvskriven sista rad från en avbruten körning
+            if rec.get("typ") == "ovk" and rec.get("ok") and rec.get("parsed"):
+                yield rec.get("sha256") or rec["path"], rec["parsed"]
+
+
+def _chunks(it: Iterable[Any], n: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for x in it:
+        chunk.append(x)
+        if len(chunk) >= n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kolumnlager för OVK-mätrader")
+    parser.add_argument("--root", default=str(STORE_DIR), help="Lagringskatalog (standard OVK_STORE_DIR)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_ing = sub.add_parser("ingest", help="Läs in NDJSON från batch_extract.py")
+    p_ing.add_argument("ndjson")
+    for name, default, hjalp in (
+        ("flode", 0.2, "B1-don med relativ flödesavvikelse över --min"),
+        ("co2", 1000.0, "K1-rum med CO₂ (ppm) över --min"),
+        ("balans", 10.0, "L1-rum med obalans (l/s) över --min"),
+    ):
+        p = sub.add_parser(name, help=hjalp)
+        p.add_argument("--min", type=float, default=default)
+        p.add_argument("--fastighet")
+        p.add_argument("--fran", help="Besiktningsdatum från (YYYY-MM-DD)")
+        p.add_argument("--till", help="Besiktningsdatum till (YYYY-MM-DD)")
+        p.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    store = OVKStore(Path(args.root))
+    if args.cmd == "ingest":
+        print(json.dumps(store.ingest_ndjson(args.ndjson)))
+    else:
+        fn = {"flode": store.flow_deviation, "co2": store.co2_over, "balans": store.imbalance}[args.cmd]
+        result = fn(args.min, fastighet=args.fastighet, fran=args.fran, till=args.till)
+        print(f"{result.num_rows} rader")
+        for row in result.slice(0, args.limit).to_pylist():
+            print(json.dumps(row, ensure_ascii=False))
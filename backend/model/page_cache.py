@@ -0,0 +1,86 @@
+"""
+Innehållshash per PDF-sida och diskcache för sidartefakter
+Nyckeln är en hash av sidans innehåll (innehållsström, bilder, typsnitt,
+mått), inte av filen, så samma sida känns igen i en ny version av ett
+dokument eller i ett annat dokument.
+"""
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+CACHE_DIR = Path(os.getenv("EXTRACT_CACHE_DIR", Path.home() / ".cache" / "nexus-extract"))
+
+
+def page_hash(doc: fitz.Document, page_no: int) -> str:
+    """
+    sha256 över allt som påverkar sidans text, tabeller och rastrering:
+    mått och rotation, innehållsströmmen, refererade bilder och
+    formulärobjekt samt typsnittsdefinitionerna (ToUnicode m.m.).
+    """
+    page = doc[page_no]
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents())
+    for xref in sorted({img[0] for img in page.get_images(full=True)}):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for xref in sorted({x[0] for x in page.get_xobjects()}):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for xref in sorted({f[0] for f in page.get_fonts(full=True)}):
+        h.update(doc.xref_object(xref, compressed=True).encode())
+    return h.hexdigest()
+
+
+class PageCache:
+    """
+    JSON-värden på disk under CACHE_DIR/<kind>/<hash[:2]>/<hash>.json.
+    Skrivningar är atomiska (tempfil + rename) så att parallella
+    processer kan dela cachen.
+    """
+
+    def __init__(self, kind: str, root: Optional[Path] = None):
+        self.dir = Path(root or CACHE_DIR) / kind
+
+    def _path(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def page_keys(pdf_path: str, version: str) -> List[str]:
+    """Cachenyckel per sida: innehållshash plus extraktorns version"""
+    with fitz.open(pdf_path) as doc:
+        return [f"{page_hash(doc, i)}-{version}" for i in range(doc.page_count)]
+
+
+def contiguous_runs(pages: List[int]) -> List[Tuple[int, int]]:
+    """[1, 2, 3, 7, 8] -> [(1, 4), (7, 9)], halvöppna intervall"""
+    runs: List[Tuple[int, int]] = []
+    for p in sorted(pages):
+        if runs and runs[-1][1] == p:
+            runs[-1] = (runs[-1][0], p + 1)
+        else:
+            runs.append((p, p + 1))
+    return runs
+
+
+def page_cache_enabled(flag: Optional[bool]) -> bool:
+    """Explicit flagga, annars EXTRACT_PAGE_CACHE=1"""
+    return os.getenv("EXTRACT_PAGE_CACHE", "0") == "1" if flag is None else flag
@@ -3,10 +3,14 @@ Extrahera data från PDF energideklarationer
 Använder PyMuPDF (fitz) och pdfplumber för robust extraktion
 """
 import re
-from typing import Optional, Dict, Any
+from dataclasses import asdict
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from datetime import datetime
 import fitz  # PyMuPDF
 import pdfplumber
+from budget import Tidsbudget, DOKUMENT_BUDGET_S, FALT_BUDGET_S
+from instrumentation import instrumented, make_timings
+from page_cache import PageCache, page_keys, contiguous_runs, page_cache_enabled
 from models import (
     Energideklaration, 
     Energiklass, 
@@ -15,62 +19,48 @@ from models import (
     ExtraktionsResultat
 )
 
+# Ingår i sidcachens nyckel; höj när text- eller tabelläsningen ändras
+PAGE_CACHE_VERSION = f"energi-1-pdfplumber-{pdfplumber.__version__}"
+
 
 class EnergideklarationExtractor:
     """Extrahera data från energideklarations-PDF"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        dokument_budget_s: Optional[float] = DOKUMENT_BUDGET_S,
+        falt_budget_s: Optional[float] = FALT_BUDGET_S,
+        instrument: Optional[bool] = None,
+        page_cache: Optional[bool] = None
+    ):
         self.warnings = []
+        self.budget = Tidsbudget(dokument_budget_s, falt_budget_s, warnings=self.warnings)
+        # Stegtider per dokument (None = avslaget, se instrumentation.py)
+        self.timings = make_timings(instrument, self)
+        # Text och tabeller per oförändrad sida (None = EXTRACT_PAGE_CACHE, se page_cache.py)
+        self.page_cache = PageCache("pages") if page_cache_enabled(page_cache) else None
+        self.cached_pages = 0
     
+    @instrumented
     def extract(self, pdf_path: str) -> ExtraktionsResultat:
         """
         Huvudmetod för att extrahera all data från energideklaration
         """
+        self.budget.restart()
+        self.cached_pages = 0
         try:
-            data = {}
+            if self.page_cache is not None:
+                # Bara sidor med nytt innehåll läses om
+                full_text, energy_data = self._read_pages_incremental(pdf_path)
+                return self.build_result(full_text, energy_data)
             
             # Använd båda biblioteken för robust extraktion
-            with fitz.open(pdf_path) as doc:
-                full_text = ""
-                for page in doc:
-                    full_text += page.get_text()
-            
-            # Extrahera olika fält
-            data['deklarations_id'] = self._extract_deklarations_id(full_text)
-            data['adress'] = self._extract_adress(full_text)
-            data['postnummer'], data['postort'] = self._extract_postnummer_postort(full_text)
-            data['kommun'] = self._extract_kommun(full_text)
-            data['nybyggnadsar'] = self._extract_nybyggnadsar(full_text)
-            data['atemp'] = self._extract_atemp(full_text)
-            data['byggnadskategori'] = self._extract_byggnadskategori(full_text)
-            data['energiklass'] = self._extract_energiklass(full_text)
-            data['primärenergital'] = self._extract_primärenergital(full_text)
-            data['specifik_energianvandning'] = self._extract_specifik_energianvandning(full_text)
-            data['energianvandning_totalt'] = self._extract_energianvandning_totalt(full_text)
-            data['uppvarmningssystem'] = self._extract_uppvarmningssystem(full_text)
-            data['ventilationstyp'] = self._extract_ventilationstyp(full_text)
-            data['ovk_utford'] = self._extract_ovk_status(full_text)
-            data['radon_matning_utford'] = self._extract_radon_status(full_text)
-            data['atgardsforslag_finns'] = self._extract_atgardsforslag_status(full_text)
-            data['giltig_till'] = self._extract_giltig_till(full_text)
+            full_text = self._read_text(pdf_path)
             
             # Extrahera energifördelning från tabell
             energy_data = self._extract_energy_breakdown(pdf_path)
-            data.update(energy_data)
             
-            # Extrahera åtgärdsförslag om finns
-            if data['atgardsforslag_finns']:
-                atgard_data = self._extract_atgardsforslag(full_text)
-                data.update(atgard_data)
-            
-            # Skapa Energideklaration objekt
-            energideklaration = Energideklaration(**data)
-            
-            return ExtraktionsResultat(
-                success=True,
-                data=energideklaration.__dict__,
-                warnings=self.warnings
-            )
+            return self.build_result(full_text, energy_data)
             
         except Exception as e:
             return ExtraktionsResultat(
@@ -79,6 +69,107 @@ class EnergideklarationExtractor:
                 error=str(e)
             )
     
+    def _read_text(self, pdf_path: str) -> str:
+        with fitz.open(pdf_path) as doc:
+            return "".join(page.get_text() for page in doc)
+    
+    def _read_pages_incremental(self, pdf_path: str) -> Tuple[str, Dict[str, Optional[float]]]:
+        """
+        Text och tabeller per sida ur sidcachen; bara missar läses med
+        fitz/pdfplumber. Tabellerna gås igenom i sidordning, så texten och
+        energifördelningen blir desamma som vid en full körning.
+        """
+        keys = page_keys(pdf_path, PAGE_CACHE_VERSION)
+        pages = [self.page_cache.get(k) for k in keys]
+        missing = [i for i, p in enumerate(pages) if p is None]
+        self.cached_pages = len(pages) - len(missing)
+        
+        if missing:
+            with fitz.open(pdf_path) as doc:
+                texts = {i: doc[i].get_text() for i in missing}
+            for start, end in contiguous_runs(missing):
+                with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+                    for i, page in zip(range(start, end), pdf.pages):
+                        if self.budget.exhausted:
+                            self.budget.skip(f"energifördelning från sida {i + 1}")
+                            pages[i] = {'text': texts[i], 'tables': []}
+                            continue
+                        try:
+                            pages[i] = {'text': texts[i], 'tables': page.extract_tables()}
+                            self.page_cache.put(keys[i], pages[i])
+                        except Exception as e:
+                            self.warnings.append(f"Kunde inte extrahera energifördelning: {e}")
+                            pages[i] = {'text': texts[i], 'tables': []}
+        
+        energy = self.empty_energy_breakdown()
+        for p in pages:
+            self.scan_energy_tables(p['tables'], energy)
+        return "".join(p['text'] for p in pages), energy
+    
+    def iter_pages(self, pdf_path: str, start_page: int = 0) -> Iterator[Tuple[int, str, List]]:
+        """
+        Läs dokumentet sida för sida: (sidnr, text, tabeller).
+        Används av aktiviteter som checkpointar sin progress; sätt ihop
+        resultatet med scan_energy_tables() och build_result().
+        """
+        with fitz.open(pdf_path) as doc, pdfplumber.open(pdf_path) as pdf:
+            for i in range(start_page, doc.page_count):
+                text = doc[i].get_text()
+                try:
+                    tables = pdf.pages[i].extract_tables() or []
+                except Exception as e:
+                    self.warnings.append(f"Kunde inte extrahera energifördelning: {e}")
+                    tables = []
+                yield i, text, tables
+    
+    def build_result(self, full_text: str, energy_data: Dict[str, Optional[float]]) -> ExtraktionsResultat:
+        """
+        Tolka fälten ur dokumenttexten och bygg resultatet
+        """
+        data = {}
+        
+        # Extrahera olika fält, inom tidsbudget (default = värdet när fältet saknas).
+        # Energiklass och uppvärmning blir None när budgeten hoppar över dem:
+        # G/fjärrvärme är extraktorernas gissning och får inte se uppmätt ut
+        f = self._falt
+        data['deklarations_id'] = f('deklarations_id', self._extract_deklarations_id, full_text, "")
+        data['adress'] = f('adress', self._extract_adress, full_text, "")
+        data['postnummer'], data['postort'] = f('postnummer', self._extract_postnummer_postort, full_text, ("", ""))
+        data['kommun'] = f('kommun', self._extract_kommun, full_text, "")
+        data['nybyggnadsar'] = f('nybyggnadsar', self._extract_nybyggnadsar, full_text, 0)
+        data['atemp'] = f('atemp', self._extract_atemp, full_text, 0.0)
+        data['byggnadskategori'] = f('byggnadskategori', self._extract_byggnadskategori, full_text, 'Okänd')
+        data['energiklass'] = f('energiklass', self._extract_energiklass, full_text, None)
+        data['primärenergital'] = f('primärenergital', self._extract_primärenergital, full_text, 0.0)
+        data['specifik_energianvandning'] = f('specifik_energianvandning', self._extract_specifik_energianvandning, full_text, 0.0)
+        data['energianvandning_totalt'] = f('energianvandning_totalt', self._extract_energianvandning_totalt, full_text, 0.0)
+        data['uppvarmningssystem'] = f('uppvarmningssystem', self._extract_uppvarmningssystem, full_text, None)
+        data['ventilationstyp'] = f('ventilationstyp', self._extract_ventilationstyp, full_text, None)
+        data['ovk_utford'] = f('ovk_utford', self._extract_ovk_status, full_text, False)
+        data['radon_matning_utford'] = f('radon_matning_utford', self._extract_radon_status, full_text, False)
+        data['atgardsforslag_finns'] = f('atgardsforslag_finns', self._extract_atgardsforslag_status, full_text, False)
+        data['giltig_till'] = f('giltig_till', self._extract_giltig_till, full_text, None)
+        
+        data.update(energy_data)
+        
+        # Extrahera åtgärdsförslag om finns
+        if data['atgardsforslag_finns']:
+            atgard_data = f('atgardsforslag', self._extract_atgardsforslag, full_text, {})
+            data.update(atgard_data)
+        
+        # Skapa Energideklaration objekt
+        energideklaration = Energideklaration(**data)
+        
+        return ExtraktionsResultat(
+            success=True,
+            data=asdict(energideklaration),
+            warnings=self.warnings
+        )
+    
+    def _falt(self, namn: str, fn, text: str, default: Any) -> Any:
+        """Kör en fältextraktor inom dokumentets tidsbudget"""
+        return self.budget.run(namn, fn, text, default=default)
+    
     def _extract_deklarations_id(self, text: str) -> str:
         """Extrahera Energideklarations-ID"""
         pattern = r'Energideklarations?-?ID[:\s]+(\d+)'
@@ -91,7 +182,9 @@ class EnergideklarationExtractor:
     def _extract_adress(self, text: str) -> str:
         """Extrahera adress"""
         # Hitta adress före postnummer
-        pattern = r'(?:Adress[:\s]+)?([A-ZÅÄÖ][a-zåäö]+(?:\s+\d+)?)\s*\n?\s*(\d{3}\s?\d{2})'
+        # \s*+ är possessiv: \n ingår redan i \s, och två \s* i rad gav kvadratisk
+        # backtracking på långa blankteckensekvenser
+        pattern = r'(?:Adress[:\s]+)?([A-ZÅÄÖ][a-zåäö]+(?:\s+\d+)?)\s*+(\d{3}\s?\d{2})'
         match = re.search(pattern, text)
         if match:
             return match.group(1).strip()
@@ -133,7 +226,9 @@ class EnergideklarationExtractor:
     
     def _extract_atemp(self, text: str) -> float:
         """Extrahera Atemp (tempererad area)"""
-        pattern = r'Atemp[^)]*\)?\s*(\d+(?:,\d+)?)\s*m'
+        # Begränsat avstånd mellan etikett och värde: obegränsat [^)]* gav
+        # kvadratisk tid i text med många 'Atemp' utan avslutande parentes
+        pattern = r'Atemp[^)]{0,200}\)?\s*(\d+(?:,\d+)?)\s*m'
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             value = match.group(1).replace(',', '.')
@@ -257,7 +352,8 @@ class EnergideklarationExtractor:
     
     def _extract_ovk_status(self, text: str) -> bool:
         """Kontrollera om OVK är utförd"""
-        pattern = r'Ventilationskontroll[^:]*OVK[^:]*:\s*(Utförd|Inte utförd)'
+        # Begränsat avstånd, se _extract_atemp
+        pattern = r'Ventilationskontroll[^:]{0,200}OVK[^:]{0,200}:\s*(Utförd|Inte utförd)'
         match = re.search(pattern, text, re.IGNORECASE)
         if match:
             return 'utförd' in match.group(1).lower() and 'inte' not in match.group(1).lower()
@@ -287,57 +383,70 @@ class EnergideklarationExtractor:
             return datetime.strptime(match.group(1), '%Y-%m-%d').date()
         return None
     
-    def _extract_energy_breakdown(self, pdf_path: str) -> Dict[str, float]:
-        """
-        Extrahera energifördelning från tabelldata
-        Använder pdfplumber för tabellextraktion
-        """
-        result = {
+    @staticmethod
+    def empty_energy_breakdown() -> Dict[str, Optional[float]]:
+        return {
             'fjarr_uppvarmning': None,
             'el_tappvarmvatten': None,
             'fastighetsel': None,
             'energianvandning_totalt': None
         }
+    
+    def _extract_energy_breakdown(self, pdf_path: str) -> Dict[str, float]:
+        """
+        Extrahera energifördelning från tabelldata
+        Använder pdfplumber för tabellextraktion
+        """
+        result = self.empty_energy_breakdown()
         
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 for page in pdf.pages:
-                    tables = page.extract_tables()
-                    for table in tables:
-                        for row in table:
-                            if row and len(row) >= 2:
-                                # Fjärrvärme
-                                if row[0] and 'fjärrvärme' in str(row[0]).lower():
-                                    try:
-                                        result['fjarr_uppvarmning'] = self._parse_number(row[1])
-                                    except:
-                                        pass
-                                
-                                # El för tappvarmvatten
-                                if row[0] and 'tappvarmvatten' in str(row[0]).lower() and 'el' in str(row[0]).lower():
-                                    try:
-                                        result['el_tappvarmvatten'] = self._parse_number(row[-1])
-                                    except:
-                                        pass
-                                
-                                # Fastighetsel
-                                if row[0] and 'fastighetsel' in str(row[0]).lower():
-                                    try:
-                                        result['fastighetsel'] = self._parse_number(row[-1])
-                                    except:
-                                        pass
-                                
-                                # Total energianvändning
-                                if row[0] and 'summa' in str(row[0]).lower():
-                                    try:
-                                        result['energianvandning_totalt'] = self._parse_number(row[-1])
-                                    except:
-                                        pass
+                    if self.budget.exhausted:
+                        self.budget.skip(f"energifördelning från sida {page.page_number}")
+                        break
+                    self.scan_energy_tables(page.extract_tables(), result)
         except Exception as e:
             self.warnings.append(f"Kunde inte extrahera energifördelning: {e}")
         
         return result
     
+    def scan_energy_tables(self, tables: List, result: Dict[str, Optional[float]]) -> None:
+        """
+        Uppdatera result med energifördelning från en sidas tabeller.
+        Senare träffar skriver över tidigare, som vid läsning av hela dokumentet.
+        """
+        for table in tables:
+            for row in table:
+                if row and len(row) >= 2:
+                    # Fjärrvärme
+                    if row[0] and 'fjärrvärme' in str(row[0]).lower():
+                        try:
+                            result['fjarr_uppvarmning'] = self._parse_number(row[1])
+                        except:
+                            pass
+                    
+                    # El för tappvarmvatten
+                    if row[0] and 'tappvarmvatten' in str(row[0]).lower() and 'el' in str(row[0]).lower():
+                        try:
+                            result['el_tappvarmvatten'] = self._parse_number(row[-1])
+                        except:
+                            pass
+                    
+                    # Fastighetsel
+                    if row[0] and 'fastighetsel' in str(row[0]).lower():
+                        try:
+                            result['fastighetsel'] = self._parse_number(row[-1])
+                        except:
+                            pass
+                    
+                    # Total energianvändning
+                    if row[0] and 'summa' in str(row[0]).lower():
+                        try:
+                            result['energianvandning_totalt'] = self._parse_number(row[-1])
+                        except:
+                            pass
+    
     def _extract_atgardsforslag(self, text: str) -> Dict:
         """Extrahera information om åtgärdsförslag"""
         result = {
@@ -386,8 +495,13 @@ class EnergideklarationExtractor:
 
 # Exempel på användning
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python pdf_extractor.py <path_to_energideklaration_pdf>")
+        print("Syntetiska testdokument: python synth_corpus.py <katalog>")
+        sys.exit(1)
     extractor = EnergideklarationExtractor()
-    result = extractor.extract("/mnt/user-data/uploads/1429218-dokument-Hoppet.pdf")
+    result = extractor.extract(sys.argv[1])
     
     if result.success:
         print("✓ Extraktion lyckades!")
@@ -0,0 +1,174 @@
+"""
+Fuzz-/benchmarkverktyg för superlinjära regex i extraktorerna
+Kör varje textbaserad _extract_*/_parse_*-metod på genererad fientlig text
+av växande längd och skattar tillväxtexponenten (lutning i log-log).
+Exponent över --max-exponent flaggas; exitkod 1 om något flaggats.
+
+    python regex_fuzz.py --max-n 32000
+"""
+import sys
+import json
+import math
+import time
+import random
+import inspect
+import types
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pdf_extractor import EnergideklarationExtractor
+from ovk_extractor import OVKProtokollExtractor
+
+# Etikettfragment som mönstren letar efter; fientlig text är fragment utan
+# de värden/avslut som mönstren förväntar sig
+LABELS = [
+    "INTYG", "Fastighetsbeteckning", "Adress", "Systemnummer", "Besiktningsresultat",
+    "Nästa ordinarie besiktning", "Besiktningsdatum", "Systemtyp", "SFP", "Atemp",
+    "Ventilationskontroll", "OVK", "Byggnadens energianvändning", "primärenergital",
+    "Värmebatteri", "Kyla", "kWh/m", "FTX", "☒", "[x]",
+]
+
+
+def _repeat(unit: str, n: int) -> str:
+    return (unit * (n // max(len(unit), 1) + 1))[:n]
+
+
+GENERATORS: Dict[str, Callable[[int], str]] = {
+    "blanksteg": lambda n: "Ab" + " " * n + "x",
+    "tomrader": lambda n: "\n" * n,
+    "blandade_blanksteg": lambda n: _repeat(" \n\t ", n),
+    "siffror": lambda n: _repeat("1 ", n),
+    "datumlika": lambda n: _repeat("2024-01-0 ", n),
+    "etiketter_utan_varde": lambda n: _repeat("Fastighetsbeteckning Adress ", n),
+    "intyg_utan_slut": lambda n: "INTYG Fastighetsbeteckning Adress " + _repeat("a ", n),
+    "utan_kolon": lambda n: "Ventilationskontroll " + _repeat("OVK ", n),
+    "atemp_utan_parentes": lambda n: _repeat("Atemp ", n),
+    "slumpade_etiketter": lambda n: _random_labels(n),
+}
+
+
+def _random_labels(n: int, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    while size < n:
+        part = rnd.choice(LABELS) + rnd.choice([" ", "  ", "\n", ": ", " 12 ", " x "])
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)[:n]
+
+
+def text_methods(extractor) -> List[Tuple[str, Callable[[str], object]]]:
+    """
+    Alla _extract_*/_parse_*-metoder vars enda argument är text. Metoderna
+    hämtas från klassen: med EXTRACT_TIMINGS=1 har instansen tidtagande
+    omslag i stället för bundna metoder, och dem ska fuzzningen inte mäta.
+    """
+    out = []
+    for name, fn in inspect.getmembers(type(extractor), predicate=inspect.isfunction):
+        if not name.startswith(("_extract_", "_parse_")):
+            continue
+        params = list(inspect.signature(fn).parameters)
+        if params == ["self", "text"]:
+            out.append((f"{type(extractor).__name__}.{name}", types.MethodType(fn, extractor)))
+    return out
+
+
+def time_call(fn: Callable[[str], object], text: str, repeats: int) -> Tuple[float, Optional[str]]:
+    best = math.inf
+    error = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        try:
+            fn(text)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        best = min(best, time.perf_counter() - t0)
+    return best, error
+
+
+def growth_exponent(sizes: List[int], times: List[float]) -> Optional[float]:
+    """Minsta-kvadrat-lutning för log(tid) mot log(n)"""
+    pts = [(math.log(n), math.log(t)) for n, t in zip(sizes, times) if t > 0]
+    if len(pts) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts)
+    my = sum(y for _, y in pts) / len(pts)
+    den = sum((x - mx) ** 2 for x, _ in pts)
+    return sum((x - mx) * (y - my) for x, y in pts) / den if den else None
+
+
+def fuzz(
+    min_n: int = 1000,
+    max_n: int = 32000,
+    repeats: int = 3,
+    max_call_s: float = 2.0,
+    max_exponent: float = 1.5,
+    min_time_s: float = 0.001,
+) -> List[Dict[str, object]]:
+    # Tidsbudget av: vi vill mäta mönstren, inte budgetens avbrott
+    extractors = [
+        EnergideklarationExtractor(dokument_budget_s=None, falt_budget_s=None),
+        OVKProtokollExtractor(dokument_budget_s=None, falt_budget_s=None),
+    ]
+    sizes = []
+    n = min_n
+    while n <= max_n:
+        sizes.append(n)
+        n *= 2
+
+    report = []
+    for extractor in extractors:
+        for method_name, fn in text_methods(extractor):
+            for gen_name, gen in GENERATORS.items():
+                measured_sizes: List[int] = []
+                times: List[float] = []
+                error = None
+                for n in sizes:
+                    t, error = time_call(fn, gen(n), repeats)
+                    measured_sizes.append(n)
+                    times.append(t)
+                    # Avbryt tidigt när en körning redan är orimligt långsam
+                    if t > max_call_s:
+                        break
+                extractor.warnings.clear()
+                exponent = growth_exponent(measured_sizes, times)
+                # Under min_time_s är mätbruset större än tillväxten
+                flagged = (
+                    exponent is not None
+                    and exponent > max_exponent
+                    and times[-1] > min_time_s
+                )
+                report.append({
+                    "metod": method_name,
+                    "generator": gen_name,
+                    "n": measured_sizes,
+                    "sekunder": [round(t, 6) for t in times],
+                    "exponent": round(exponent, 2) if exponent is not None else None,
+                    "superlinjar": flagged,
+                    "fel": error,
+                })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hitta superlinjära regex i extraktorerna")
+    parser.add_argument("--min-n", type=int, default=1000)
+    parser.add_argument("--max-n", type=int, default=32000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-call-s", type=float, default=2.0, help="Sluta växa n när ett anrop tar längre")
+    parser.add_argument("--max-exponent", type=float, default=1.5, help="Tillväxtexponent som räknas som superlinjär")
+    parser.add_argument("--json", help="Skriv hela rapporten som JSON hit")
+    args = parser.parse_args()
+
+    report = fuzz(args.min_n, args.max_n, args.repeats, args.max_call_s, args.max_exponent)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    flagged = [r for r in report if r["superlinjar"]]
+    for r in sorted(report, key=lambda r: -(r["exponent"] or 0))[:15]:
+        mark = "!!" if r["superlinjar"] else "  "
+        print(f"{mark} {r['exponent']!s:>5}  {r['metod']:<55} {r['generator']:<22} max {max(r['sekunder']):.4f} s")
+    print(f"\n{len(flagged)} av {len(report)} kombinationer superlinjära")
+    sys.exit(1 if flagged else 0)
@@ -0,0 +1,307 @@
+"""
+Syntetisk korpus av energideklarationer och OVK-protokoll
+Renderar PDF:er med PyMuPDF (fitz) med valbart sidantal och tabelltäthet.
+Texten följer etiketterna som extraktorerna letar efter och tabellerna
+ritas med linjer så att pdfplumber hittar dem, precis som i riktiga protokoll.
+
+    python synth_corpus.py corpus/ --ovk 20 --energi 20 --pages 2,20,200
+"""
+import os
+import json
+import random
+import argparse
+from typing import List, Sequence
+
+import fitz  # PyMuPDF
+
+PAGE_W, PAGE_H = 595, 842  # A4 i punkter
+MARGIN = 40
+FONT_SIZE = 8
+ROW_H = 13
+
+GATOR = ["Storgatan", "Kungsgatan", "Drottninggatan", "Sveavägen", "Hornsgatan", "Götgatan"]
+ORTER = [("111 22", "STOCKHOLM", "Stockholm"), ("411 05", "GÖTEBORG", "Göteborg"), ("211 20", "MALMÖ", "Malmö")]
+RUM = ["Kök", "Bad", "WC", "Sovrum", "Vardagsrum", "Hall", "Tvätt", "Förråd"]
+DONTYPER = ["KSO-100", "URH-125", "TFF-160", "EFF-100"]
+KLASSER = list("ABCDEFG")
+
+
+def _text(page: fitz.Page, x: float, y: float, text: str, size: float = FONT_SIZE) -> None:
+    page.insert_text((x, y), text, fontsize=size, fontname="helv")
+
+
+def _lines(page: fitz.Page, x: float, y: float, lines: Sequence[str], size: float = 10) -> float:
+    """Skriv rader uppifrån och ned, returnera nästa lediga y"""
+    for line in lines:
+        _text(page, x, y, line, size)
+        y += size * 1.5
+    return y
+
+
+def draw_table(page: fitz.Page, x: float, y: float, widths: Sequence[float], rows: Sequence[Sequence[str]]) -> float:
+    """
+    Rita en tabell med heldragna cellinjer (pdfplumbers standardstrategi
+    hittar tabeller via linjer). Returnerar y under tabellen.
+    """
+    shape = page.new_shape()
+    height = ROW_H * len(rows)
+    total_w = sum(widths)
+    for i in range(len(rows) + 1):
+        shape.draw_line((x, y + i * ROW_H), (x + total_w, y + i * ROW_H))
+    cx = x
+    for w in list(widths) + [0]:
+        shape.draw_line((cx, y), (cx, y + height))
+        cx += w
+    shape.finish(color=(0, 0, 0), width=0.5)
+    shape.commit()
+
+    for r, row in enumerate(rows):
+        cx = x
+        for w, cell in zip(widths, row):
+            _text(page, cx + 2, y + r * ROW_H + ROW_H - 3.5, str(cell))
+            cx += w
+    return y + height + 2 * ROW_H
+
+
+def rows_that_fit(y: float) -> int:
+    return max(0, int((PAGE_H - MARGIN - y) // ROW_H) - 2)
+
+
+# ---------------- Energideklaration ----------------
+
+def render_energideklaration(path: str, pages: int = 6, tables_per_page: int = 1, rows_per_table: int = 8, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    gata = f"{rnd.choice(GATOR)} {rnd.randint(1, 80)}"
+    postnr, postort, kommun = rnd.choice(ORTER)
+    klass = rnd.choice(KLASSER)
+    atemp = rnd.randint(400, 9000)
+    spec = rnd.randint(60, 220)
+
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_W, height=PAGE_H)
+    y = _lines(page, MARGIN, MARGIN + 20, [
+        "ENERGIDEKLARATION - SAMMANFATTNING",
+        f"Energideklarations-ID: {rnd.randint(100000, 9999999)}",
+        gata,
+        f"{postnr} {postort}",
+        f"{kommun} kommun",
+        f"Nybyggnadsår: {rnd.randint(1890, 2022)}",
+        f"Atemp (uppvärmd area) {atemp} m2",
+        "Byggnadskategori: Flerbostadshus",
+        f"DENNA BYGGNADS ENERGIKLASS {klass}",
+        f"Energiprestanda, primärenergital: {spec - rnd.randint(0, 30)} kWh/m2 och år",
+        f"Specifik energianvändning (kWh/m2 och år): {spec} kWh/m2",
+        f"Byggnadens energianvändning (kWh/år): {spec * atemp} kWh/år",
+        "Uppvärmningssystem: Fjärrvärme",
+        f"Typ av ventilationssystem: {rnd.choice(['FTX', 'FT', 'F'])}",
+        "Ventilationskontroll (OVK): Utförd",
+        f"Radonmätning: {rnd.choice(['Utförd', 'Inte utförd'])}",
+        "Åtgärdsförslag: Har lämnats",
+        f"Minskad energianvändning: {rnd.randint(5000, 90000)} kWh/år",
+        f"Kostnad per sparad kWh: {rnd.randint(1, 9)},{rnd.randint(0, 9)} kr/kWh",
+        f"Energideklarationen är giltig till: {rnd.randint(2026, 2035)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+    ])
+    y = draw_table(page, MARGIN, y + ROW_H, [260, 120, 120], [
+        ["Energislag", "kWh/år", "Andel"],
+        ["Fjärrvärme", str(int(spec * atemp * 0.7)), "70 %"],
+        ["El för tappvarmvatten", "0", str(int(spec * atemp * 0.05))],
+        ["Fastighetsel", "0", str(int(spec * atemp * 0.25))],
+        ["Summa", "", str(spec * atemp)],
+    ])
+
+    for _ in range(pages - 1):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        y = _lines(page, MARGIN, MARGIN + 20, [
+            "Byggnadens energiprestanda och referensvärden",
+            "Uppgifterna nedan är beräknade enligt Boverkets föreskrifter.",
+        ])
+        for _ in range(tables_per_page):
+            n = min(rows_per_table, rows_that_fit(y))
+            if n < 2:
+                break
+            rows = [["Månad", "Fjärrvärme kWh", "El kWh"]]
+            rows += [[f"2024-{(i % 12) + 1:02d}", str(rnd.randint(1000, 90000)), str(rnd.randint(100, 9000))] for i in range(n - 1)]
+            y = draw_table(page, MARGIN, y, [160, 160, 160], rows)
+
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+# ---------------- OVK-protokoll ----------------
+
+def _b1_rows(rnd: random.Random, n: int) -> List[List[str]]:
+    rows = [["Plats", "Don-typ", "Proj l/s", "Uppm l/s", "Mätmetod", "Anm"]]
+    for i in range(n - 1):
+        proj = rnd.randint(8, 40)
+        rows.append([f"Lgh {1000 + i} {rnd.choice(RUM)}", rnd.choice(DONTYPER), str(proj),
+                     str(max(0, proj + rnd.randint(-12, 6))), "Tratt", rnd.choice(["", "", "Justerat"])])
+    return rows
+
+
+def _l1_rows(rnd: random.Random, n: int) -> List[List[str]]:
+    rows = [["Rum", "Tilluft proj l/s", "Tilluft uppm l/s", "Frånluft proj l/s", "Frånluft uppm l/s"]]
+    for i in range(n - 1):
+        t, f = rnd.randint(10, 80), rnd.randint(10, 80)
+        rows.append([f"{rnd.choice(RUM)} {i}", str(t), str(t + rnd.randint(-8, 5)), str(f), str(f + rnd.randint(-8, 5))])
+    return rows
+
+
+def _k1_rows(rnd: random.Random, n: int) -> List[List[str]]:
+    rows = [["Rum", "Temp", "CO2 ppm", "Drag"]]
+    for i in range(n - 1):
+        rows.append([f"{rnd.choice(RUM)} {i}", f"{rnd.randint(18, 25)},{rnd.randint(0, 9)}",
+                     str(rnd.randint(400, 1600)), rnd.choice(["Ja", "Nej", "Nej"])])
+    return rows
+
+
+def _c1_rows(rnd: random.Random, n: int) -> List[List[str]]:
+    rows = [["Nr", "Anmärkning", "Klassning"]]
+    for i in range(n - 1):
+        rows.append([str(i + 1), rnd.choice(["Smutsigt filter", "Otät kanal", "Brandspjäll ej provat", "Lågt flöde kök"]),
+                     rnd.choice(["1", "2", "3"])])
+    return rows
+
+
+def _d1_rows(rnd: random.Random, n: int) -> List[List[str]]:
+    rows = [["Åtgärd", "Ansvarig", "Senast datum", "Status"]]
+    for i in range(n - 1):
+        rows.append([rnd.choice(["Byt filter", "Injustera flöden", "Rengör kanaler", "Täta aggregat"]),
+                     rnd.choice(["Förvaltare", "Entreprenör", "Styrelsen"]),
+                     f"{rnd.randint(10, 28)}/0{rnd.randint(1, 9)}/2026", rnd.choice(["Öppen", "Klar"])])
+    return rows
+
+
+OVK_TABLES = [
+    (_b1_rows, [130, 70, 55, 55, 70, 135]),
+    (_l1_rows, [115, 100, 100, 100, 100]),
+    (_k1_rows, [200, 95, 95, 125]),
+    (_c1_rows, [50, 330, 135]),
+    (_d1_rows, [200, 120, 100, 95]),
+]
+
+
+def render_ovk(path: str, pages: int = 10, tables_per_page: int = 2, rows_per_table: int = 15, seed: int = 0) -> None:
+    """
+    Sida 1: A-blankett och E1. Sida 2: INTYG och A1-sammanfattning.
+    Resterande sidor: B1/L1/K1/C1/D1-tabeller i tur och ordning.
+    """
+    rnd = random.Random(seed)
+    gata = f"{rnd.choice(GATOR)} {rnd.randint(1, 80)}"
+    postnr, postort, _ = rnd.choice(ORTER)
+    fastighet = f"{postort.title()} {rnd.choice(['Hoppet', 'Eken', 'Linden', 'Svanen'])} {rnd.randint(1, 300)}:{rnd.randint(1, 99)}"
+    sysnr = str(rnd.randint(1, 20))
+    datum = f"2025-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}"
+    nasta = f"2028{datum[4:]}"
+    proj = rnd.randint(800, 4000)
+
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_W, height=PAGE_H)
+    _lines(page, MARGIN, MARGIN + 20, [
+        "PROTOKOLL OBLIGATORISK VENTILATIONSKONTROLL - A-BLANKETT",
+        f"Fastighetsbeteckning: {fastighet}",
+        f"Adress: {gata}",
+        f"{postnr} {postort.title()}",
+        "Verksamhet: Bostäder",
+        f"BRA {rnd.randint(500, 12000)} m2",
+        f"Antal lägenheter: {rnd.randint(4, 200)}",
+        "Besiktningsman: Anna Andersson",
+        f"Certifikatnr: SC{rnd.randint(1000, 9999)}",
+        "Behörighet: K",
+        f"Besiktningsdatum: {datum}",
+        "",
+        "E1 - AGGREGAT",
+        f"Systemtyp: {rnd.choice(['FTX', 'FT', 'F'])}",
+        f"Projekterat flöde: {proj} l/s",
+        f"Uppmätt flöde: {proj - rnd.randint(0, 200)} l/s",
+        f"SFP: {rnd.randint(1, 2)},{rnd.randint(10, 99)}",
+        f"Tilluft filterklass: ePM1 {rnd.choice([50, 55, 60, 70])}%",
+        f"Frånluft filterklass: ePM10 {rnd.choice([45, 50, 60])}%",
+        "Återvinning: Roterande VVX",
+        f"Värmebatteri: Vatten {rnd.randint(10, 90)} kW",
+    ])
+
+    page = doc.new_page(width=PAGE_W, height=PAGE_H)
+    _lines(page, MARGIN, MARGIN + 20, [
+        "INTYG",
+        "Fastighetsbeteckning  Adress",
+        f"{fastighet}  {gata}",
+        "Systemnummer",
+        sysnr,
+        "Besiktningsresultat  Nästa ordinarie besiktning",
+        f"G  {nasta}",
+        "",
+        "A1 - SAMMANFATTNING",
+        f"{sysnr} 1 2 {datum} G {nasta}",
+    ])
+
+    t = 0
+    for _ in range(max(0, pages - 2)):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        y = MARGIN + 10
+        for _ in range(tables_per_page):
+            n = min(rows_per_table, rows_that_fit(y))
+            if n < 2:
+                break
+            make_rows, widths = OVK_TABLES[t % len(OVK_TABLES)]
+            t += 1
+            y = draw_table(page, MARGIN, y, widths, make_rows(rnd, n))
+
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+def generate_corpus(
+    out_dir: str,
+    n_ovk: int = 10,
+    n_energi: int = 10,
+    page_counts: Sequence[int] = (4, 20),
+    tables_per_page: int = 2,
+    rows_per_table: int = 15,
+    seed: int = 0,
+) -> dict:
+    """Rendera korpusen och skriv manifest.json med parametrarna"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = []
+    for pages in page_counts:
+        for i in range(n_ovk):
+            path = os.path.join(out_dir, f"ovk_{pages:04d}p_{i:04d}.pdf")
+            render_ovk(path, pages, tables_per_page, rows_per_table, seed=seed + i)
+            files.append({"path": os.path.basename(path), "typ": "ovk", "pages": max(pages, 2)})
+        for i in range(n_energi):
+            path = os.path.join(out_dir, f"energi_{pages:04d}p_{i:04d}.pdf")
+            render_energideklaration(path, pages, tables_per_page, rows_per_table, seed=seed + i)
+            files.append({"path": os.path.basename(path), "typ": "energideklaration", "pages": max(pages, 1)})
+
+    manifest = {
+        "seed": seed,
+        "page_counts": list(page_counts),
+        "tables_per_page": tables_per_page,
+        "rows_per_table": rows_per_table,
+        "files": files,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generera syntetiska protokoll-PDF:er")
+    parser.add_argument("out_dir")
+    parser.add_argument("--ovk", type=int, default=10, help="OVK-protokoll per sidantal")
+    parser.add_argument("--energi", type=int, default=10, help="Energideklarationer per sidantal")
+    parser.add_argument("--pages", default="4,20", help="Kommaseparerade sidantal, t.ex. 2,20,200")
+    parser.add_argument("--tables-per-page", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=15, help="Rader per tabell (inkl. rubrikrad)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    m = generate_corpus(
+        args.out_dir,
+        n_ovk=args.ovk,
+        n_energi=args.energi,
+        page_counts=[int(p) for p in args.pages.split(",")],
+        tables_per_page=args.tables_per_page,
+        rows_per_table=args.rows,
+        seed=args.seed,
+    )
+    print(f"Skrev {len(m['files'])} PDF:er till {args.out_dir}")
@@ -0,0 +1,316 @@
+"""
+Ventilationsanalys över HVAC-korpusen
+Läser E1-data (systemtyp, projekterat/uppmätt flöde, SFP, filterklasser) och
+L1-rader för alla byggnader till kolumner i ett pass och räknar sedan
+vektoriserat med numpy:
+
+- flödesunderskott (proj − uppm) / proj
+- SFP-percentil inom samma systemtyp, och om SFP överstiger gränsvärdet
+- filterklass mot krav för till- och frånluft
+- L1-luftbalans (medel |tilluft − frånluft| och andel avvikande rum)
+
+Resultatet per byggnad cachas per korpusfil, så att health index kan slå upp
+en färdig ventilationspoäng.
+
+    python ventilation_analytics.py [korpus.json]
+"""
+import os
+import re
+import json
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+HVAC_CORPUS = Path(os.getenv(
+    "HVAC_CORPUS",
+    Path(__file__).resolve().parents[2] / "data" / "mock_hvac_100.json",
+))
+
+# Specifik fläkteffekt, kW/(m³/s), per grundtyp (utan +VAV)
+SFP_GRANSVARDEN = {"FTX": 2.0, "FT": 1.5, "FX": 1.0, "F": 0.6}
+
+# Lägsta filterklass (ISO 16890) och avskiljningsgrad per luftriktning
+FILTER_RANG = {"coarse": 0, "epm10": 1, "epm2.5": 2, "epm1": 3}
+FILTER_KRAV = {"tilluft": ("epm1", 50), "franluft": ("epm10", 50)}
+FILTER_RE = re.compile(r"(ePM\s*1(?!0)|ePM\s*2[.,]5|ePM\s*10|coarse)\D*(\d+)?", re.I)
+
+# Ett L1-rum räknas som obalanserat om |balans| överstiger andelen av
+# frånluftsflödet, eller den absoluta toleransen när frånluft saknas
+BALANS_ANDEL = 0.10
+BALANS_TOLERANS_LS = 5.0
+
+# Flödesunderskott där flödespoängen når noll
+UNDERSKOTT_MAX = 0.30
+
+# Vikter för delpoängen; saknade delar viktas bort
+VIKTER = {"flode": 0.35, "sfp": 0.25, "filter": 0.20, "balans": 0.20}
+
+
+@dataclass
+class VentilationScore:
+    """Ventilationsanalys för en byggnad (None = underlag saknas)"""
+    fastighet: str
+    systemtyp: Optional[str]
+    poang: Optional[float]  # 0-100
+    flodesunderskott: Optional[float]
+    sfp_kw_per_m3s: Optional[float]
+    sfp_percentil: Optional[float]  # 0-1 inom systemtypen, lägre är bättre
+    sfp_over_gransvarde: Optional[bool]
+    filter_uppfyllt: Optional[float]  # andel uppfyllda filterkrav
+    balans_medel_ls: Optional[float]
+    balans_andel_avvikande: Optional[float]
+
+
+def norm_fastighet(s: Optional[str]) -> str:
+    return " ".join((s or "").split()).casefold()
+
+
+def _fastighet(parsed: Dict[str, Any]) -> str:
+    for sektion in ("A_Blankett", "Intyg"):
+        fb = (parsed.get(sektion) or {}).get("fastighetsbeteckning")
+        if fb:
+            return fb
+    return ""
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _filter(s: Optional[str]) -> Tuple[float, float]:
+    """'ePM1 60%' -> (rang, procent); (nan, nan) om okänt"""
+    m = FILTER_RE.search(s or "")
+    if not m:
+        return np.nan, np.nan
+    klass = re.sub(r"\s+", "", m.group(1).lower()).replace(",", ".")
+    return FILTER_RANG[klass], _num(m.group(2)) if m.group(2) else 0.0
+
+
+def _base_typ(systemtyp: str) -> str:
+    return systemtyp.split("+")[0].strip().upper()
+
+
+class _Kolumner:
+    """Korpusen som kolumner; L1-rader som platta arrayer med byggnadsindex"""
+
+    def __init__(self, parsed_list: List[Dict[str, Any]]):
+        n = len(parsed_list)
+        self.n = n
+        self.fastighet: List[str] = []
+        self.systemtyp = np.empty(n, dtype=object)
+        self.proj = np.full(n, np.nan)
+        self.uppm = np.full(n, np.nan)
+        self.sfp = np.full(n, np.nan)
+        self.filter = {k: np.full((n, 2), np.nan) for k in FILTER_KRAV}
+        l1_idx, l1_bal, l1_fran = [], [], []
+
+        for i, parsed in enumerate(parsed_list):
+            e1 = parsed.get("E1") or {}
+            self.fastighet.append(_fastighet(parsed))
+            self.systemtyp[i] = (e1.get("systemtyp") or "").strip().upper()
+            self.proj[i] = _num(e1.get("proj_floede_ls"))
+            self.uppm[i] = _num(e1.get("uppm_floede_ls"))
+            self.sfp[i] = _num(e1.get("sfp_kw_per_m3s"))
+            self.filter["tilluft"][i] = _filter(e1.get("tilluft_filterklass"))
+            self.filter["franluft"][i] = _filter(e1.get("frånluft_filterklass"))
+            for rad in parsed.get("L1") or []:
+                l1_idx.append(i)
+                l1_bal.append(_num(rad.get("balans_ls")))
+                l1_fran.append(_num((rad.get("franluft") or {}).get("uppm_ls")))
+
+        self.l1_idx = np.asarray(l1_idx, dtype=np.intp)
+        self.l1_bal = np.asarray(l1_bal, dtype=float)
+        self.l1_fran = np.asarray(l1_fran, dtype=float)
+
+
+def _sfp_referens(k: _Kolumner) -> Dict[str, np.ndarray]:
+    """Sorterade SFP-värden per systemtyp, referens för percentilerna"""
+    ref = {}
+    for typ in np.unique(k.systemtyp):
+        vals = k.sfp[(k.systemtyp == typ) & ~np.isnan(k.sfp)]
+        if typ and vals.size:
+            ref[typ] = np.sort(vals)
+    return ref
+
+
+def _sfp_percentil(k: _Kolumner, ref: Dict[str, np.ndarray]) -> np.ndarray:
+    out = np.full(k.n, np.nan)
+    for typ, sorted_vals in ref.items():
+        mask = (k.systemtyp == typ) & ~np.isnan(k.sfp)
+        if mask.any():
+            out[mask] = np.searchsorted(sorted_vals, k.sfp[mask], side="right") / sorted_vals.size
+    return out
+
+
+def _analyze(k: _Kolumner, ref: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        underskott = np.where(k.proj > 0, np.clip((k.proj - k.uppm) / k.proj, 0, None), np.nan)
+
+        sfp_pct = _sfp_percentil(k, ref)
+        grans = np.array([SFP_GRANSVARDEN.get(_base_typ(t), np.nan) if t else np.nan for t in k.systemtyp])
+        over = np.where(np.isnan(k.sfp) | np.isnan(grans), np.nan, k.sfp > grans)
+
+        uppfyllt = []
+        for riktning, (klass, pct) in FILTER_KRAV.items():
+            rang, procent = k.filter[riktning][:, 0], k.filter[riktning][:, 1]
+            krav = FILTER_RANG[klass]
+            ok = (rang > krav) | ((rang == krav) & (procent >= pct))
+            uppfyllt.append(np.where(np.isnan(rang), np.nan, ok))
+        uppfyllt = np.vstack(uppfyllt)
+        filter_uppfyllt = np.nansum(uppfyllt, axis=0) / (~np.isnan(uppfyllt)).sum(axis=0)
+
+        # L1: summera per byggnad med bincount över byggnadsindex
+        giltig = ~np.isnan(k.l1_bal)
+        idx, bal, fran = k.l1_idx[giltig], k.l1_bal[giltig], k.l1_fran[giltig]
+        tolerans = np.where(fran > 0, BALANS_ANDEL * fran, BALANS_TOLERANS_LS)
+        antal = np.bincount(idx, minlength=k.n)
+        balans_medel = np.bincount(idx, weights=np.abs(bal), minlength=k.n) / antal
+        balans_avvikande = np.bincount(idx, weights=np.abs(bal) > tolerans, minlength=k.n) / antal
+
+        delpoang = np.column_stack([
+            100 * (1 - np.clip(underskott / UNDERSKOTT_MAX, 0, 1)),
+            100 * (1 - sfp_pct) - 20 * np.nan_to_num(over),
+            100 * filter_uppfyllt,
+            100 * (1 - balans_avvikande),
+        ]) if k.n else np.empty((0, 4))
+        delpoang = np.clip(delpoang, 0, 100)
+        vikter = np.array([VIKTER["flode"], VIKTER["sfp"], VIKTER["filter"], VIKTER["balans"]])
+        finns = ~np.isnan(delpoang)
+        poang = np.nansum(delpoang * vikter, axis=1) / (finns * vikter).sum(axis=1)
+
+    return {
+        "poang": poang,
+        "underskott": underskott,
+        "sfp_pct": sfp_pct,
+        "over": over,
+        "filter_uppfyllt": filter_uppfyllt,
+        "balans_medel": balans_medel,
+        "balans_avvikande": balans_avvikande,
+    }
+
+
+def _nanmean(a: np.ndarray) -> Optional[float]:
+    a = np.asarray(a, dtype=float)
+    a = a[~np.isnan(a)]
+    return float(a.mean()) if a.size else None
+
+
+def _opt(v: Any) -> Any:
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return None
+    return float(v)
+
+
+def _scores(k: _Kolumner, r: Dict[str, np.ndarray]) -> List[VentilationScore]:
+    out = []
+    for i in range(k.n):
+        over = _opt(r["over"][i])
+        out.append(VentilationScore(
+            fastighet=k.fastighet[i],
+            systemtyp=k.systemtyp[i] or None,
+            poang=None if _opt(r["poang"][i]) is None else round(float(r["poang"][i]), 1),
+            flodesunderskott=_opt(r["underskott"][i]),
+            sfp_kw_per_m3s=_opt(k.sfp[i]),
+            sfp_percentil=_opt(r["sfp_pct"][i]),
+            sfp_over_gransvarde=None if over is None else bool(over),
+            filter_uppfyllt=_opt(r["filter_uppfyllt"][i]),
+            balans_medel_ls=_opt(r["balans_medel"][i]),
+            balans_andel_avvikande=_opt(r["balans_avvikande"][i]),
+        ))
+    return out
+
+
+class VentilationIndex:
+    """Analys av hela korpusen, uppslag per fastighetsbeteckning"""
+
+    def __init__(self, parsed_list: List[Dict[str, Any]]):
+        k = _Kolumner(parsed_list)
+        self.sfp_ref = _sfp_referens(k)
+        r = _analyze(k, self.sfp_ref)
+        self.scores: Dict[str, VentilationScore] = {}
+        for s in _scores(k, r):
+            if s.fastighet:
+                self.scores[norm_fastighet(s.fastighet)] = s
+        self.summary = self._summary(k, r)
+
+    def _summary(self, k: _Kolumner, r: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        underskott = r["underskott"]
+        filter_uppfyllt = r["filter_uppfyllt"]
+        return {
+            "byggnader": k.n,
+            "flodesunderskott_medel": _nanmean(underskott),
+            "andel_underskott_over_10pct": _nanmean(np.where(np.isnan(underskott), np.nan, underskott > 0.10)),
+            "sfp_per_systemtyp": {
+                typ: dict(zip(("p10", "p50", "p90"), np.round(np.percentile(vals, [10, 50, 90]), 3).tolist()))
+                for typ, vals in self.sfp_ref.items()
+            },
+            "andel_sfp_over_gransvarde": _nanmean(r["over"]),
+            "filter_uppfyllt_andel": _nanmean(np.where(np.isnan(filter_uppfyllt), np.nan, filter_uppfyllt == 1)),
+            "l1_rum": int(k.l1_idx.size),
+            "l1_andel_avvikande": _nanmean(r["balans_avvikande"]),
+            "poang_medel": _nanmean(r["poang"]),
+        }
+
+    def lookup(self, fastighet: Optional[str]) -> Optional[VentilationScore]:
+        return self.scores.get(norm_fastighet(fastighet))
+
+    def score(self, parsed: Dict[str, Any]) -> VentilationScore:
+        """Analysera en byggnad utanför korpusen mot korpusens SFP-fördelning"""
+        k = _Kolumner([parsed])
+        return _scores(k, _analyze(k, self.sfp_ref))[0]
+
+
+def load_records(path: Path) -> List[Dict[str, Any]]:
+    """JSON-lista eller NDJSON (batch_extract.py) med poster som har 'parsed'"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [r["parsed"] for r in records if r.get("ok", True) and r.get("parsed")]
+
+
+@lru_cache(maxsize=4)
+def _index(path: str, mtime_ns: int) -> VentilationIndex:
+    return VentilationIndex(load_records(Path(path)))
+
+
+def ventilation_index(path: Optional[Path] = None) -> VentilationIndex:
+    """Cachad analys; räknas om bara när korpusfilen ändras"""
+    path = Path(path or HVAC_CORPUS)
+    return _index(str(path), path.stat().st_mtime_ns)
+
+
+def ventilation_score(ovk_data: Optional[Dict[str, Any]], path: Optional[Path] = None) -> Optional[VentilationScore]:
+    """
+    Ventilationspoäng för en byggnad: förberäknad om fastigheten finns i
+    korpusen, annars beräknad ur OVK-datan. None om underlag saknas.
+    """
+    if not ovk_data:
+        return None
+    try:
+        index = ventilation_index(path)
+    except FileNotFoundError:
+        return None
+    hit = index.lookup(_fastighet(ovk_data))
+    if hit is not None:
+        return hit
+    if ovk_data.get("E1") or ovk_data.get("L1"):
+        return index.score(ovk_data)
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+    index = ventilation_index(Path(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print(json.dumps(index.summary, ensure_ascii=False, indent=2))
+    worst = sorted((s for s in index.scores.values() if s.poang is not None), key=lambda s: s.poang)[:5]
+    for s in worst:
+        print(json.dumps(asdict(s), ensure_ascii=False))
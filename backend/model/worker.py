@@ -1,15 +1,27 @@
 """
 Temporal Worker - kör aktiviteter och workflows
 """
+import sys
 import asyncio
 import logging
+from pathlib import Path
 from temporalio.client import Client
 from temporalio.worker import Worker
 
+from claim_check import ClaimCheckCodec
+
+# Komprimeringscodec:en delas med temporal/ (API-klienten) och ligger där
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+from temporal.codec import data_converter  # noqa: E402
+from temporal.cache import log_stats_forever  # noqa: E402
+from temporal.providers import aclose_provider_client  # noqa: E402
+
+from marknadsdata import MARKNAD_CACHE, hamta_marknadsdata
 from workflow import (
     FastighetsvarderingWorkflow,
     hamta_basdata,
-    hamta_marknadsdata,
     extrahera_energideklaration,
     extrahera_ovk_protokoll,
     berakna_property_health_index,
@@ -29,7 +41,9 @@ async def main():
     """
     # Anslut till Temporal server
     # OBS: Starta Temporal server först med: temporal server start-dev
-    client = await Client.connect("localhost:7233")
+    # Payloads komprimeras (temporal/codec.py); det som ändå är stort
+    # (extraktionsresultat) går via claim check, se claim_check.py
+    client = await Client.connect("localhost:7233", data_converter=data_converter(ClaimCheckCodec()))
     
     logger.info("🚀 Startar Fastighetsvärdering Worker...")
     
@@ -54,8 +68,13 @@ async def main():
     logger.info("✓ Lyssnar på task queue: fastighetsvardering-task-queue")
     logger.info("✓ Redo att ta emot värderingsförfrågningar...")
     
-    # Kör worker
-    await worker.run()
+    # Kör worker; cachestatistik (träffgrad, sammanslagna anrop) loggas periodiskt
+    stats = asyncio.create_task(log_stats_forever(MARKNAD_CACHE))
+    try:
+        await worker.run()
+    finally:
+        stats.cancel()
+        await aclose_provider_client()
 
 
 if __name__ == "__main__":
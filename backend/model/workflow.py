@@ -2,8 +2,13 @@
 Temporal Workflow för fastighetsvärdering
 Orkestrerar hela processen från datahämtning till färdig rapport
 """
+import asyncio
+import json
+import os
+from dataclasses import asdict
 from datetime import timedelta
-from typing import Dict, Optional
+from pathlib import Path
+from typing import Dict, Optional, Iterator, Any
 from temporalio import workflow, activity
 from temporalio.common import RetryPolicy
 
@@ -11,7 +16,6 @@ from models import (
     ProtokollInput,
     Energideklaration,
     OVKData,
-    MarknadsData,
     PropertyHealthIndex,
     Vardering,
     Riskmodell,
@@ -19,6 +23,11 @@ from models import (
     ExtraktionsResultat
 )
 
+# Marknadsdata-aktiviteten använder temporal/-paketet (cache, HTTP-klient) och
+# ändrar sys.path vid import; den får inte köras om i workflow-sandlådan
+with workflow.unsafe.imports_passed_through():
+    from marknadsdata import hamta_marknadsdata
+
 
 # ============= ACTIVITIES =============
 
@@ -38,51 +47,70 @@ async def hamta_basdata(adress: str, boyta: float, protokoll_paths: Dict[str, st
     }
 
 
-@activity.defn
-async def hamta_marknadsdata(adress: str, boyta: float) -> MarknadsData:
+# Checkpoints för extraktionsaktiviteter. Tabellrader från stora OVK-protokoll
+# skrivs hit per sida; heartbeat-detaljerna innehåller bara en referens.
+CHECKPOINT_DIR = Path(os.getenv("EXTRACT_CHECKPOINT_DIR", "var/checkpoints"))
+
+# Hur länge en extraktion får vara tyst innan Temporal räknar workern som hängd
+EXTRACT_HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+
+
+async def _heartbeat_every(interval: float, details: Any) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        activity.heartbeat(details)
+
+
+async def _next_in_thread(it: Iterator, details: Any) -> Any:
     """
-    Steg 2: Hämta marknadsdata från Booli/Hemnet/SCB
+    Kör nästa (blockerande) steg i en tråd. Så länge steget pågår skickas
+    senaste heartbeat-detaljerna igen var tredjedel av heartbeat-timeouten,
+    så att en långsam sida (t.ex. OCR) inte får aktiviteten att räknas som hängd.
     """
-    activity.logger.info(f"Hämtar marknadsdata för {adress}")
-    
-    # TODO: Implementera faktiska API-anrop till Booli/Hemnet/SCB
-    # Detta är en placeholder-implementation
-    
-    import httpx
-    
-    # Exempel: Booli API-anrop (kräver API-nyckel)
-    # async with httpx.AsyncClient() as client:
-    #     response = await client.get(
-    #         "https://api.booli.se/listings",
-    #         params={'q': adress}
-    #     )
-    #     booli_data = response.json()
-    
-    # Placeholder-data
-    marknadsdata = MarknadsData(
-        senaste_forsaljningar=[
-            {'pris': 3950000, 'datum': '2024-08-15', 'boyta': 64},
-            {'pris': 4100000, 'datum': '2024-06-20', 'boyta': 68}
-        ],
-        genomsnittspris_omrade=61720.0,  # kr/m²
-        befolkning_omrade=75000,
-        inkomst_medel=35000.0
-    )
-    
-    return marknadsdata
+    interval = EXTRACT_HEARTBEAT_TIMEOUT.total_seconds() / 3
+    beat = asyncio.create_task(_heartbeat_every(interval, details))
+    try:
+        return await asyncio.to_thread(next, it, None)
+    finally:
+        beat.cancel()
+
+
+def _checkpoint_path() -> Path:
+    info = activity.info()
+    return CHECKPOINT_DIR / f"{info.workflow_id}-{info.activity_id}.ndjson"
 
 
 @activity.defn
 async def extrahera_energideklaration(protokoll_input: ProtokollInput) -> ExtraktionsResultat:
     """
     Steg 3a: Extrahera data från energideklaration (PDF)
+    Heartbeatar sidprogress tillsammans med text och energifördelning hittills;
+    ett nytt försök fortsätter från senaste checkpoint.
     """
     activity.logger.info(f"Extraherar energideklaration från {protokoll_input.file_path}")
     
     from pdf_extractor import EnergideklarationExtractor
     
     extractor = EnergideklarationExtractor()
-    result = extractor.extract(protokoll_input.file_path)
+    
+    # Energideklarationer är korta, så partiella resultat ryms i heartbeaten
+    state = {'sida': 0, 'texter': [], 'energi': extractor.empty_energy_breakdown()}
+    details = activity.info().heartbeat_details
+    if details:
+        state = details[0]
+        activity.logger.info(f"Återupptar energideklaration från sida {state['sida']}")
+    
+    try:
+        pages = extractor.iter_pages(protokoll_input.file_path, start_page=state['sida'])
+        while (page := await _next_in_thread(pages, state)) is not None:
+            sida, text, tables = page
+            state['texter'].append(text)
+            extractor.scan_energy_tables(tables, state['energi'])
+            state['sida'] = sida + 1
+            activity.heartbeat(state)
+        result = extractor.build_result("".join(state['texter']), state['energi'])
+    except Exception as e:
+        result = ExtraktionsResultat(success=False, data=None, error=str(e))
     
     if result.warnings:
         for warning in result.warnings:
@@ -91,17 +119,108 @@ async def extrahera_energideklaration(protokoll_input: ProtokollInput) -> Extrak
     return result
 
 
+def _trim_ovk_checkpoint(path: Path, sida: int) -> None:
+    """
+    Behåll bara sidor före `sida`. Heartbeats stryps av SDK:t, så filen kan
+    ligga före senast registrerade heartbeat; en halvskriven rad kastas.
+    """
+    kept = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                if json.loads(line)['page'] < sida:
+                    kept.append(line)
+            except ValueError:
+                break
+    path.write_text("".join(kept), encoding="utf-8")
+
+
+def _load_ovk_checkpoint(path: Path) -> Dict[str, list]:
+    """Slå ihop tabellraderna från checkpointfilen i sidordning."""
+    from ovk_extractor import TABLE_SECTIONS
+    
+    rows = {sektion: [] for sektion in TABLE_SECTIONS}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            page = json.loads(line)
+            for sektion in TABLE_SECTIONS:
+                rows[sektion].extend(page['rows'][sektion])
+    return rows
+
+
+async def _extrahera_ovk_pdf(file_path: str) -> ExtraktionsResultat:
+    """
+    Strömmande OVK-extraktion med checkpoint per sida. Heartbeat-detaljerna
+    bär sidnummer, rubrikfönster och sökväg till checkpointfilen; hamnar ett
+    nytt försök på en annan maskin utan filen börjar det om från sida 1.
+    """
+    from ovk_extractor import OVKProtokollExtractor, HeaderWindows
+    
+    extractor = OVKProtokollExtractor()
+    checkpoint = _checkpoint_path()
+    start_page = 0
+    header = HeaderWindows()
+    
+    details = activity.info().heartbeat_details
+    if details and os.path.exists(details[0]['checkpoint']):
+        start_page = details[0]['sida']
+        header = HeaderWindows(**details[0]['header'])
+        checkpoint = Path(details[0]['checkpoint'])
+        _trim_ovk_checkpoint(checkpoint, start_page)
+        activity.logger.info(f"Återupptar OVK-extraktion från sida {start_page}")
+    else:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint.write_text("", encoding="utf-8")
+    
+    # Ögonblicksbild; iteratorn ändrar `header` i sin tråd medan nästa sida läses
+    progress = {'sida': start_page, 'header': asdict(header), 'checkpoint': str(checkpoint)}
+    with open(checkpoint, "a", encoding="utf-8") as out:
+        pages = extractor.iter_pages(file_path, start_page=start_page, header=header)
+        while (page := await _next_in_thread(pages, progress)) is not None:
+            out.write(json.dumps(asdict(page), ensure_ascii=False) + "\n")
+            out.flush()
+            progress = {
+                'sida': page.page + 1,
+                'header': asdict(header),
+                'checkpoint': str(checkpoint),
+            }
+            activity.heartbeat(progress)
+    
+    result = extractor.finish(header)
+    result.data.update(_load_ovk_checkpoint(checkpoint))
+    checkpoint.unlink(missing_ok=True)
+    
+    return ExtraktionsResultat(
+        success=result.success,
+        data=result.data,
+        error=result.error,
+        warnings=result.warnings
+    )
+
+
 @activity.defn
 async def extrahera_ovk_protokoll(protokoll_input: ProtokollInput) -> ExtraktionsResultat:
     """
-    Steg 3b: Extrahera data från OVK-protokoll (Excel)
+    Steg 3b: Extrahera data från OVK-protokoll (PDF eller Excel)
     """
     activity.logger.info(f"Extraherar OVK-data från {protokoll_input.file_path}")
     
-    from excel_extractor import OVKExtractor
-    
-    extractor = OVKExtractor()
-    result = extractor.extract(protokoll_input.file_path)
+    if protokoll_input.file_type == 'pdf':
+        try:
+            result = await _extrahera_ovk_pdf(protokoll_input.file_path)
+        except Exception as e:
+            result = ExtraktionsResultat(success=False, data=None, error=str(e))
+    else:
+        from excel_extractor import OVKExtractor
+
+        extractor = OVKExtractor()
+        ovk = await asyncio.to_thread(extractor.extract, protokoll_input.file_path)
+        result = ExtraktionsResultat(
+            success=ovk.success,
+            data=ovk.data if ovk.success else None,
+            error=ovk.error,
+            warnings=ovk.warnings
+        )
     
     if result.warnings:
         for warning in result.warnings:
@@ -124,14 +243,21 @@ async def berakna_property_health_index(
     # Poängsystem 0-100 för olika kategorier
     
     # 1. Byggnadstekniskt (20%)
-    byggnadstekniskt = 70
+    # Basen är byggnadens ventilationspoäng (förberäknad över HVAC-korpusen)
+    from ventilation_analytics import ventilation_score
+    ventilation = ventilation_score(ovk_data)
+    if ventilation is not None and ventilation.poang is not None:
+        byggnadstekniskt = ventilation.poang
+    else:
+        byggnadstekniskt = 70
     if energideklaration.get('nybyggnadsar', 0) > 2000:
         byggnadstekniskt += 15
     elif energideklaration.get('nybyggnadsar', 0) > 1980:
         byggnadstekniskt += 5
     else:
         byggnadstekniskt -= 10
-    
+    byggnadstekniskt = min(100, max(0, byggnadstekniskt))
+
     # 2. Ekonomi (30%)
     ekonomi = 60
     manadsavgift_per_kvm = 3950 / energideklaration.get('boyta', 64)  # placeholder
@@ -161,7 +287,7 @@ async def berakna_property_health_index(
     index_varde = (
         byggnadstekniskt * 0.20 +
         ekonomi * 0.30 +
-        lage_bekvamlet * 0.15 +
+        lage_bekvamhet * 0.15 +
         underhall * 0.15 +
         miljo_energi * 0.10 +
         marknadsindikatorer * 0.10
@@ -182,12 +308,18 @@ async def berakna_property_health_index(
     
     if miljo_energi > 70:
         faktorer_positiva.append(f"Bra energiklass ({energiklass})")
-    else:
+    elif energiklass is not None:
         faktorer_negativa.append(f"Låg energiklass ({energiklass})")
     
     if ovk_data and ovk_data.get('ovk_utan_anmarkning'):
         faktorer_positiva.append("OVK utan anmärkningar")
     
+    if ventilation is not None and ventilation.poang is not None:
+        if ventilation.poang >= 75:
+            faktorer_positiva.append(f"Välfungerande ventilation ({ventilation.poang:.0f}/100)")
+        elif ventilation.poang < 50:
+            faktorer_negativa.append(f"Brister i ventilationen ({ventilation.poang:.0f}/100)")
+    
     if energideklaration.get('nybyggnadsar', 0) > 2000:
         faktorer_positiva.append("Relativt ny byggnad")
     elif energideklaration.get('nybyggnadsar', 0) < 1980:
@@ -349,6 +481,19 @@ class FastighetsvarderingWorkflow:
     Orkestrerar alla steg från datainsamling till färdig rapport
     """
     
+    @staticmethod
+    async def _gather(*tasks: asyncio.Future) -> list:
+        """
+        Vänta in alla steg. Om ett steg fallerar avbryts de övriga, så att
+        inga aktiviteter fortsätter i onödan när workflowet ändå misslyckas.
+        """
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    
     @workflow.run
     async def run(
         self,
@@ -378,29 +523,33 @@ class FastighetsvarderingWorkflow:
         
         workflow.logger.info(f"Startar värdering för {adress}")
         
-        # ===== STEG 1: Hämta basdata =====
-        basdata = await workflow.execute_activity(
+        # Stegen körs som en beroendegraf: allt som bara beror på indata eller
+        # basdata startar direkt och parallellt, och varje steg väntar bara på
+        # de resultat det behöver. Total tid blir ungefär den kritiska vägen
+        # (basdata -> OVK-extraktion -> health index -> värdering/risk -> rapport).
+        
+        # ===== STEG 1 & 2: Basdata och marknadsdata (oberoende) =====
+        basdata_task = asyncio.ensure_future(workflow.execute_activity(
             hamta_basdata,
             args=[adress, boyta, protokoll_paths],
             start_to_close_timeout=timedelta(seconds=30),
             retry_policy=retry_policy
-        )
-        workflow.logger.info("✓ Steg 1: Basdata hämtad")
-        
-        # ===== STEG 2: Hämta marknadsdata =====
-        marknadsdata = await workflow.execute_activity(
+        ))
+        marknad_task = asyncio.ensure_future(workflow.execute_activity(
             hamta_marknadsdata,
             args=[adress, boyta],
             start_to_close_timeout=timedelta(minutes=2),
             retry_policy=retry_policy
-        )
-        workflow.logger.info("✓ Steg 2: Marknadsdata hämtad")
+        ))
         
-        # ===== STEG 3: Extrahera kostnadsdata från protokoll =====
+        # ===== STEG 3: Extrahera kostnadsdata från protokoll (efter basdata) =====
         
-        # 3a: Energideklaration
-        energi_result = None
-        if basdata.get('protokoll_energi'):
+        async def energi_steg():
+            # 3a: Energideklaration
+            basdata = await basdata_task
+            workflow.logger.info("✓ Steg 1: Basdata hämtad")
+            if not basdata.get('protokoll_energi'):
+                return None
             energi_input = ProtokollInput(
                 file_path=basdata['protokoll_energi'],
                 file_type='pdf',
@@ -410,40 +559,53 @@ class FastighetsvarderingWorkflow:
             energi_result = await workflow.execute_activity(
                 extrahera_energideklaration,
                 args=[energi_input],
-                start_to_close_timeout=timedelta(minutes=5),
+                start_to_close_timeout=timedelta(minutes=30),
+                heartbeat_timeout=EXTRACT_HEARTBEAT_TIMEOUT,
                 retry_policy=retry_policy
             )
             
             if not energi_result.success:
                 workflow.logger.error(f"Energideklaration misslyckades: {energi_result.error}")
                 raise Exception(f"Kunde inte extrahera energideklaration: {energi_result.error}")
+            
+            workflow.logger.info("✓ Steg 3a: Energideklaration extraherad")
+            return energi_result
         
-        workflow.logger.info("✓ Steg 3a: Energideklaration extraherad")
-        
-        # 3b: OVK-protokoll
-        ovk_result = None
-        if basdata.get('protokoll_ovk'):
+        async def ovk_steg():
+            # 3b: OVK-protokoll
+            basdata = await basdata_task
+            if not basdata.get('protokoll_ovk'):
+                return None
             ovk_input = ProtokollInput(
                 file_path=basdata['protokoll_ovk'],
-                file_type='xlsm',
+                file_type=basdata['protokoll_ovk'].rsplit('.', 1)[-1].lower(),
                 protokoll_typ='ovk'
             )
             
+            # Lång total tid men kort heartbeat: stora protokoll får ta tid,
+            # hängda workers upptäcks snabbt och försöket fortsätter från checkpoint
             ovk_result = await workflow.execute_activity(
                 extrahera_ovk_protokoll,
                 args=[ovk_input],
-                start_to_close_timeout=timedelta(minutes=2),
+                start_to_close_timeout=timedelta(minutes=30),
+                heartbeat_timeout=EXTRACT_HEARTBEAT_TIMEOUT,
                 retry_policy=retry_policy
             )
             
             if not ovk_result.success:
                 workflow.logger.warning(f"OVK-extraktion misslyckades: {ovk_result.error}")
                 # Fortsätt ändå, OVK är inte kritiskt
+            
+            workflow.logger.info("✓ Steg 3b: OVK-data extraherad")
+            return ovk_result
         
-        workflow.logger.info("✓ Steg 3b: OVK-data extraherad")
-        
-        # ===== STEG 4: OVK & Energideklaration (redan gjort i steg 3) =====
-        workflow.logger.info("✓ Steg 4: Energi & OVK komplett")
+        basdata, marknadsdata, energi_result, ovk_result = await self._gather(
+            basdata_task,
+            marknad_task,
+            asyncio.ensure_future(energi_steg()),
+            asyncio.ensure_future(ovk_steg())
+        )
+        workflow.logger.info("✓ Steg 2-4: Marknadsdata, energi & OVK komplett")
         
         # ===== STEG 5: AI Värdering (XGBoost/Reg.) =====
         health_index = await workflow.execute_activity(
@@ -451,38 +613,38 @@ class FastighetsvarderingWorkflow:
             args=[
                 energi_result.data if energi_result else {},
                 ovk_result.data if ovk_result else None,
-                marknadsdata.__dict__
+                asdict(marknadsdata)
             ],
             start_to_close_timeout=timedelta(seconds=30),
             retry_policy=retry_policy
         )
         workflow.logger.info("✓ Steg 5a: Property Health Index beräknad")
         
-        vardering = await workflow.execute_activity(
-            ai_vardering_xgboost,
-            args=[
-                basdata,
-                energi_result.data if energi_result else {},
-                marknadsdata.__dict__,
-                health_index.__dict__
-            ],
-            start_to_close_timeout=timedelta(minutes=1),
-            retry_policy=retry_policy
-        )
-        workflow.logger.info("✓ Steg 5b: AI-värdering klar")
-        
-        # ===== STEG 6: AI Riskmodell =====
-        riskmodell = await workflow.execute_activity(
-            ai_riskmodell,
-            args=[
-                energi_result.data if energi_result else {},
-                health_index.__dict__,
-                ovk_result.data if ovk_result else None
-            ],
-            start_to_close_timeout=timedelta(seconds=30),
-            retry_policy=retry_policy
+        # ===== STEG 5b & 6: Värdering och riskmodell (oberoende av varandra) =====
+        vardering, riskmodell = await self._gather(
+            asyncio.ensure_future(workflow.execute_activity(
+                ai_vardering_xgboost,
+                args=[
+                    basdata,
+                    energi_result.data if energi_result else {},
+                    asdict(marknadsdata),
+                    asdict(health_index)
+                ],
+                start_to_close_timeout=timedelta(minutes=1),
+                retry_policy=retry_policy
+            )),
+            asyncio.ensure_future(workflow.execute_activity(
+                ai_riskmodell,
+                args=[
+                    energi_result.data if energi_result else {},
+                    asdict(health_index),
+                    ovk_result.data if ovk_result else None
+                ],
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=retry_policy
+            ))
         )
-        workflow.logger.info("✓ Steg 6: Riskmodell klar")
+        workflow.logger.info("✓ Steg 5b & 6: AI-värdering och riskmodell klara")
         
         # ===== STEG 7: Sammanfattning + Rapport =====
         from datetime import date
@@ -503,7 +665,7 @@ class FastighetsvarderingWorkflow:
         
         rapport_info = await workflow.execute_activity(
             generera_rapport,
-            args=[komplett_vardering.__dict__],
+            args=[asdict(komplett_vardering)],
             start_to_close_timeout=timedelta(minutes=3),
             retry_policy=retry_policy
         )
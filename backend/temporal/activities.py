@@ -1,18 +1,28 @@
 
 from __future__ import annotations
 from temporalio import activity
-from .model_types import BaseData, MarketData, CostData, ValuationResult, RiskResult, SummaryResult, ReportResult
+from .model_types import BaseData, MarketData, CostData, ValuationResult, RiskResult, SummaryResult, ReportResult, WorkflowInput, PortfolioPage
+from . import scoring
+from .cache import MARKET_CACHE, area_key
 from typing import Dict, Any, Optional
 from pathlib import Path
-import json, math, time
+import asyncio, json, math
 
 # NOTE: No external I/O implemented; stubs emulate computation.
 # Add your real API calls here (Hemnet/Booli/SCB/OVK/Radon/EnergyCert).
+#
+# Execution model:
+# - I/O-bound activities are `async def` and must only await (never block);
+#   they run on the worker's event loop.
+# - CPU-bound or blocking activities are plain `def`; the worker runs them on
+#   its activity_executor (thread or process pool, see worker.py), so they
+#   never stall the event loop. Keep them top-level so a process pool can
+#   pickle them.
 
 @activity.defn
 async def FetchBaseDataActivity(payload: Dict[str, Any]) -> BaseData:
     # Simulate latency and compute defaults
-    time.sleep(0.2)
+    await asyncio.sleep(0.2)
     return BaseData(
         has_ovk=True,
         radon_bq_m3=60.0,
@@ -22,7 +32,24 @@ async def FetchBaseDataActivity(payload: Dict[str, Any]) -> BaseData:
 
 @activity.defn
 async def FetchMarketDataActivity(payload: Dict[str, Any]) -> MarketData:
-    time.sleep(0.2)
+    # Area-level data: properties in the same postcode share one fetch per TTL
+    flags = payload.get("optional_flags") or {}
+    key = area_key(payload.get("address"), payload.get("municipality"), flags.get("lat"), flags.get("lon"))
+    return await MARKET_CACHE.get(key, lambda: _fetch_market_data(payload))
+
+async def _fetch_market_data(payload: Dict[str, Any]) -> MarketData:
+    # Imported here: httpx must stay out of the workflow sandbox (workflows.py imports this module)
+    from . import providers
+    if providers.MARKET_PROVIDERS:
+        snap = await providers.market_snapshot(payload.get("address") or payload.get("municipality") or "")
+        return MarketData(
+            recent_sales_avg=snap["sales_avg"],
+            area_price_per_m2=snap["price_per_m2"],
+            # No provider for these yet
+            transport_score=0.7,
+            noise_db=52.0,
+        )
+    await asyncio.sleep(0.2)
     # Stubbed values
     return MarketData(
         recent_sales_avg=3750000.0,
@@ -33,7 +60,7 @@ async def FetchMarketDataActivity(payload: Dict[str, Any]) -> MarketData:
 
 @activity.defn
 async def FetchCostDataActivity(payload: Dict[str, Any]) -> CostData:
-    time.sleep(0.1)
+    await asyncio.sleep(0.1)
     return CostData(
         monthly_fee_sek=4200.0,
         operating_costs_sek_m=900.0,
@@ -41,57 +68,19 @@ async def FetchCostDataActivity(payload: Dict[str, Any]) -> CostData:
     )
 
 @activity.defn
-async def AI_ValuationModelActivity(inputs: Dict[str, Any]) -> ValuationResult:
-    # Simple deterministic model: price = area * area_ppm * multipliers
-    area = float(inputs.get("area_m2") or 60.0)
-    area_ppm = float(inputs.get("area_price_per_m2") or 60000.0)
-    fee = float(inputs.get("monthly_fee_sek") or 4000.0)
-    energy_kwh_m2 = float(inputs.get("energy_kwh_m2") or 110.0)
-    transport = float(inputs.get("transport_score") or 0.6)
-    noise = float(inputs.get("noise_db") or 55.0)
-
-    # Heuristic multipliers
-    m_fee = 1.0 - min(max((fee - 3500.0) / 5000.0, 0.0), 0.2)  # up to -20%
-    m_energy = 1.0 - min(max((energy_kwh_m2 - 100.0) / 300.0, 0.0), 0.1)  # up to -10%
-    m_transport = 1.0 + min(max((transport - 0.5) * 0.2, -0.05), 0.1)     # +/- 10%
-    m_noise = 1.0 - min(max((noise - 50.0) / 30.0, 0.0), 0.08)            # up to -8%
-
-    point = area * area_ppm * m_fee * m_energy * m_transport * m_noise
-    low = point * 0.95
-    high = point * 1.05
-    return ValuationResult(est_value_low=low, est_value_high=high, point_estimate=point)
+def AI_ValuationModelActivity(inputs: Dict[str, Any]) -> ValuationResult:
+    return scoring.valuation(inputs)
 
 @activity.defn
-async def AI_RiskModelActivity(features: Dict[str, Any]) -> RiskResult:
-    # Score risk from 0-100 using simple weights
-    risk_score = 0.0
-    factors = {}
-    fee = float(features.get("monthly_fee_sek") or 4000.0)
-    energy_kwh_m2 = float(features.get("energy_kwh_m2") or 110.0)
-    energy_class = str(features.get("energy_class") or "D")
-    radon = float(features.get("radon_bq_m3") or 80.0)
-    has_ovk = bool(features.get("has_ovk") if features.get("has_ovk") is not None else True)
-    noise = float(features.get("noise_db") or 55.0)
-
-    if fee > 4500: risk_score += 15; factors["fee"] = "high"
-    if energy_kwh_m2 > 120: risk_score += 15; factors["energy_kwh_m2"] = "high"
-    if energy_class in ("E","F","G"): risk_score += 15; factors["energy_class"] = energy_class
-    if radon > 100: risk_score += 20; factors["radon"] = "elevated"
-    if not has_ovk: risk_score += 10; factors["ovk"] = "missing"
-    if noise > 60: risk_score += 10; factors["noise"] = "high"
-
-    level = "LOW" if risk_score < 20 else "MEDIUM" if risk_score < 40 else "HIGH"
-    return RiskResult(risk_level=level, factors=factors)
+def AI_RiskModelActivity(features: Dict[str, Any]) -> RiskResult:
+    return scoring.risk(features)
 
 @activity.defn
-async def AI_SummaryActivity(payload: Dict[str, Any]) -> SummaryResult:
-    point = payload.get("valuation", {}).get("point_estimate")
-    level = payload.get("risk", {}).get("risk_level")
-    text = f"The property is valued around {int(point):,} SEK with risk level {level}.".replace(",", " ")
-    return SummaryResult(text=text)
+def AI_SummaryActivity(payload: Dict[str, Any]) -> SummaryResult:
+    return scoring.summary(payload)
 
 @activity.defn
-async def GenerateReportActivity(payload: Dict[str, Any]) -> ReportResult:
+def GenerateReportActivity(payload: Dict[str, Any]) -> ReportResult:
     # Persist a JSON report (PDF not implemented here)
     out_dir = Path("var/reports")
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -104,3 +93,18 @@ async def GenerateReportActivity(payload: Dict[str, Any]) -> ReportResult:
     json_path = out_dir / f"{payload.get('property_id')}_report.json"
     json_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
     return ReportResult(pdf_path=None, json_blob=report)
+
+@activity.defn
+def LoadPortfolioPageActivity(payload: Dict[str, Any]) -> PortfolioPage:
+    # NDJSON, one WorkflowInput dict per line; blank lines are skipped
+    source, offset, limit = payload["source"], int(payload.get("offset") or 0), int(payload["limit"])
+    items = []
+    total = 0
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if offset <= total < offset + limit:
+                items.append(WorkflowInput(**json.loads(line)))
+            total += 1
+    return PortfolioPage(items=items, total=total)
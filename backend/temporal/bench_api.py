@@ -0,0 +1,106 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+import httpx
+from temporalio.client import Client
+
+from . import client as client_module
+from .client import get_client
+from .codec import data_converter
+from .model_types import WorkflowInput
+from .workflows import PropertyValuationWorkflow
+from .worker import TASK_QUEUE, build_worker, make_activity_executor
+
+# /progress and /last-result latency: a Client.connect per request (the old
+# route behaviour) vs the app's shared client (main_temporal.py lifespan).
+# The shared path goes through the FastAPI app in-process, so it also pays
+# for routing and JSON; the per-request path only connects and queries.
+#
+#   python -m temporal.bench_api --requests 500
+#       against TEMPORAL_TARGET with `python -m temporal.worker` running
+#   python -m temporal.bench_api --requests 500 --local
+#       starts a Temporal dev server and an in-process worker
+
+@asynccontextmanager
+async def _environment(local: bool) -> AsyncIterator[Client]:
+    if not local:
+        yield await get_client()
+        return
+    from temporalio.testing import WorkflowEnvironment
+    async with await WorkflowEnvironment.start_local(data_converter=data_converter()) as env:
+        # The app's shared client reads the target at connect time
+        client_module.TEMPORAL_TARGET = env.client.service_client.config.target_host
+        with make_activity_executor() as executor:
+            async with build_worker(env.client, executor):
+                yield env.client
+
+async def _measure(requests: int, concurrency: int, call: Callable[[], Awaitable[None]]) -> Dict[str, float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one() -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "per_s": requests / elapsed,
+    }
+
+async def bench(requests: int, concurrency: int, local: bool) -> None:
+    from main_temporal import app
+    async with _environment(local) as client:
+        wf_id = f"bench-api-{uuid.uuid4().hex[:8]}"
+        handle = await client.start_workflow(
+            PropertyValuationWorkflow.run,
+            WorkflowInput(property_id=wf_id, area_m2=70.0),
+            id=wf_id,
+            task_queue=TASK_QUEUE,
+        )
+        await handle.result()
+        queries = {"progress": PropertyValuationWorkflow.GetProgress, "last-result": PropertyValuationWorkflow.GetLastResult}
+
+        def per_request(query) -> Callable[[], Awaitable[None]]:
+            async def call() -> None:
+                c = await get_client()
+                await c.get_workflow_handle(wf_id).query(query)
+            return call
+
+        print(f"{'endpoint':>12} {'client':>12} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as http:
+                def shared(path: str) -> Callable[[], Awaitable[None]]:
+                    async def call() -> None:
+                        r = await http.get(f"/api/temporal/{path}", params={"workflow_id": wf_id})
+                        r.raise_for_status()
+                    return call
+
+                for path, query in queries.items():
+                    for name, call in (("per-request", per_request(query)), ("shared", shared(path))):
+                        row = await _measure(requests, concurrency, call)
+                        print(f"{path:>12} {name:>12} {row['p50']:>8.1f} {row['p99']:>8.1f} {row['per_s']:>8.1f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API query latency: connect per request vs shared client")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--local", action="store_true", help="Start a Temporal dev server")
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.concurrency, args.local))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from temporalio.client import Client
+from temporalio.converter import DataConverter
+
+from .codec import data_converter
+from .model_types import WorkflowInput
+from .workflows import PropertyValuationWorkflow
+from .worker import build_worker, make_activity_executor
+
+# History bytes and latency with and without payload compression.
+#
+#   python -m temporal.bench_codec
+#       payload sizes and encode/decode cost only, no server
+#   python -m temporal.bench_codec --runs 20 --local     (or --cluster)
+#       also runs PropertyValuationWorkflows carrying an OVK-sized
+#       extraction result in optional_flags, with an in-process worker on
+#       a private task queue using the same converter as the client
+
+def sample_extraction(rows: int = 400) -> Dict[str, Any]:
+    # Shaped like OVKProtokollExtractor output: repetitive Swedish text and numbers
+    return {
+        "A_Blankett": {"fastighetsbeteckning": "Stockholm Södermalm 1:23", "adress": "Götgatan 12, 118 46 Stockholm"},
+        "E1": {"systemnr": "LA01", "besiktningsdatum": "2024-05-14", "systemtyp": "FTX"},
+        "B1": [
+            {"plats": f"Lägenhet {i // 4 + 1001}, {['kök', 'badrum', 'sovrum', 'vardagsrum'][i % 4]}",
+             "don_typ": "Tilluftsdon" if i % 2 else "Frånluftsdon",
+             "proj_ls": 10.0 + i % 7, "uppm_ls": 9.5 + i % 5,
+             "matmetod": "Flödesmätning med mätstos", "anm": "Justerat till projekterat flöde" if i % 9 == 0 else None}
+            for i in range(rows)
+        ],
+        "anmarkningar": ["Filter i aggregat LA01 behöver bytas, tryckfall över gränsvärde."] * 20,
+    }
+
+async def payload_sizes(payload: Any, repeat: int = 200) -> None:
+    print(f"{'codec':>6} {'bytes':>8} {'encode ms':>10} {'decode ms':>10}")
+    for name, conv in (("none", data_converter(compress=False)), ("zlib", data_converter(compress=True))):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            encoded = await conv.encode([payload])
+        t1 = time.perf_counter()
+        for _ in range(repeat):
+            await conv.decode(encoded, [dict])
+        t2 = time.perf_counter()
+        print(f"{name:>6} {encoded[0].ByteSize():>8} {(t1 - t0) / repeat * 1000:>10.3f} {(t2 - t1) / repeat * 1000:>10.3f}")
+
+@asynccontextmanager
+async def _client(converter: DataConverter, local: bool) -> AsyncIterator[Client]:
+    if local:
+        from temporalio.testing import WorkflowEnvironment
+        async with await WorkflowEnvironment.start_local(data_converter=converter) as env:
+            yield env.client
+    else:
+        from .client import get_client
+        yield await get_client(converter)
+
+async def _workflows(converter: DataConverter, runs: int, local: bool, flags: Dict[str, Any]) -> List[Dict[str, float]]:
+    task_queue = f"bench-codec-{uuid.uuid4().hex[:8]}"
+    rows: List[Dict[str, float]] = []
+    async with _client(converter, local) as client:
+        with make_activity_executor() as executor:
+            async with build_worker(client, executor, task_queue=task_queue):
+                for i in range(runs):
+                    wf_id = f"{task_queue}-{i}"
+                    t0 = time.perf_counter()
+                    handle = await client.start_workflow(
+                        PropertyValuationWorkflow.run,
+                        WorkflowInput(property_id=wf_id, area_m2=70.0, optional_flags=flags),
+                        id=wf_id,
+                        task_queue=task_queue,
+                    )
+                    await handle.result()
+                    latency = time.perf_counter() - t0
+                    history = await handle.fetch_history()
+                    rows.append({"latency_ms": latency * 1000, "bytes": sum(e.ByteSize() for e in history.events)})
+    return rows
+
+async def bench(runs: int, local: Optional[bool]) -> None:
+    flags = {"ovk": sample_extraction()}
+    await payload_sizes(flags)
+    if local is None:
+        return
+    print(f"\n{'codec':>6} {'p50 ms':>8} {'p99 ms':>8} {'history bytes':>14}")
+    for name, conv in (("none", data_converter(compress=False)), ("zlib", data_converter(compress=True))):
+        rows = await _workflows(conv, runs, local, flags)
+        lat = sorted(r["latency_ms"] for r in rows)
+        p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+        print(f"{name:>6} {statistics.median(lat):>8.1f} {p99:>8.1f} {statistics.mean(r['bytes'] for r in rows):>14.0f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Payload compression: history bytes and latency")
+    parser.add_argument("--runs", type=int, default=20)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--local", action="store_true", help="Start a dev server")
+    target.add_argument("--cluster", action="store_true", help="Use TEMPORAL_TARGET")
+    args = parser.parse_args()
+    asyncio.run(bench(args.runs, True if args.local else False if args.cluster else None))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from temporalio.client import Client
+
+from .model_types import WorkflowInput
+from .workflows import MODEL_MODES, PropertyValuationWorkflow
+from .worker import TASK_QUEUE, build_worker, make_activity_executor
+
+# Per-workflow latency and history size for each model_mode.
+#
+#   python -m temporal.bench_models --runs 50
+#       against TEMPORAL_TARGET with `python -m temporal.worker` running
+#   python -m temporal.bench_models --runs 50 --local
+#       starts a Temporal dev server and an in-process worker
+
+@asynccontextmanager
+async def _environment(local: bool) -> AsyncIterator[Client]:
+    if not local:
+        from .client import get_client
+        yield await get_client()
+        return
+    from temporalio.testing import WorkflowEnvironment
+    async with await WorkflowEnvironment.start_local() as env:
+        with make_activity_executor() as executor:
+            async with build_worker(env.client, executor):
+                yield env.client
+
+async def _one(client: Client, mode: str, prefix: str, i: int) -> Dict[str, float]:
+    wf_id = f"bench-{prefix}-{mode}-{i}"
+    t0 = time.perf_counter()
+    handle = await client.start_workflow(
+        PropertyValuationWorkflow.run,
+        WorkflowInput(property_id=wf_id, area_m2=70.0, model_mode=mode),
+        id=wf_id,
+        task_queue=TASK_QUEUE,
+    )
+    await handle.result()
+    latency = time.perf_counter() - t0
+    history = await handle.fetch_history()
+    return {
+        "latency_ms": latency * 1000,
+        "events": len(history.events),
+        "bytes": sum(e.ByteSize() for e in history.events),
+    }
+
+async def bench(runs: int, concurrency: int, local: bool) -> None:
+    prefix = uuid.uuid4().hex[:8]
+    async with _environment(local) as client:
+        print(f"{'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'events':>7} {'bytes':>7}")
+        for mode in MODEL_MODES:
+            sem = asyncio.Semaphore(concurrency)
+
+            async def limited(i: int) -> Dict[str, float]:
+                async with sem:
+                    return await _one(client, mode, prefix, i)
+
+            rows: List[Dict[str, float]] = await asyncio.gather(*(limited(i) for i in range(runs)))
+            lat = sorted(r["latency_ms"] for r in rows)
+            p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+            print(
+                f"{mode:>8} {statistics.median(lat):>8.1f} {p99:>8.1f} "
+                f"{statistics.mean(r['events'] for r in rows):>7.0f} {statistics.mean(r['bytes'] for r in rows):>7.0f}"
+            )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency and history size per model_mode")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1, help="Workflows in flight per mode")
+    parser.add_argument("--local", action="store_true", help="Start a dev server and in-process worker")
+    args = parser.parse_args()
+    asyncio.run(bench(args.runs, args.concurrency, args.local))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import uvicorn
+
+from . import providers
+from .providers import ProviderClient, ResponseCache, market_snapshot
+from .provider_stub import create_app
+
+# Market snapshots against the local provider stub, three ways:
+#   per-call  new client (and connections) for every snapshot, as in the old sketch
+#   pooled    one shared client, keep-alive, no response cache
+#   cached    one shared client plus the Cache-Control/ETag response cache
+#
+#   python -m temporal.bench_providers --calls 600 --concurrency 50 --areas 30 --latency-ms 20
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _run(calls: int, concurrency: int, areas: int, snapshot: Callable[[str], Awaitable[Any]]) -> Dict[str, float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await snapshot(f"{11_000 + i % areas} Stockholm")
+            except providers.ProviderError:
+                errors += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "per_s": calls / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "errors": errors,
+    }
+
+async def bench(calls: int, concurrency: int, areas: int, latency_ms: float, fail_rate: float, max_age_s: int) -> None:
+    port = _free_port()
+    for name in ("BOOLI", "HEMNET", "SCB"):
+        setattr(providers, f"{name}_BASE_URL", f"http://127.0.0.1:{port}/{name.lower()}")
+    app = create_app(latency_ms=latency_ms, fail_rate=fail_rate, max_age_s=max_age_s)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        async def per_call(query: str) -> Any:
+            client = ProviderClient(cache=ResponseCache(0))
+            try:
+                return await market_snapshot(query, client)
+            finally:
+                await client.aclose()
+
+        pooled = ProviderClient(cache=ResponseCache(0), max_per_host=concurrency)
+        cached = ProviderClient(max_per_host=concurrency)
+        print(f"{'mode':>9} {'snap/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} {'upstream':>9} {'304s':>5}")
+        for name, snapshot in (
+            ("per-call", per_call),
+            ("pooled", lambda q: market_snapshot(q, pooled)),
+            ("cached", lambda q: market_snapshot(q, cached)),
+        ):
+            app.state.stats.update(requests=0, not_modified=0, failures=0)
+            row = await _run(calls, concurrency, areas, snapshot)
+            s = app.state.stats
+            print(f"{name:>9} {row['per_s']:>8.1f} {row['p50']:>8.1f} {row['p99']:>8.1f} {row['errors']:>6} "
+                  f"{s['requests']:>9} {s['not_modified']:>5}")
+        print(f"\ncached client: {cached.stats()}")
+        await pooled.aclose()
+        await cached.aclose()
+    finally:
+        server.should_exit = True
+        await serving
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Provider client: per-call vs pooled vs cached")
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--areas", type=int, default=30, help="Distinct areas queried")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected stub latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of stub answers that are 503")
+    parser.add_argument("--max-age-s", type=int, default=60)
+    args = parser.parse_args()
+    asyncio.run(bench(args.calls, args.concurrency, args.areas, args.latency_ms, args.fail_rate, args.max_age_s))
+
+if __name__ == "__main__":
+    main()
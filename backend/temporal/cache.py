@@ -0,0 +1,131 @@
+
+from __future__ import annotations
+import os
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+MARKET_CACHE_TTL_S = float(os.getenv("MARKET_CACHE_TTL_S", "900"))
+MARKET_CACHE_MAX = int(os.getenv("MARKET_CACHE_MAX", "10000"))
+# Grid cell size in degrees when only coordinates are known (~1 km at 0.01)
+MARKET_CACHE_GRID_DEG = float(os.getenv("MARKET_CACHE_GRID_DEG", "0.01"))
+MARKET_CACHE_STATS_INTERVAL_S = float(os.getenv("MARKET_CACHE_STATS_INTERVAL_S", "60"))
+
+_POSTCODE = re.compile(r"\b(\d{3})\s?(\d{2})\b")
+
+log = logging.getLogger(__name__)
+
+def area_key(
+    address: Optional[str] = None,
+    municipality: Optional[str] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+) -> Optional[str]:
+    # Most specific first: postcode, grid cell, municipality. None = don't cache
+    m = _POSTCODE.search(address or "")
+    if m:
+        return f"postnr:{m.group(1)}{m.group(2)}"
+    if lat is not None and lon is not None:
+        return f"grid:{round(lat / MARKET_CACHE_GRID_DEG)}:{round(lon / MARKET_CACHE_GRID_DEG)}"
+    if municipality:
+        return f"kommun:{municipality.strip().lower()}"
+    return None
+
+class SingleFlightCache(Generic[T]):
+    # Per-process TTL + LRU cache. Concurrent misses for one key share a
+    # single upstream call; failures are not cached. Event-loop only (async
+    # activities), not thread-safe.
+    def __init__(self, name: str, ttl_s: float, max_entries: int) -> None:
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, T]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0  # = upstream fetches
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+        self.expired = 0
+
+    async def get(self, key: Optional[str], fetch: Callable[[], Awaitable[T]]) -> T:
+        if key is None:
+            return await fetch()
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expired += 1
+            fut = self._inflight.get(key)
+            if fut is None:
+                return await self._lead(key, fetch)
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # The leader was cancelled, not us: try again, possibly as the new leader
+                if fut.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+    async def _lead(self, key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            self.errors += 1
+            fut.set_exception(e)
+            fut.exception()  # retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            del self._inflight[key]
+        self._store(key, value)
+        fut.set_result(value)
+        return value
+
+    def _store(self, key: str, value: T) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "cache": self.name,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            # Served without an upstream call of their own
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+        }
+
+# One per worker process for FetchMarketDataActivity; other value types get their own instance
+MARKET_CACHE: SingleFlightCache[Any] = SingleFlightCache("market", MARKET_CACHE_TTL_S, MARKET_CACHE_MAX)
+
+async def log_stats_forever(cache: SingleFlightCache = MARKET_CACHE, interval_s: float = MARKET_CACHE_STATS_INTERVAL_S) -> None:
+    while True:
+        await asyncio.sleep(interval_s)
+        log.info("cache stats %s", cache.stats())
@@ -1,10 +1,117 @@
 
 from __future__ import annotations
 import os
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
 from temporalio.client import Client
+from temporalio.converter import DataConverter
+from .codec import data_converter
 
 TEMPORAL_TARGET = os.getenv("TEMPORAL_TARGET", "localhost:7233")
 TEMPORAL_NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
+# Shared client: health probe period/timeout, and how long to fail fast after a failed connect
+TEMPORAL_HEALTH_INTERVAL_S = float(os.getenv("TEMPORAL_HEALTH_INTERVAL_S", "15"))
+TEMPORAL_HEALTH_TIMEOUT_S = float(os.getenv("TEMPORAL_HEALTH_TIMEOUT_S", "3"))
+TEMPORAL_RECONNECT_BACKOFF_S = float(os.getenv("TEMPORAL_RECONNECT_BACKOFF_S", "2"))
 
-async def get_client() -> Client:
-    return await Client.connect(TEMPORAL_TARGET, namespace=TEMPORAL_NAMESPACE)
+log = logging.getLogger(__name__)
+
+async def get_client(converter: Optional[DataConverter] = None) -> Client:
+    return await Client.connect(TEMPORAL_TARGET, namespace=TEMPORAL_NAMESPACE, data_converter=converter or data_converter())
+
+class SharedClient:
+    # One connected Client for a long-lived process (the API). A Client
+    # multiplexes all calls over one gRPC channel, so there is no pool; the
+    # first caller connects, concurrent callers wait for that connect. After
+    # a failed connect, callers fail fast for TEMPORAL_RECONNECT_BACKOFF_S
+    # and then the next one tries again. start() adds a health probe that
+    # drops the client after a failed check, forcing a fresh connect.
+    def __init__(self, converter: Optional[DataConverter] = None) -> None:
+        self.converter = converter
+        self._client: Optional[Client] = None
+        self._lock = asyncio.Lock()
+        self._monitor: Optional[asyncio.Task] = None
+        self._failed_at = 0.0
+        self.last_error: Optional[str] = None
+        self.connects = 0
+        self.healthy: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+
+    async def get(self) -> Client:
+        client = self._client
+        if client is not None:
+            return client
+        async with self._lock:
+            if self._client is not None:
+                return self._client
+            wait_s = self._failed_at + TEMPORAL_RECONNECT_BACKOFF_S - time.monotonic()
+            if wait_s > 0:
+                raise ConnectionError(f"Temporal unavailable, retrying in {wait_s:.1f}s: {self.last_error}")
+            try:
+                self._client = await get_client(self.converter)
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.healthy = False
+                raise ConnectionError(f"cannot connect to Temporal at {TEMPORAL_TARGET}: {e}") from e
+            self.connects += 1
+            self.last_error = None
+            self.healthy = True
+            log.info("connected to Temporal at %s (namespace %s)", TEMPORAL_TARGET, TEMPORAL_NAMESPACE)
+            return self._client
+
+    def invalidate(self) -> None:
+        self._client = None
+
+    async def check(self) -> bool:
+        try:
+            client = await self.get()
+            ok = await client.service_client.check_health(timeout=timedelta(seconds=TEMPORAL_HEALTH_TIMEOUT_S))
+            if not ok:
+                raise ConnectionError("health check reported not serving")
+        except Exception as e:
+            if self._client is not None:
+                log.warning("Temporal health check failed, reconnecting: %s", e)
+                self.last_error = f"{type(e).__name__}: {e}"
+            self.invalidate()
+            ok = False
+        self.healthy = ok
+        self.checked_at = time.time()
+        return ok
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "target": TEMPORAL_TARGET,
+            "namespace": TEMPORAL_NAMESPACE,
+            "connected": self._client is not None,
+            "healthy": self.healthy,
+            "checked_at": self.checked_at,
+            "connects": self.connects,
+            "last_error": self.last_error,
+        }
+
+    async def _probe_forever(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(TEMPORAL_HEALTH_INTERVAL_S)
+
+    async def start(self) -> None:
+        # Connects eagerly but does not fail app startup if Temporal is down
+        if self._monitor is None:
+            self._monitor = asyncio.create_task(self._probe_forever())
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+        self.invalidate()
+
+# The API's client; connected by main_temporal.py's lifespan, or lazily on first use
+shared_client = SharedClient()
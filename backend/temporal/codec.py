@@ -0,0 +1,72 @@
+
+from __future__ import annotations
+import os
+import zlib
+import dataclasses
+from typing import List, Optional, Sequence
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+from .converter import BinaryPayloadConverter
+
+# Every client and worker on a namespace must be able to decode what the
+# others encode: decode() always understands zlib payloads, so turning
+# compression on or off per process is safe, but removing the codec is not.
+# TEMPORAL_PAYLOAD_CODEC: "zlib" (default) or "none"
+PAYLOAD_CODEC = os.getenv("TEMPORAL_PAYLOAD_CODEC", "zlib")
+COMPRESS_MIN_BYTES = int(os.getenv("TEMPORAL_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("TEMPORAL_COMPRESS_LEVEL", "6"))
+ZLIB_ENCODING = b"binary/zlib"
+
+class CompressionCodec(PayloadCodec):
+    def __init__(self, min_bytes: int = COMPRESS_MIN_BYTES, level: int = COMPRESS_LEVEL, enabled: bool = True) -> None:
+        self.min_bytes = min_bytes
+        self.level = level
+        self.enabled = enabled
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._encode(p) for p in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._decode(p) for p in payloads]
+
+    def _encode(self, payload: Payload) -> Payload:
+        if not self.enabled or payload.ByteSize() < self.min_bytes:
+            return payload
+        raw = payload.SerializeToString()
+        packed = zlib.compress(raw, self.level)
+        # Already-compressed data (PDF bytes, images) can grow; keep it as is
+        if len(packed) >= len(raw):
+            return payload
+        return Payload(metadata={"encoding": ZLIB_ENCODING}, data=packed)
+
+    def _decode(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != ZLIB_ENCODING:
+            return payload
+        return Payload.FromString(zlib.decompress(payload.data))
+
+class ChainCodec(PayloadCodec):
+    # Encodes through codecs in order and decodes in reverse
+    def __init__(self, codecs: Sequence[PayloadCodec]) -> None:
+        self.codecs = list(codecs)
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        out = list(payloads)
+        for codec in self.codecs:
+            out = await codec.encode(out)
+        return out
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        out = list(payloads)
+        for codec in reversed(self.codecs):
+            out = await codec.decode(out)
+        return out
+
+def data_converter(*after: PayloadCodec, compress: Optional[bool] = None) -> DataConverter:
+    # Dataclasses go through the binary converter (converter.py), then the codecs
+    # Compression first, then e.g. a claim check that sees the compressed size
+    if PAYLOAD_CODEC not in ("zlib", "none"):
+        raise ValueError(f"TEMPORAL_PAYLOAD_CODEC must be 'zlib' or 'none', not {PAYLOAD_CODEC!r}")
+    enabled = PAYLOAD_CODEC == "zlib" if compress is None else compress
+    codecs: List[PayloadCodec] = [CompressionCodec(enabled=enabled), *after]
+    codec = codecs[0] if len(codecs) == 1 else ChainCodec(codecs)
+    return dataclasses.replace(DataConverter.default, payload_converter_class=BinaryPayloadConverter, payload_codec=codec)
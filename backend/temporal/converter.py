@@ -0,0 +1,356 @@
+
+from __future__ import annotations
+import os
+import sys
+import json
+import struct
+import types
+import typing
+import importlib
+import dataclasses
+from collections import OrderedDict
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import CompositePayloadConverter, DefaultPayloadConverter, EncodingPayloadConverter
+
+# Schema-driven binary encoding for dataclasses (BaseData, Vardering,
+# PropertyHealthIndex, ...). Field codecs are built once per class from its
+# type hints; values are written positionally, so field names never hit the
+# wire and decoding rebuilds the typed object (enums, dates, nested
+# dataclasses) without reflection. Untyped parts (Dict, Any) are embedded as
+# compact JSON. Anything the schema can't express falls back to plain JSON.
+#
+# Schema evolution: fields may only be appended, and appended fields need a
+# default; renaming, removing or reordering breaks replay of old histories.
+#
+# TEMPORAL_PAYLOAD_CONVERTER: "binary" (default) or "json". Decoding always
+# understands binary payloads.
+PAYLOAD_CONVERTER = os.getenv("TEMPORAL_PAYLOAD_CONVERTER", "binary")
+ENCODING = b"binary/dataclass"
+# Schemas kept for classes that are not the importable one (sandbox copies)
+FOREIGN_SCHEMA_MAX = 64
+
+Enc = Callable[[bytearray, Any], None]
+Dec = Callable[[memoryview, int], Tuple[Any, int]]
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_I32 = struct.Struct("<i")
+
+class SchemaError(TypeError):
+    pass
+
+def _json_default(v: Any) -> Any:
+    if dataclasses.is_dataclass(v) and not isinstance(v, type):
+        return dataclasses.asdict(v)
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    raise TypeError(f"{type(v).__name__} is not JSON serializable")
+
+def _put_bytes(buf: bytearray, b: bytes) -> None:
+    buf += _U32.pack(len(b))
+    buf += b
+
+def _get_bytes(mv: memoryview, off: int) -> Tuple[bytes, int]:
+    (n,) = _U32.unpack_from(mv, off)
+    off += 4
+    return bytes(mv[off:off + n]), off + n
+
+# ---------- scalar codecs ----------
+
+def _enc_bool(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, bool):
+        raise SchemaError(f"expected bool, got {type(v).__name__}")
+    buf.append(1 if v else 0)
+
+def _dec_bool(mv: memoryview, off: int) -> Tuple[Any, int]:
+    return mv[off] == 1, off + 1
+
+def _enc_int(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, int) or isinstance(v, bool):
+        raise SchemaError(f"expected int, got {type(v).__name__}")
+    buf += _I64.pack(v)
+
+def _dec_int(mv: memoryview, off: int) -> Tuple[Any, int]:
+    return _I64.unpack_from(mv, off)[0], off + 8
+
+def _enc_float(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, (int, float)) or isinstance(v, bool):
+        raise SchemaError(f"expected float, got {type(v).__name__}")
+    buf += _F64.pack(v)
+
+def _dec_float(mv: memoryview, off: int) -> Tuple[Any, int]:
+    return _F64.unpack_from(mv, off)[0], off + 8
+
+def _enc_str(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, str):
+        raise SchemaError(f"expected str, got {type(v).__name__}")
+    _put_bytes(buf, v.encode("utf-8"))
+
+def _dec_str(mv: memoryview, off: int) -> Tuple[Any, int]:
+    b, off = _get_bytes(mv, off)
+    return b.decode("utf-8"), off
+
+def _enc_raw(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, (bytes, bytearray)):
+        raise SchemaError(f"expected bytes, got {type(v).__name__}")
+    _put_bytes(buf, bytes(v))
+
+def _enc_date(buf: bytearray, v: Any) -> None:
+    if type(v) is not date:
+        raise SchemaError(f"expected date, got {type(v).__name__}")
+    buf += _I32.pack(v.toordinal())
+
+def _dec_date(mv: memoryview, off: int) -> Tuple[Any, int]:
+    return date.fromordinal(_I32.unpack_from(mv, off)[0]), off + 4
+
+def _enc_datetime(buf: bytearray, v: Any) -> None:
+    if not isinstance(v, datetime):
+        raise SchemaError(f"expected datetime, got {type(v).__name__}")
+    _put_bytes(buf, v.isoformat().encode())
+
+def _dec_datetime(mv: memoryview, off: int) -> Tuple[Any, int]:
+    b, off = _get_bytes(mv, off)
+    return datetime.fromisoformat(b.decode()), off
+
+def _enc_json(buf: bytearray, v: Any) -> None:
+    _put_bytes(buf, json.dumps(v, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def _dec_json(mv: memoryview, off: int) -> Tuple[Any, int]:
+    b, off = _get_bytes(mv, off)
+    return json.loads(b), off
+
+_SCALARS: Dict[Any, Tuple[Enc, Dec]] = {
+    bool: (_enc_bool, _dec_bool),
+    int: (_enc_int, _dec_int),
+    float: (_enc_float, _dec_float),
+    str: (_enc_str, _dec_str),
+    bytes: (_enc_raw, _get_bytes),
+    date: (_enc_date, _dec_date),
+    datetime: (_enc_datetime, _dec_datetime),
+}
+
+# ---------- composite codecs ----------
+
+def _nullable(enc: Enc, dec: Dec) -> Tuple[Enc, Dec]:
+    # Every value carries a presence byte: several models default
+    # non-Optional fields to None (warnings, skapad, ...)
+    def n_enc(buf: bytearray, v: Any) -> None:
+        if v is None:
+            buf.append(0)
+        else:
+            buf.append(1)
+            enc(buf, v)
+
+    def n_dec(mv: memoryview, off: int) -> Tuple[Any, int]:
+        if mv[off] == 0:
+            return None, off + 1
+        return dec(mv, off + 1)
+
+    return n_enc, n_dec
+
+def _enum_codec(cls: Type[Enum]) -> Tuple[Enc, Dec]:
+    enc_v, dec_v = (_enc_str, _dec_str) if issubclass(cls, str) else (_enc_json, _dec_json)
+
+    def enc(buf: bytearray, v: Any) -> None:
+        # Raw values are accepted too (e.g. "C" for Energiklass) and come back as members
+        if not isinstance(v, cls):
+            try:
+                v = cls(v)
+            except ValueError:
+                raise SchemaError(f"{v!r} is not a {cls.__name__}") from None
+        enc_v(buf, v.value)
+
+    def dec(mv: memoryview, off: int) -> Tuple[Any, int]:
+        v, off = dec_v(mv, off)
+        return cls(v), off
+
+    return enc, dec
+
+def _list_codec(item: Tuple[Enc, Dec]) -> Tuple[Enc, Dec]:
+    enc_i, dec_i = item
+
+    def enc(buf: bytearray, v: Any) -> None:
+        if not isinstance(v, (list, tuple)):
+            raise SchemaError(f"expected list, got {type(v).__name__}")
+        buf += _U32.pack(len(v))
+        for x in v:
+            enc_i(buf, x)
+
+    def dec(mv: memoryview, off: int) -> Tuple[Any, int]:
+        (n,) = _U32.unpack_from(mv, off)
+        off += 4
+        out = []
+        for _ in range(n):
+            x, off = dec_i(mv, off)
+            out.append(x)
+        return out, off
+
+    return enc, dec
+
+def _dict_codec(value: Tuple[Enc, Dec]) -> Tuple[Enc, Dec]:
+    enc_v, dec_v = value
+
+    def enc(buf: bytearray, v: Any) -> None:
+        if not isinstance(v, dict):
+            raise SchemaError(f"expected dict, got {type(v).__name__}")
+        buf += _U32.pack(len(v))
+        for k, x in v.items():
+            _enc_str(buf, k)
+            enc_v(buf, x)
+
+    def dec(mv: memoryview, off: int) -> Tuple[Any, int]:
+        (n,) = _U32.unpack_from(mv, off)
+        off += 4
+        out = {}
+        for _ in range(n):
+            k, off = _dec_str(mv, off)
+            out[k], off = dec_v(mv, off)
+        return out, off
+
+    return enc, dec
+
+def _untyped(tp: Any) -> bool:
+    # Values with no schema below them; a list of these is one JSON blob, not one per item
+    if tp is Any or tp is dict or tp is Dict:
+        return True
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    return origin in (dict, Dict) and not (len(args) == 2 and args[0] is str and args[1] is not Any)
+
+def _codec(tp: Any) -> Tuple[Enc, Dec]:
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin is typing.Union or origin is types.UnionType:
+        rest = [a for a in args if a is not type(None)]
+        return _codec(rest[0]) if len(rest) == 1 else _nullable(_enc_json, _dec_json)
+    if tp in _SCALARS:
+        return _nullable(*_SCALARS[tp])
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return _nullable(*_enum_codec(tp))
+    if isinstance(tp, type) and dataclasses.is_dataclass(tp):
+        schema = _Schema.of(tp)
+        return _nullable(schema.encode_into, schema.decode_from)
+    if origin in (list, List) and args and not _untyped(args[0]):
+        return _nullable(*_list_codec(_codec(args[0])))
+    if origin in (dict, Dict) and len(args) == 2 and args[0] is str and args[1] is not Any:
+        return _nullable(*_dict_codec(_codec(args[1])))
+    # Dict, Any, List[Dict], ...: no schema to exploit
+    return _nullable(_enc_json, _dec_json)
+
+class _Schema:
+    # Classes importable by name (the worker's own) are cached for good.
+    # Other copies of a class with the same name, i.e. those the workflow
+    # sandbox re-imports for every run, only go into a small LRU so old runs'
+    # modules can be collected.
+    _cache: Dict[type, "_Schema"] = {}
+    _foreign: "OrderedDict[type, _Schema]" = OrderedDict()
+
+    def __init__(self, cls: type, registry: Dict[type, "_Schema"]) -> None:
+        self.cls = cls
+        self.name = f"{cls.__module__}.{cls.__qualname__}"
+        # Register first so self-referencing types resolve
+        registry[cls] = self
+        try:
+            hints = typing.get_type_hints(cls)
+            fields = [f for f in dataclasses.fields(cls) if f.init]
+            codecs = [_codec(hints[f.name]) for f in fields]
+        except BaseException:
+            registry.pop(cls, None)
+            raise
+        self.names = [f.name for f in fields]
+        self.encoders = [c[0] for c in codecs]
+        self.decoders = [c[1] for c in codecs]
+
+    @classmethod
+    def of(cls, tp: type) -> "_Schema":
+        schema = cls._cache.get(tp)
+        if schema is not None:
+            return schema
+        schema = cls._foreign.get(tp)
+        if schema is not None:
+            cls._foreign.move_to_end(tp)
+            return schema
+        if cls.lookup(f"{tp.__module__}.{tp.__qualname__}") is tp:
+            return cls(tp, cls._cache)
+        schema = cls(tp, cls._foreign)
+        while len(cls._foreign) > FOREIGN_SCHEMA_MAX:
+            cls._foreign.popitem(last=False)
+        return schema
+
+    @staticmethod
+    def lookup(name: str) -> Optional[type]:
+        # Always the worker's class, never a sandbox copy
+        module, _, qualname = name.rpartition(".")
+        mod = sys.modules.get(module)
+        if mod is None:
+            try:
+                mod = importlib.import_module(module)
+            except ImportError:
+                return None
+        obj = getattr(mod, qualname, None)
+        return obj if isinstance(obj, type) and dataclasses.is_dataclass(obj) else None
+
+    def encode_into(self, buf: bytearray, value: Any) -> None:
+        if not isinstance(value, self.cls):
+            raise SchemaError(f"expected {self.name}, got {type(value).__name__}")
+        buf += _U32.pack(len(self.names))
+        for name, enc in zip(self.names, self.encoders):
+            try:
+                enc(buf, getattr(value, name))
+            except SchemaError as e:
+                raise SchemaError(f"{self.name}.{name}: {e}") from None
+
+    def decode_from(self, mv: memoryview, off: int) -> Tuple[Any, int]:
+        (n,) = _U32.unpack_from(mv, off)
+        off += 4
+        if n > len(self.names):
+            raise SchemaError(f"{self.name}: payload has {n} fields, class has {len(self.names)}")
+        kwargs = {}
+        # Fields missing from older payloads take their defaults
+        for name, dec in zip(self.names[:n], self.decoders[:n]):
+            kwargs[name], off = dec(mv, off)
+        return self.cls(**kwargs), off
+
+class DataclassBinaryPayloadConverter(EncodingPayloadConverter):
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    @property
+    def encoding(self) -> str:
+        return ENCODING.decode()
+
+    def to_payload(self, value: Any) -> Optional[Payload]:
+        if not self.enabled or isinstance(value, type) or not dataclasses.is_dataclass(value):
+            return None
+        try:
+            schema = _Schema.of(type(value))
+            buf = bytearray()
+            schema.encode_into(buf, value)
+        except (SchemaError, TypeError, ValueError, struct.error, NameError):
+            # Not expressible by the schema (wrong runtime types, unresolvable hints): let JSON take it
+            return None
+        return Payload(metadata={"encoding": ENCODING, "type": schema.name.encode()}, data=bytes(buf))
+
+    def from_payload(self, payload: Payload, type_hint: Optional[Type] = None) -> Any:
+        name = payload.metadata["type"].decode()
+        # Prefer the hint: inside the workflow sandbox it is the sandbox's copy of the class
+        if isinstance(type_hint, type) and f"{type_hint.__module__}.{type_hint.__qualname__}" == name:
+            cls = type_hint
+        else:
+            cls = _Schema.lookup(name)
+        if cls is None:
+            raise SchemaError(f"cannot resolve dataclass {name}")
+        value, _ = _Schema.of(cls).decode_from(memoryview(payload.data), 0)
+        return value
+
+class BinaryPayloadConverter(CompositePayloadConverter):
+    # The SDK's default converters with the dataclass encoder ahead of JSON
+    def __init__(self) -> None:
+        defaults = list(DefaultPayloadConverter.default_encoding_payload_converters)
+        defaults.insert(len(defaults) - 1, DataclassBinaryPayloadConverter(enabled=PAYLOAD_CONVERTER == "binary"))
+        super().__init__(*defaults)
@@ -0,0 +1,127 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import Executor
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Dict, List
+
+from . import activities as act
+from .model_types import WorkflowInput
+from .worker import TASK_QUEUE, make_activity_executor
+
+# Load test for the worker execution model.
+#
+#   python -m temporal.loadtest --valuations 200 --concurrency 1,8,32,128
+#       runs the activity mix of one valuation (3 fetches, 2 models, summary,
+#       report) in-process the way the worker does: async activities on the
+#       event loop, sync ones on the activity executor, with at most
+#       --concurrency activities in flight. No Temporal server needed.
+#
+#   python -m temporal.loadtest --cluster --valuations 200 --concurrency 50
+#       starts real PropertyValuationWorkflows against TEMPORAL_TARGET and
+#       waits for them; run the worker with different TEMPORAL_* settings
+#       to compare.
+
+def _features(base, market, cost, wf_input: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "area_m2": wf_input["area_m2"],
+        "monthly_fee_sek": cost.monthly_fee_sek,
+        "area_price_per_m2": market.area_price_per_m2,
+        "energy_kwh_m2": base.energy_kwh_m2,
+        "energy_class": base.energy_class,
+        "radon_bq_m3": base.radon_bq_m3,
+        "has_ovk": base.has_ovk,
+        "transport_score": market.transport_score,
+        "noise_db": market.noise_db,
+    }
+
+class ActivitySlots:
+    def __init__(self, limit: int, executor: Executor) -> None:
+        self.sem = asyncio.Semaphore(limit)
+        self.executor = executor
+
+    async def run(self, fn: Callable, arg: Any) -> Any:
+        async with self.sem:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(arg)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, arg)
+
+async def _valuation(slots: ActivitySlots, i: int) -> None:
+    wf_input = asdict(WorkflowInput(property_id=f"load-{i}", area_m2=60.0 + i % 40))
+    base, market, cost = await asyncio.gather(
+        slots.run(act.FetchBaseDataActivity, wf_input),
+        slots.run(act.FetchMarketDataActivity, wf_input),
+        slots.run(act.FetchCostDataActivity, wf_input),
+    )
+    features = _features(base, market, cost, wf_input)
+    valuation, risk = await asyncio.gather(
+        slots.run(act.AI_ValuationModelActivity, features),
+        slots.run(act.AI_RiskModelActivity, features),
+    )
+    summary = await slots.run(act.AI_SummaryActivity, {"valuation": asdict(valuation), "risk": asdict(risk)})
+    await slots.run(act.GenerateReportActivity, {
+        "property_id": wf_input["property_id"],
+        "valuation": asdict(valuation),
+        "risk": asdict(risk),
+        "summary": asdict(summary),
+    })
+
+async def _bounded(n: int, limit: int, make: Callable[[int], Awaitable[Any]]) -> None:
+    sem = asyncio.Semaphore(limit)
+
+    async def one(i: int) -> None:
+        async with sem:
+            await make(i)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+
+async def run_in_process(valuations: int, concurrency: int, executor_kind: str, workers: int) -> float:
+    with make_activity_executor(executor_kind, workers) as executor:
+        slots = ActivitySlots(concurrency, executor)
+        t0 = time.perf_counter()
+        # Every valuation may start; the activity slots are the limit under test
+        await _bounded(valuations, valuations, lambda i: _valuation(slots, i))
+        return time.perf_counter() - t0
+
+async def run_cluster(valuations: int, concurrency: int) -> float:
+    from .client import get_client
+    from .workflows import PropertyValuationWorkflow
+
+    client = await get_client()
+    prefix = uuid.uuid4().hex[:8]
+
+    async def one(i: int) -> None:
+        await client.execute_workflow(
+            PropertyValuationWorkflow.run,
+            WorkflowInput(property_id=f"load-{prefix}-{i}", area_m2=60.0 + i % 40),
+            id=f"load-{prefix}-{i}",
+            task_queue=TASK_QUEUE,
+        )
+
+    t0 = time.perf_counter()
+    await _bounded(valuations, concurrency, one)
+    return time.perf_counter() - t0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the valuation activity mix vs concurrency")
+    parser.add_argument("--valuations", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,8,32,128", help="Comma-separated levels")
+    parser.add_argument("--executor", default="thread", choices=["thread", "process"])
+    parser.add_argument("--workers", type=int, default=8, help="Activity executor size")
+    parser.add_argument("--cluster", action="store_true", help="Start real workflows against TEMPORAL_TARGET")
+    args = parser.parse_args()
+
+    levels: List[int] = [int(c) for c in args.concurrency.split(",")]
+    print(f"{'concurrency':>11} {'seconds':>8} {'valuations/s':>13}")
+    for c in levels:
+        if args.cluster:
+            elapsed = asyncio.run(run_cluster(args.valuations, c))
+        else:
+            elapsed = asyncio.run(run_in_process(args.valuations, c, args.executor, args.workers))
+        print(f"{c:>11} {elapsed:>8.2f} {args.valuations / elapsed:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,50 @@
 
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class BaseData:
     has_ovk: bool
     radon_bq_m3: Optional[float]
     energy_class: Optional[str]
     energy_kwh_m2: Optional[float]
 
-@dataclass
+@dataclass(slots=True)
 class MarketData:
     recent_sales_avg: Optional[float]
     area_price_per_m2: Optional[float]
     transport_score: Optional[float]  # 0-1
     noise_db: Optional[float]
 
-@dataclass
+@dataclass(slots=True)
 class CostData:
     monthly_fee_sek: Optional[float]
     operating_costs_sek_m: Optional[float]
     parking_available: Optional[bool]
 
-@dataclass
+@dataclass(slots=True)
 class ValuationResult:
     est_value_low: float
     est_value_high: float
     point_estimate: float
 
-@dataclass
+@dataclass(slots=True)
 class RiskResult:
     risk_level: str  # e.g., 'LOW', 'MEDIUM', 'HIGH'
     factors: Dict[str, Any]
 
-@dataclass
+@dataclass(slots=True)
 class SummaryResult:
     text: str
 
-@dataclass
+@dataclass(slots=True)
 class ReportResult:
     pdf_path: Optional[str]
     json_blob: Dict[str, Any]
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowInput:
     property_id: str
     address: Optional[str] = None
@@ -53,10 +53,41 @@ class WorkflowInput:
     brf_id: Optional[str] = None
     municipality: Optional[str] = None
     optional_flags: Optional[Dict[str, Any]] = None
+    model_mode: Optional[str] = None  # activity | local | inline, see workflows.MODEL_MODES
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowState:
     property_id: str
     progress: str
     last_result: Optional[Dict[str, Any]]
     last_run_at: Optional[datetime]
+    timings: Optional[Dict[str, float]] = None
+
+@dataclass(slots=True)
+class PortfolioProgress:
+    total: Optional[int] = None
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    value_sum_sek: float = 0.0
+    risk_levels: Dict[str, int] = field(default_factory=dict)
+    recent_failures: List[str] = field(default_factory=list)  # property_ids, newest last
+    runs: int = 1  # 1 + number of continue-as-new
+    skipped: int = 0  # repeated property_id, or its child id was already running
+
+@dataclass(slots=True)
+class PortfolioInput:
+    portfolio_id: str
+    # Either the properties themselves or an NDJSON file of WorkflowInput dicts read page by page
+    items: Optional[List[WorkflowInput]] = None
+    source: Optional[str] = None
+    concurrency: int = 20  # child workflows in flight
+    continue_every: int = 500  # items per run before continue-as-new
+    model_mode: Optional[str] = None  # applied to items that don't set their own
+    offset: int = 0  # next line of `source` to read
+    progress: Optional[PortfolioProgress] = None  # carried across continue-as-new
+
+@dataclass(slots=True)
+class PortfolioPage:
+    items: List[WorkflowInput]
+    total: int
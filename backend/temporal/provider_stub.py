@@ -0,0 +1,94 @@
+
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import zlib
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request, Response
+
+# Local stand-in for Booli/Hemnet/SCB, for tests and benchmarks of
+# providers.py. Answers are deterministic per query, carry an ETag and
+# Cache-Control: max-age, and If-None-Match gets a 304. Latency and
+# failures (503 + Retry-After, or 429) can be injected.
+#
+#   python -m temporal.provider_stub --port 8765 --latency-ms 50 --fail-rate 0.05
+#   MARKET_PROVIDERS=1 python -m temporal.worker
+
+def _seed(query: str) -> int:
+    return zlib.crc32(query.strip().lower().encode("utf-8"))
+
+def _sold(query: str) -> Dict[str, Any]:
+    rnd = random.Random(_seed(query))
+    return {"q": query, "sold": [
+        {"price": rnd.randrange(2_500_000, 6_500_000, 5_000), "living_area": rnd.randrange(35, 110),
+         "sold_date": f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"}
+        for _ in range(rnd.randint(3, 12))
+    ]}
+
+def _area_price(query: str) -> Dict[str, Any]:
+    rnd = random.Random(_seed(query) ^ 0x5A5A)
+    return {"q": query, "price_per_m2": float(rnd.randrange(35_000, 110_000, 250))}
+
+def _area(query: str) -> Dict[str, Any]:
+    rnd = random.Random(_seed(query) ^ 0xA5A5)
+    return {"q": query, "population": rnd.randrange(5_000, 250_000), "income_mean": float(rnd.randrange(25_000, 55_000, 100))}
+
+def create_app(latency_ms: float = 0.0, fail_rate: float = 0.0, max_age_s: int = 60,
+               fail_status: int = 503, retry_after_s: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Market provider stub")
+    app.state.stats = {"requests": 0, "not_modified": 0, "failures": 0}
+
+    async def answer(request: Request, body: Dict[str, Any]) -> Response:
+        stats = app.state.stats
+        stats["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if fail_rate and random.random() < fail_rate:
+            stats["failures"] += 1
+            return Response(status_code=fail_status, headers={"retry-after": f"{retry_after_s:g}"})
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+        headers = {"etag": etag, "cache-control": f"max-age={max_age_s}"}
+        if request.headers.get("if-none-match") == etag:
+            stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(raw, media_type="application/json", headers=headers)
+
+    @app.get("/booli/sold")
+    async def booli_sold(request: Request, q: str = "") -> Response:
+        return await answer(request, _sold(q))
+
+    @app.get("/hemnet/area-price")
+    async def hemnet_area_price(request: Request, q: str = "") -> Response:
+        return await answer(request, _area_price(q))
+
+    @app.get("/scb/area")
+    async def scb_area(request: Request, q: str = "") -> Response:
+        return await answer(request, _area(q))
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, int]:
+        return app.state.stats
+
+    return app
+
+def main() -> None:
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Booli/Hemnet/SCB stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--retry-after-s", type=float, default=0.0)
+    parser.add_argument("--max-age-s", type=int, default=60)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.fail_rate, args.max_age_s, args.fail_status, args.retry_after_s)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+
+from __future__ import annotations
+import os
+import time
+import random
+import importlib.util
+import asyncio
+import logging
+import statistics
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+# Shared HTTP layer for the market data providers (Booli, Hemnet, SCB).
+# One pooled AsyncClient per process and event loop: connections are kept
+# alive and reused across activities, HTTP/2 is negotiated when `h2` is
+# installed (httpx[http2]), and each host gets its own concurrency cap on top
+# of the pool limits. GET responses are cached per URL honoring
+# Cache-Control/ETag/Last-Modified, and 429/5xx/connection errors are retried
+# with full jitter (Retry-After wins when the server sends one).
+#
+# MARKET_PROVIDERS=1 switches FetchMarketDataActivity and hamta_marknadsdata
+# from stub values to these calls. The default base URLs point at the local
+# stub (python -m temporal.provider_stub).
+
+MARKET_PROVIDERS = os.getenv("MARKET_PROVIDERS", "0") == "1"
+BOOLI_BASE_URL = os.getenv("BOOLI_BASE_URL", "http://127.0.0.1:8765/booli")
+HEMNET_BASE_URL = os.getenv("HEMNET_BASE_URL", "http://127.0.0.1:8765/hemnet")
+SCB_BASE_URL = os.getenv("SCB_BASE_URL", "http://127.0.0.1:8765/scb")
+BOOLI_API_KEY = os.getenv("BOOLI_API_KEY")
+
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100"))
+PROVIDER_MAX_KEEPALIVE = int(os.getenv("PROVIDER_MAX_KEEPALIVE", "20"))
+PROVIDER_KEEPALIVE_S = float(os.getenv("PROVIDER_KEEPALIVE_S", "30"))
+PROVIDER_MAX_PER_HOST = int(os.getenv("PROVIDER_MAX_PER_HOST", "10"))
+PROVIDER_TIMEOUT_S = float(os.getenv("PROVIDER_TIMEOUT_S", "10"))
+PROVIDER_HTTP2 = os.getenv("PROVIDER_HTTP2", "1") == "1"
+PROVIDER_RETRIES = int(os.getenv("PROVIDER_RETRIES", "3"))
+PROVIDER_BACKOFF_S = float(os.getenv("PROVIDER_BACKOFF_S", "0.2"))
+PROVIDER_BACKOFF_MAX_S = float(os.getenv("PROVIDER_BACKOFF_MAX_S", "5"))
+PROVIDER_CACHE_MAX = int(os.getenv("PROVIDER_CACHE_MAX", "5000"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+log = logging.getLogger(__name__)
+
+class ProviderError(Exception):
+    pass
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+@dataclass(slots=True)
+class CachedResponse:
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    expires_at: float  # monotonic; <= now means revalidate first
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    def json(self) -> Any:
+        return httpx.Response(self.status_code, headers=self.headers, content=self.content).json()
+
+def _cache_control(headers: httpx.Headers) -> Dict[str, Optional[str]]:
+    out: Dict[str, Optional[str]] = {}
+    for part in headers.get_list("cache-control", split_commas=True):
+        name, _, value = part.strip().partition("=")
+        if name:
+            out[name.lower()] = value.strip('"') or None
+    return out
+
+def _freshness_s(headers: httpx.Headers) -> Optional[float]:
+    # None = not storable; 0 = store but revalidate on every use
+    cc = _cache_control(headers)
+    if "no-store" in cc:
+        return None
+    validators = "etag" in headers or "last-modified" in headers
+    if "no-cache" in cc:
+        return 0.0 if validators else None
+    try:
+        max_age = float(cc.get("max-age") or "")
+    except ValueError:
+        max_age = None
+    if max_age is not None:
+        return max(max_age - float(headers.get("age") or 0), 0.0)
+    return 0.0 if validators else None
+
+class ResponseCache:
+    # LRU of successful GET responses keyed by URL (incl. query string)
+    def __init__(self, max_entries: int = PROVIDER_CACHE_MAX) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.revalidated = 0  # 304: body reused
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: str, response: httpx.Response) -> None:
+        fresh_s = _freshness_s(response.headers)
+        if fresh_s is None:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = CachedResponse(
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            expires_at=time.monotonic() + fresh_s,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def refresh(self, key: str, entry: CachedResponse, not_modified: httpx.Response) -> None:
+        # A 304 carries the new freshness; the stored body stays valid
+        headers = httpx.Headers({**entry.headers, **dict(not_modified.headers)})
+        fresh_s = _freshness_s(headers)
+        if fresh_s is None:
+            self._entries.pop(key, None)
+            return
+        entry.headers = dict(headers)
+        entry.expires_at = time.monotonic() + fresh_s
+        entry.etag = headers.get("etag") or entry.etag
+        entry.last_modified = headers.get("last-modified") or entry.last_modified
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+def _retry_after_s(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def backoff_s(attempt: int, retry_after: Optional[float] = None,
+              base_s: float = PROVIDER_BACKOFF_S, cap_s: float = PROVIDER_BACKOFF_MAX_S) -> float:
+    # Full jitter: uniform(0, min(cap, base * 2^attempt)) so that many workers
+    # retrying the same outage spread out instead of arriving in waves
+    if retry_after is not None:
+        return min(retry_after, cap_s)
+    return random.uniform(0.0, min(cap_s, base_s * (2 ** attempt)))
+
+class ProviderClient:
+    def __init__(
+        self,
+        max_connections: int = PROVIDER_MAX_CONNECTIONS,
+        max_keepalive: int = PROVIDER_MAX_KEEPALIVE,
+        max_per_host: int = PROVIDER_MAX_PER_HOST,
+        timeout_s: float = PROVIDER_TIMEOUT_S,
+        retries: int = PROVIDER_RETRIES,
+        http2: bool = PROVIDER_HTTP2,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.http2 = http2 and _http2_available()
+        self.http = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=PROVIDER_KEEPALIVE_S,
+            ),
+            timeout=httpx.Timeout(timeout_s),
+            headers={"accept": "application/json"},
+            transport=transport,
+        )
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.cache = cache if cache is not None else ResponseCache()
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._hosts.get(host)
+        if sem is None:
+            sem = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return sem
+
+    async def get_json(self, url: str, params: Optional[Mapping[str, Any]] = None,
+                       headers: Optional[Mapping[str, str]] = None) -> Any:
+        key = str(self.http.build_request("GET", url, params=params).url)
+        entry = self.cache.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.cache.hits += 1
+            return entry.json()
+        conditional = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                conditional["if-none-match"] = entry.etag
+            if entry.last_modified:
+                conditional["if-modified-since"] = entry.last_modified
+        response = await self._send(key, conditional)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.refresh(key, entry, response)
+            return entry.json()
+        if response.status_code >= 400:
+            self.failed += 1
+            raise ProviderError(f"GET {key}: HTTP {response.status_code}")
+        self.cache.misses += 1
+        self.cache.store(key, response)
+        return response.json()
+
+    async def _send(self, url: str, headers: Mapping[str, str]) -> httpx.Response:
+        attempt = 0
+        while True:
+            retry_after: Optional[float] = None
+            try:
+                async with self._host_slot(url):
+                    self.requests += 1
+                    response = await self.http.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                retry_after = _retry_after_s(response)
+                reason: str = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                response = None
+                reason = type(e).__name__
+            if attempt >= self.retries:
+                if response is not None:
+                    return response
+                self.failed += 1
+                raise ProviderError(f"GET {url}: {reason} after {attempt + 1} attempts")
+            delay = backoff_s(attempt, retry_after)
+            log.debug("retrying GET %s in %.2fs (%s)", url, delay, reason)
+            self.retried += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "cache_size": len(self.cache._entries),
+            "cache_hits": self.cache.hits,
+            "cache_revalidated": self.cache.revalidated,
+            "cache_misses": self.cache.misses,
+        }
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+# Pools are bound to the event loop that opened them; keep one per loop
+_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, ProviderClient]] = {}
+
+def get_provider_client() -> ProviderClient:
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(id(loop))
+    if entry is None or entry[0] is not loop:
+        entry = _clients[id(loop)] = (loop, ProviderClient())
+    return entry[1]
+
+async def aclose_provider_client() -> None:
+    entry = _clients.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+async def booli_sales(query: str, client: Optional[ProviderClient] = None) -> List[Dict[str, Any]]:
+    client = client or get_provider_client()
+    headers = {"x-api-key": BOOLI_API_KEY} if BOOLI_API_KEY else None
+    data = await client.get_json(f"{BOOLI_BASE_URL}/sold", {"q": query}, headers)
+    return list(data.get("sold") or [])
+
+async def hemnet_area_price(query: str, client: Optional[ProviderClient] = None) -> Optional[float]:
+    client = client or get_provider_client()
+    data = await client.get_json(f"{HEMNET_BASE_URL}/area-price", {"q": query})
+    value = data.get("price_per_m2")
+    return float(value) if value is not None else None
+
+async def scb_area_stats(query: str, client: Optional[ProviderClient] = None) -> Dict[str, Any]:
+    client = client or get_provider_client()
+    return await client.get_json(f"{SCB_BASE_URL}/area", {"q": query})
+
+async def market_snapshot(query: str, client: Optional[ProviderClient] = None) -> Dict[str, Any]:
+    # One area, all three providers concurrently over the shared pool
+    client = client or get_provider_client()
+    sales, price_per_m2, scb = await asyncio.gather(
+        booli_sales(query, client),
+        hemnet_area_price(query, client),
+        scb_area_stats(query, client),
+    )
+    prices = [float(s["price"]) for s in sales if s.get("price") is not None]
+    return {
+        "sales": sales,
+        "sales_avg": statistics.fmean(prices) if prices else None,
+        "price_per_m2": price_per_m2,
+        "population": scb.get("population"),
+        "income_mean": scb.get("income_mean"),
+    }
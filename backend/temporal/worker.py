@@ -1,29 +1,79 @@
 
 from __future__ import annotations
+import os
 import asyncio
-from temporalio.worker import Worker
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from temporalio.worker import Worker, SharedStateManager
 from .client import get_client
+from .cache import log_stats_forever
+from .providers import aclose_provider_client
 from . import activities as act
-from .workflows import PropertyValuationWorkflow
+from .workflows import PropertyValuationWorkflow, PortfolioValuationWorkflow
 
-async def main() -> None:
-    client = await get_client()
-    worker = Worker(
+TASK_QUEUE = "prop-valuation"
+
+# Per-worker tuning; unset means the SDK default
+# "thread" or "process" pool for sync (CPU/blocking) activities
+ACTIVITY_EXECUTOR = os.getenv("TEMPORAL_ACTIVITY_EXECUTOR", "thread")
+ACTIVITY_WORKERS = int(os.getenv("TEMPORAL_ACTIVITY_WORKERS", str(os.cpu_count() or 1)))
+MAX_CONCURRENT_ACTIVITIES = int(os.getenv("TEMPORAL_MAX_CONCURRENT_ACTIVITIES", "0")) or None
+MAX_CONCURRENT_WORKFLOW_TASKS = int(os.getenv("TEMPORAL_MAX_CONCURRENT_WORKFLOW_TASKS", "0")) or None
+MAX_ACTIVITIES_PER_SECOND = float(os.getenv("TEMPORAL_MAX_ACTIVITIES_PER_SECOND", "0")) or None
+
+ACTIVITIES = [
+    # async: I/O-bound, run on the event loop
+    act.FetchBaseDataActivity,
+    act.FetchMarketDataActivity,
+    act.FetchCostDataActivity,
+    # sync: CPU/blocking, run on the activity executor
+    act.AI_ValuationModelActivity,
+    act.AI_RiskModelActivity,
+    act.AI_SummaryActivity,
+    act.GenerateReportActivity,
+    act.LoadPortfolioPageActivity,
+]
+
+def make_activity_executor(kind: str = ACTIVITY_EXECUTOR, workers: int = ACTIVITY_WORKERS) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="activity")
+    raise ValueError(f"TEMPORAL_ACTIVITY_EXECUTOR must be 'thread' or 'process', not {kind!r}")
+
+def build_worker(client, executor: Executor, shared_state: Optional[SharedStateManager] = None, task_queue: str = TASK_QUEUE) -> Worker:
+    return Worker(
         client,
-        task_queue="prop-valuation",
-        workflows=[PropertyValuationWorkflow],
-        activities=[
-            act.FetchBaseDataActivity,
-            act.FetchMarketDataActivity,
-            act.FetchCostDataActivity,
-            act.AI_ValuationModelActivity,
-            act.AI_RiskModelActivity,
-            act.AI_SummaryActivity,
-            act.GenerateReportActivity,
-        ],
+        task_queue=task_queue,
+        workflows=[PropertyValuationWorkflow, PortfolioValuationWorkflow],
+        activities=ACTIVITIES,
+        activity_executor=executor,
+        shared_state_manager=shared_state,
+        max_concurrent_activities=MAX_CONCURRENT_ACTIVITIES,
+        max_concurrent_workflow_tasks=MAX_CONCURRENT_WORKFLOW_TASKS,
+        max_activities_per_second=MAX_ACTIVITIES_PER_SECOND,
     )
-    print("Worker started on task queue 'prop-valuation'")
-    await worker.run()
+
+async def main() -> None:
+    client = await get_client()
+    shared_state = None
+    if ACTIVITY_EXECUTOR == "process":
+        # Heartbeats/cancellation for activities in other processes go through a manager
+        shared_state = SharedStateManager.create_from_multiprocessing(multiprocessing.Manager())
+    with make_activity_executor() as executor:
+        worker = build_worker(client, executor, shared_state)
+        print(
+            f"Worker started on task queue '{TASK_QUEUE}' "
+            f"({ACTIVITY_EXECUTOR} executor x{ACTIVITY_WORKERS}, "
+            f"max_concurrent_activities={MAX_CONCURRENT_ACTIVITIES or 'default'})"
+        )
+        stats = asyncio.create_task(log_stats_forever())
+        try:
+            await worker.run()
+        finally:
+            stats.cancel()
+            await aclose_provider_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
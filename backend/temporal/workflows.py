@@ -1,12 +1,15 @@
 
 from __future__ import annotations
-from dataclasses import asdict
-from typing import Dict, Any, Optional
+import asyncio
+from dataclasses import asdict, replace
+from typing import Dict, Any, List, Optional, Awaitable, Callable, TypeVar
 from datetime import datetime
 from temporalio import workflow
 from temporalio.common import RetryPolicy
-from .model_types import WorkflowInput, WorkflowState
+from temporalio.exceptions import ApplicationError, ChildWorkflowError, WorkflowAlreadyStartedError
+from .model_types import WorkflowInput, WorkflowState, PortfolioInput, PortfolioProgress
 from . import activities as act
+from . import scoring
 
 # Search Attribute keys expected to exist in your Temporal namespace
 SA_PROPERTY_ID = "PropertyId"
@@ -15,35 +18,55 @@ SA_RISK_LEVEL = "RiskLevel"
 SA_LAST_RUN_AT = "LastRunAt"
 SA_HAS_OVK = "HasOVK"
 
+T = TypeVar("T")
+
+# How the pure model steps (valuation, risk, summary) run:
+#   activity - regular activities on the task queue (default)
+#   local    - local activities on the same worker; no task queue round trip
+#   inline   - scoring.* called directly in the workflow; no activity events
+MODEL_MODES = ("activity", "local", "inline")
+
+# Failed property_ids kept in PortfolioProgress.recent_failures
+PORTFOLIO_FAILURES_KEPT = 50
+
 @workflow.defn
 class PropertyValuationWorkflow:
     def __init__(self) -> None:
         self.state = WorkflowState(property_id="", progress="init", last_result=None, last_run_at=None)
         self._last_payload: Optional[Dict[str, Any]] = None
+        self._model_mode = "activity"
 
     @workflow.run
     async def run(self, wf_input: WorkflowInput) -> Dict[str, Any]:
         self.state.property_id = wf_input.property_id
         self.state.progress = "started"
+        self._model_mode = wf_input.model_mode or "activity"
+        if self._model_mode not in MODEL_MODES:
+            raise ApplicationError(f"unknown model_mode {self._model_mode!r}", non_retryable=True)
 
-        # Fetch data
-        base = await workflow.execute_activity(
-            act.FetchBaseDataActivity,
-            asdict(wf_input),
-            schedule_to_close_timeout=timedelta(seconds=30),
-            retry_policy=RetryPolicy(maximum_attempts=3),
-        )
-        market = await workflow.execute_activity(
-            act.FetchMarketDataActivity,
-            asdict(wf_input),
-            schedule_to_close_timeout=timedelta(seconds=30),
-            retry_policy=RetryPolicy(maximum_attempts=3),
-        )
-        cost = await workflow.execute_activity(
-            act.FetchCostDataActivity,
-            asdict(wf_input),
-            schedule_to_close_timeout=timedelta(seconds=15),
-            retry_policy=RetryPolicy(maximum_attempts=3),
+        # Fetch data; the three sources are independent
+        timings: Dict[str, float] = {}
+        self.state.timings = timings
+        started = workflow.now()
+        base, market, cost = await asyncio.gather(
+            self._timed(timings, "fetch_base", workflow.execute_activity(
+                act.FetchBaseDataActivity,
+                asdict(wf_input),
+                schedule_to_close_timeout=timedelta(seconds=30),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )),
+            self._timed(timings, "fetch_market", workflow.execute_activity(
+                act.FetchMarketDataActivity,
+                asdict(wf_input),
+                schedule_to_close_timeout=timedelta(seconds=30),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )),
+            self._timed(timings, "fetch_cost", workflow.execute_activity(
+                act.FetchCostDataActivity,
+                asdict(wf_input),
+                schedule_to_close_timeout=timedelta(seconds=15),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )),
         )
         self.state.progress = "features-ready"
 
@@ -62,26 +85,31 @@ class PropertyValuationWorkflow:
             "noise_db": market.noise_db,
         }
 
-        # Models
-        valuation = await workflow.execute_activity(
-            act.AI_ValuationModelActivity,
-            features,
-            schedule_to_close_timeout=timedelta(seconds=20),
-            retry_policy=RetryPolicy(maximum_attempts=2),
+        # Models; valuation and risk only share the features
+        valuation, risk = await asyncio.gather(
+            self._timed(timings, "valuation_model", self._model(
+                act.AI_ValuationModelActivity,
+                scoring.valuation,
+                features,
+                timedelta(seconds=20),
+                RetryPolicy(maximum_attempts=2),
+            )),
+            self._timed(timings, "risk_model", self._model(
+                act.AI_RiskModelActivity,
+                scoring.risk,
+                features,
+                timedelta(seconds=20),
+                RetryPolicy(maximum_attempts=2),
+            )),
         )
-        risk = await workflow.execute_activity(
-            act.AI_RiskModelActivity,
-            features,
-            schedule_to_close_timeout=timedelta(seconds=20),
-            retry_policy=RetryPolicy(maximum_attempts=2),
-        )
-        summary = await workflow.execute_activity(
+        summary = await self._timed(timings, "summary", self._model(
             act.AI_SummaryActivity,
+            scoring.summary,
             {"valuation": asdict(valuation), "risk": asdict(risk)},
-            schedule_to_close_timeout=timedelta(seconds=10),
-            retry_policy=RetryPolicy(maximum_attempts=2),
-        )
-        report = await workflow.execute_activity(
+            timedelta(seconds=10),
+            RetryPolicy(maximum_attempts=2),
+        ))
+        report = await self._timed(timings, "report", workflow.execute_activity(
             act.GenerateReportActivity,
             {
                 "property_id": wf_input.property_id,
@@ -91,7 +119,7 @@ class PropertyValuationWorkflow:
             },
             schedule_to_close_timeout=timedelta(seconds=30),
             retry_policy=RetryPolicy(maximum_attempts=2),
-        )
+        ))
 
         # Update search attributes
         await workflow.upsert_search_attributes({
@@ -104,6 +132,7 @@ class PropertyValuationWorkflow:
 
         self.state.progress = "done"
         self.state.last_run_at = workflow.now()
+        timings["total"] = self._ms_since(started)
         self.state.last_result = {
             "valuation": asdict(valuation),
             "risk": asdict(risk),
@@ -135,9 +164,15 @@ class PropertyValuationWorkflow:
             "transport_score": overrides.get("transport_score", 0.6),
             "noise_db": overrides.get("noise_db", 55.0),
         }
-        valuation = await workflow.execute_activity(act.AI_ValuationModelActivity, features, schedule_to_close_timeout=timedelta(seconds=20))
-        risk = await workflow.execute_activity(act.AI_RiskModelActivity, {**features, "monthly_fee_sek": features.get("monthly_fee_sek")}, schedule_to_close_timeout=timedelta(seconds=20))
-        summary = await workflow.execute_activity(act.AI_SummaryActivity, {"valuation": asdict(valuation), "risk": asdict(risk)}, schedule_to_close_timeout=timedelta(seconds=10))
+        timings: Dict[str, float] = {}
+        self.state.timings = timings
+        started = workflow.now()
+        valuation, risk = await asyncio.gather(
+            self._timed(timings, "valuation_model", self._model(act.AI_ValuationModelActivity, scoring.valuation, features, timedelta(seconds=20))),
+            self._timed(timings, "risk_model", self._model(act.AI_RiskModelActivity, scoring.risk, {**features, "monthly_fee_sek": features.get("monthly_fee_sek")}, timedelta(seconds=20))),
+        )
+        summary = await self._timed(timings, "summary", self._model(act.AI_SummaryActivity, scoring.summary, {"valuation": asdict(valuation), "risk": asdict(risk)}, timedelta(seconds=10)))
+        timings["total"] = self._ms_since(started)
         result = {
             "valuation": asdict(valuation),
             "risk": asdict(risk),
@@ -154,5 +189,124 @@ class PropertyValuationWorkflow:
     def GetLastResult(self) -> Optional[Dict[str, Any]]:
         return self.state.last_result
 
+    @workflow.query
+    def GetTimings(self) -> Dict[str, float]:
+        # Milliseconds per step of the last run/update; "total" is the critical path
+        return self.state.timings or {}
+
+    # ---------- Helpers ----------
+
+    async def _timed(self, timings: Dict[str, float], step: str, aw: Awaitable[T]) -> T:
+        # workflow.now() is the deterministic task time, so this replays identically
+        started = workflow.now()
+        try:
+            return await aw
+        finally:
+            timings[step] = self._ms_since(started)
+
+    def _model(self, activity_fn: Callable, pure_fn: Callable[[Dict[str, Any]], T], arg: Dict[str, Any],
+               timeout: timedelta, retry_policy: Optional[RetryPolicy] = None) -> Awaitable[T]:
+        if self._model_mode == "inline":
+            return self._inline(pure_fn, arg)
+        if self._model_mode == "local":
+            return workflow.execute_local_activity(activity_fn, arg, schedule_to_close_timeout=timeout, retry_policy=retry_policy)
+        return workflow.execute_activity(activity_fn, arg, schedule_to_close_timeout=timeout, retry_policy=retry_policy)
+
+    @staticmethod
+    async def _inline(fn: Callable[[Dict[str, Any]], T], arg: Dict[str, Any]) -> T:
+        return fn(arg)
+
+    @staticmethod
+    def _ms_since(started: datetime) -> float:
+        return round((workflow.now() - started).total_seconds() * 1000, 1)
+
+# Values many properties as child PropertyValuationWorkflows, at most
+# `concurrency` at a time. After `continue_every` items the run continues as
+# new with the remaining work, so history stays bounded however large the
+# portfolio is; progress is carried over in the input.
+@workflow.defn
+class PortfolioValuationWorkflow:
+    def __init__(self) -> None:
+        self.progress = PortfolioProgress()
+        self.in_flight = 0
+
+    @workflow.run
+    async def run(self, p: PortfolioInput) -> Dict[str, Any]:
+        if (p.items is None) == (p.source is None):
+            raise ApplicationError("exactly one of items or source is required", non_retryable=True)
+        if p.progress is not None:
+            self.progress = p.progress
+
+        batch = await self._next_batch(p)
+        window = asyncio.Semaphore(max(1, p.concurrency))
+
+        async def value(item: WorkflowInput) -> None:
+            async with window:
+                self.progress.started += 1
+                self.in_flight += 1
+                try:
+                    result = await workflow.execute_child_workflow(
+                        PropertyValuationWorkflow.run,
+                        item if item.model_mode or not p.model_mode else replace(item, model_mode=p.model_mode),
+                        id=f"portfolio-{p.portfolio_id}-prop-{item.property_id}",
+                    )
+                    self._record(result)
+                except ChildWorkflowError:
+                    self._failed(item.property_id)
+                except WorkflowAlreadyStartedError:
+                    # Leftover child from an earlier portfolio run with this id
+                    self.progress.skipped += 1
+                finally:
+                    self.in_flight -= 1
+
+        # Child ids derive from property_id: value each one once per batch
+        unique: Dict[str, WorkflowInput] = {}
+        for item in batch:
+            if item.property_id in unique:
+                self.progress.skipped += 1
+            else:
+                unique[item.property_id] = item
+        await asyncio.gather(*(value(item) for item in unique.values()))
+
+        done = self.progress.completed + self.progress.failed + self.progress.skipped
+        if batch and self.progress.total is not None and done < self.progress.total:
+            self.progress.runs += 1
+            workflow.continue_as_new(self._next_input(p, len(batch)))
+        return asdict(self.progress)
+
+    @workflow.query
+    def GetPortfolioProgress(self) -> Dict[str, Any]:
+        return {**asdict(self.progress), "in_flight": self.in_flight}
+
+    async def _next_batch(self, p: PortfolioInput) -> List[WorkflowInput]:
+        if p.items is not None:
+            if self.progress.total is None:
+                self.progress.total = len(p.items)
+            return p.items[:p.continue_every]
+        page = await workflow.execute_activity(
+            act.LoadPortfolioPageActivity,
+            {"source": p.source, "offset": p.offset, "limit": p.continue_every},
+            schedule_to_close_timeout=timedelta(seconds=60),
+            retry_policy=RetryPolicy(maximum_attempts=3),
+        )
+        # The file may have changed between runs; trust the latest count
+        self.progress.total = page.total
+        return page.items
+
+    def _next_input(self, p: PortfolioInput, consumed: int) -> PortfolioInput:
+        if p.items is not None:
+            return replace(p, items=p.items[consumed:], progress=self.progress)
+        return replace(p, offset=p.offset + consumed, progress=self.progress)
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        self.progress.completed += 1
+        self.progress.value_sum_sek += float((result.get("valuation") or {}).get("point_estimate") or 0.0)
+        level = (result.get("risk") or {}).get("risk_level") or "UNKNOWN"
+        self.progress.risk_levels[level] = self.progress.risk_levels.get(level, 0) + 1
+
+    def _failed(self, property_id: str) -> None:
+        self.progress.failed += 1
+        self.progress.recent_failures = (self.progress.recent_failures + [property_id])[-PORTFOLIO_FAILURES_KEPT:]
+
 # Temporal requires timedelta import within workflow definitions
 from datetime import timedelta